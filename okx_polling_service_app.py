@@ -2,8 +2,12 @@ import asyncio
 
 import dotenv
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 
+from firebase_tools.authenticate import check_token_validity
+from pyokx.low_rest_api.client import close_async_transports
+from pyokx.low_rest_api.metrics import render_metrics
 from pyokx.rest_messages_service import okx_rest_messages_services
 from redis_tools.utils import get_async_redis, stop_async_redis
 from shared.logging import setup_logger
@@ -33,6 +37,14 @@ def health_check():
     return {"status": "OK"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(current_user=Depends(check_token_validity)):
+    """OKX REST client metrics in the Prometheus text format."""
+    if not current_user:  # check_token_validity returns False for a token Firebase rejects
+        raise HTTPException(status_code=401, detail="credentials invalid")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Startup event triggered")
@@ -57,6 +69,7 @@ async def shutdown_event():
     else:
         logger.warning("REST task was not running")
 
+    await close_async_transports()
     await stop_async_redis()
 
 
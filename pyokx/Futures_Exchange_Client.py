@@ -6,6 +6,7 @@ from pyokx.low_rest_api.Funding import FundingAPI
 from pyokx.low_rest_api.MarketData import MarketAPI
 from pyokx.low_rest_api.PublicData import PublicAPI
 from pyokx.low_rest_api.Trade import TradeAPI
+from pyokx.low_rest_api.rate_limit import rate_limiter
 from shared.logging import setup_logger
 
 logger = setup_logger(__name__.split(".")[0])
@@ -28,14 +29,18 @@ class OKX_Futures_Exchange_Client:
         self.sandbox_mode: str = sandbox_mode or getenv("OKX_SANDBOX_MODE", default=True),
         #
         self.verbose = getenv("OKX_VERBOSE", default="DEBUG").upper()
-        self.enable_rate_limit = getenv("ENABLE_RATE_LIMIT", default=True)
+        self.enable_rate_limit = str(getenv("ENABLE_RATE_LIMIT", default=True)).lower() in ["true", "1", "yes"]
+        self.enable_hedged_reads = str(getenv("ENABLE_HEDGED_READS", default=False)).lower() in ["true", "1", "yes"]
 
         _config = dict(
             api_key=api_key,
             api_secret_key=api_secret,
             passphrase=self.passphrase,
             use_server_time=False,
-            flag="1" if self.sandbox_mode else "0"
+            flag="1" if self.sandbox_mode else "0",
+            use_async=True,
+            rate_limiter=rate_limiter if self.enable_rate_limit else None,
+            hedge_reads=self.enable_hedged_reads
         )
 
         # Check All Needed Inputs are available at this time
@@ -47,8 +52,10 @@ class OKX_Futures_Exchange_Client:
         ...  # Need to add more here but boilerplate not required at this moment
 
         # Python-OKX Specific
-        self.marketAPI: MarketAPI = MarketAPI(flag=_config["flag"])
-        self.publicAPI: PublicAPI = PublicAPI(flag=_config["flag"])
+        self.marketAPI: MarketAPI = MarketAPI(flag=_config["flag"], use_async=_config["use_async"],
+                                              rate_limiter=_config["rate_limiter"], hedge_reads=_config["hedge_reads"])
+        self.publicAPI: PublicAPI = PublicAPI(flag=_config["flag"], use_async=_config["use_async"],
+                                              rate_limiter=_config["rate_limiter"], hedge_reads=_config["hedge_reads"])
         self.fundingAPI: FundingAPI = FundingAPI(**_config)
         self.accountAPI: AccountAPI = AccountAPI(**_config)
         self.tradeAPI: TradeAPI = TradeAPI(**_config)
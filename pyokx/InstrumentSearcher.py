@@ -3,6 +3,7 @@ from typing import List, Dict, Optional
 from pyokx import publicAPI, ENFORCED_INSTRUMENT_TYPES
 from pyokx.OkxEnum import InstType
 from pyokx.data_structures import Instrument
+from pyokx.low_rest_api.decoding import decode_models
 
 
 class InstrumentSearcher:
@@ -28,6 +29,7 @@ class InstrumentSearcher:
         Usage:
         ```
         okx_instrument_searcher = InstrumentSearcher(all_futures_instruments)
+        await okx_instrument_searcher.update_instruments()
         print(f'{okx_instrument_searcher.find_by_instId("BTC-USDT-240329") = }')
         print(f'{okx_instrument_searcher.find_by_type(InstType.FUTURES) = }')
         print(f'{okx_instrument_searcher.find_by_underlying("BTC-USDT") = }')
@@ -49,25 +51,24 @@ class InstrumentSearcher:
 
         self.instTypes = instTypes
         if _instrument_map is None:
-            self.instruments = self.request_instruments()
-            self._instrument_map = self._create_map(self.instruments)
+            # Requests go through the async REST client, await `update_instruments` to populate the searcher
+            self.instruments = []
+            self._instrument_map = {}
         else:
             self._instrument_map = _instrument_map
             self.instruments = list(_instrument_map.values())
 
-    def request_instruments(self):
+    async def request_instruments(self):
         instruments = []
         for instTypes in self.instTypes:
-            returned_data = publicAPI.get_instruments(instType=instTypes)
+            returned_data = await publicAPI.get_instruments(instType=instTypes)
             if len(returned_data['data']) == 0:
                 if returned_data["code"] != '0':
                     print(f'{returned_data["code"] = }')
                     print(f'{returned_data["msg"] = }')
                 _instruments = []
             else:
-                _instruments = []
-                for data in returned_data['data']:
-                    _instruments.append(Instrument(**data))
+                _instruments = decode_models(returned_data['data'], Instrument)
             instruments.extend(_instruments)
 
         return instruments
@@ -102,13 +103,14 @@ class InstrumentSearcher:
 
     async def update_instruments(self):
         """ Update the instruments list """
-        self.instruments = self.request_instruments()
+        self.instruments = await self.request_instruments()
         self._instrument_map = self._create_map(self.instruments)
 
         return self._instrument_map
 
 
 if __name__ == "__main__":
+    import asyncio
 
     instTypes = [
         InstType.FUTURES,
@@ -118,6 +120,7 @@ if __name__ == "__main__":
     ]
 
     okx_instrument_searcher = InstrumentSearcher(instTypes=instTypes)
+    asyncio.run(okx_instrument_searcher.update_instruments())
 
     for instrument_type in instTypes:
         result = okx_instrument_searcher.get_instrument_ids(instType=instrument_type)
@@ -0,0 +1,118 @@
+"""
+Cache of the account state the signal path reads or sets on every signal: per-instrument leverage and the account
+configuration.
+
+Leverage is kept per (instId, mgnMode, posSide). It is seeded by `get_leverage`, updated by our own successful
+`set_leverage` calls and by the `lever` of the positions published from the private positions channel (OKX has no
+dedicated leverage channel). `set_leverage` skips the request when the cached leverage already is the requested one,
+which takes a round trip off every signal that does not change it. The account configuration is fetched once, nothing
+in the service changes it.
+
+Entries older than `ACCOUNT_STATE_MAX_AGE` seconds are not trusted, so a change made outside of this service (e.g. on
+the OKX website, without an open position to report it) is overwritten at the latest that long after.
+"""
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from pyokx.data_structures import AccountConfigData
+from pyokx.deadlines import Deadline, DeadlineExceeded, send_idempotent
+from shared import logging
+
+logger = logging.setup_logger(__name__)
+
+ACCOUNT_STATE_MAX_AGE = float(os.getenv('ACCOUNT_STATE_MAX_AGE', 300))  # seconds
+
+
+class AccountStateCache:
+    """Leverage and account configuration of the account behind `account_api`, see the module docstring."""
+
+    def __init__(self, account_api, max_age: float = ACCOUNT_STATE_MAX_AGE):
+        self.account_api = account_api
+        self.max_age = max_age
+        self.leverage: Dict[Tuple[str, str, str], Tuple[str, float]] = {}  # (instId, mgnMode, posSide) -> (lever, at)
+        self.account_config: Optional[AccountConfigData] = None
+        self._account_config_at = 0.0
+        self._positions_stream_ids = {}  # (instId, mgnMode, posSide) -> positions entry its leverage was taken from
+        self.stats = {'set_leverage_skipped': 0, 'set_leverage_sent': 0}
+
+    # ---------------------------------------------------------------- leverage
+    def _store_leverage(self, entries: Iterable[dict]):
+        now = time.time()
+        for entry in entries:
+            self.leverage[(entry['instId'], entry['mgnMode'], entry.get('posSide') or '')] = (str(entry['lever']), now)
+
+    def cached_leverage(self, instId: str, mgnMode: str, posSide: str = '') -> Optional[str]:
+        lever, at = self.leverage.get((instId, mgnMode, posSide), (None, 0.0))
+        return lever if time.time() - at <= self.max_age else None
+
+    async def get_leverage(self, instId: str, mgnMode: str, posSide: str = None) -> Optional[str]:
+        """
+        The leverage of `instId` in `mgnMode` (of `posSide`, or of any side when not given), requested from OKX only
+        when not cached.
+        """
+        posSides = [posSide] if posSide is not None else \
+            [key[2] for key in self.leverage if key[:2] == (instId, mgnMode)]
+        for side in posSides:
+            lever = self.cached_leverage(instId, mgnMode, side)
+            if lever is not None:
+                return lever
+        result = await self.account_api.get_leverage(instId=instId, mgnMode=mgnMode)
+        if result["code"] != "0":
+            print("Unsuccessful get_leverage request，\n  error_code = ", result["code"], ", \n  Error_message = ",
+                  result["msg"])
+            return None
+        self._store_leverage(result['data'])
+        if posSide is None:
+            return str(result['data'][0]['lever']) if result['data'] else None
+        return self.cached_leverage(instId, mgnMode, posSide)
+
+    async def set_leverage(self, lever, mgnMode: str, instId: str, posSide: str = '', deadline: Deadline = None):
+        """
+        Sets the leverage unless it is known to be set already, returns the OKX response or None when skipped or not
+        confirmed within `deadline` (default `ORDER_REQUEST_BUDGET` seconds).
+        """
+        if self.cached_leverage(instId, mgnMode, posSide) == str(lever):
+            self.stats['set_leverage_skipped'] += 1
+            return None
+        self.stats['set_leverage_sent'] += 1
+        try:
+            # Setting a leverage is idempotent by nature, it is simply re-sent on a timed out attempt
+            result = await send_idempotent(lambda: self.account_api.set_leverage(
+                lever=lever, mgnMode=mgnMode, instId=instId, posSide=posSide),
+                None, deadline or Deadline(), f'{instId}:{lever}', 'set_leverage')
+        except DeadlineExceeded as e:
+            self.leverage.pop((instId, mgnMode, posSide), None)
+            logger.error(f'{e}')
+            return None
+        if result["code"] == "0":
+            self._store_leverage({'instId': instId, 'mgnMode': mgnMode, 'posSide': posSide, **entry}
+                                 for entry in result['data'])
+        else:
+            # The leverage may be anything now, the next call asks again
+            self.leverage.pop((instId, mgnMode, posSide), None)
+            logger.warning(f'Unsuccessful set_leverage request for {instId}: {result["code"]} {result["msg"]}')
+        return result
+
+    def on_positions(self, positions: Iterable, stream_id=None):
+        """
+        Takes the leverage of open positions (`WSPosition`s of the positions channel). `stream_id` is the entry the
+        positions come from, a position already taken from that entry is skipped so it cannot override a later
+        `set_leverage`.
+        """
+        entries = []
+        for position in positions:
+            key = (position.instId, position.mgnMode, position.posSide)
+            if not position.lever or (stream_id is not None and self._positions_stream_ids.get(key) == stream_id):
+                continue
+            self._positions_stream_ids[key] = stream_id
+            entries.append({'instId': position.instId, 'mgnMode': position.mgnMode, 'posSide': position.posSide,
+                            'lever': position.lever})
+        self._store_leverage(entries)
+
+    # --------------------------------------------------- account configuration
+    async def get_account_config(self, refresh: bool = False) -> AccountConfigData:
+        if refresh or self.account_config is None or time.time() - self._account_config_at > self.max_age:
+            self.account_config = AccountConfigData(**(await self.account_api.get_account_config())['data'][0])
+            self._account_config_at = time.time()
+        return self.account_config
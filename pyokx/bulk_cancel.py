@@ -0,0 +1,145 @@
+"""
+Concurrent bulk cancellation of orders and algo orders.
+
+OKX cancels at most 20 orders (`/trade/cancel-batch-orders`) or 10 algo orders (`/trade/cancel-algos`,
+`/trade/cancel-advance-algos`) per request. `BulkCanceller` splits a cancellation into those chunks and dispatches all
+of them at once, each admitted by the endpoint's token bucket so a large flatten never trips OKX's rate limit. The
+per-order outcomes of every chunk are merged into one `CancelReport`, and only the orders that failed (or whose chunk
+got no answer) are re-issued in the next round, until all are cancelled, the rounds are used up or the deadline
+expires.
+
+Usage:
+    canceller = BulkCanceller(tradeAPI)
+    report = await canceller.cancel_orders([{'instId': 'BTC-USDT-SWAP', 'ordId': '123'}, ...])
+    print(report.cancelled, report.failed)
+"""
+import asyncio
+import os
+
+from pyokx.deadlines import Deadline, DeadlineExceeded, RETRY_BACKOFF, send_idempotent
+from pyokx.low_rest_api import consts as c
+from pyokx.low_rest_api.rate_limit import rate_limiter
+from shared import logging
+
+logger = logging.setup_logger(__name__)
+
+BULK_CANCEL_MAX_ROUNDS = int(os.getenv('BULK_CANCEL_MAX_ROUNDS', 3))
+
+ORDERS = 'orders'
+ALGO_ORDERS = 'algo_orders'
+ADVANCE_ALGO_ORDERS = 'advance_algo_orders'  # move_order_stop, trigger, iceberg, twap and trailing orders
+
+# kind -> (request path, TradeAPI method, id field, max orders per request)
+CANCEL_ENDPOINTS = {
+    ORDERS: (c.CANCEL_BATCH_ORDERS, 'cancel_multiple_orders', 'ordId', 20),
+    ALGO_ORDERS: (c.CANCEL_ALGOS, 'cancel_algo_order', 'algoId', 10),
+    ADVANCE_ALGO_ORDERS: (c.Cancel_Advance_Algos, 'cancel_advance_algos', 'algoId', 10),
+}
+
+# The order is already filled, cancelled or unknown, re-issuing the cancel cannot change the outcome
+FINAL_CANCEL_CODES = ('51400', '51401', '51402')
+
+
+class CancelReport:
+    """Merged outcome of a bulk cancellation, one entry per order."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.cancelled = []  # response entries with sCode '0'
+        self.failed = {}  # order id -> last failed response entry
+        self.requests = 0
+        self.rounds = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+    def __repr__(self):
+        return f'CancelReport({self.kind}, cancelled={len(self.cancelled)}, failed={len(self.failed)}, ' \
+               f'requests={self.requests}, rounds={self.rounds})'
+
+
+class BulkCanceller:
+    """Cancels any number of orders through the batch cancel endpoints, all chunks concurrently."""
+
+    def __init__(self, trade_api, max_rounds: int = BULK_CANCEL_MAX_ROUNDS):
+        self.trade_api = trade_api
+        self.max_rounds = max_rounds
+
+    # ------------------------------------------------------------------ public
+    async def cancel_orders(self, orders_data, deadline: Deadline = None) -> CancelReport:
+        """Cancels orders given as [{'instId': ..., 'ordId': ...}, ...]."""
+        return await self.cancel(ORDERS, orders_data, deadline)
+
+    async def cancel_algo_orders(self, algo_orders_data, advanced=False, deadline: Deadline = None) -> CancelReport:
+        """Cancels algo orders given as [{'instId': ..., 'algoId': ...}, ...], `advanced` for advance algo types."""
+        return await self.cancel(ADVANCE_ALGO_ORDERS if advanced else ALGO_ORDERS, algo_orders_data, deadline)
+
+    async def cancel(self, kind, orders_data, deadline: Deadline = None) -> CancelReport:
+        _, _, id_field, chunk_size = CANCEL_ENDPOINTS[kind]
+        deadline = deadline or Deadline()
+        report = CancelReport(kind)
+        pending = {order[id_field]: order for order in orders_data}
+        while pending and report.rounds < self.max_rounds and not deadline.expired:
+            if report.rounds:
+                await deadline.sleep(RETRY_BACKOFF * 2 ** (report.rounds - 1))
+                logger.warning(f'Re-issuing {len(pending)} failed cancellations of {kind}, round {report.rounds + 1}')
+            report.rounds += 1
+            orders = list(pending.values())
+            chunks = [orders[i:i + chunk_size] for i in range(0, len(orders), chunk_size)]
+            report.requests += len(chunks)
+            responses = await asyncio.gather(*[self._send_chunk(kind, chunk, deadline, f'chunk {index}')
+                                               for index, chunk in enumerate(chunks)])
+            for chunk, response in zip(chunks, responses):
+                self._merge(report, pending, id_field, chunk, response)
+        if report.failed:
+            logger.error(f'{report}: {list(report.failed.values())}')
+        return report
+
+    # ---------------------------------------------------------------- internal
+    async def _send_chunk(self, kind, chunk, deadline, description):
+        request_path, method, _, _ = CANCEL_ENDPOINTS[kind]
+        if self.trade_api.rate_limiter is None:  # the client does not budget its own requests
+            await rate_limiter.acquire(c.POST, request_path, chunk, self.trade_api.API_KEY)
+        try:
+            # Cancelling by id is idempotent, a timed out chunk is simply re-sent within the budget
+            return await send_idempotent(lambda: getattr(self.trade_api, method)(chunk), None, deadline,
+                                         description, f'cancel {kind}')
+        except DeadlineExceeded as e:
+            logger.error(f'{e}')
+            return None
+
+    @staticmethod
+    def _merge(report, pending, id_field, chunk, response):
+        """Records the outcome of every order of `chunk`, those that may still succeed stay pending."""
+        response = response or {'code': '', 'msg': 'No response within the deadline'}
+        entries = {entry.get(id_field): entry for entry in response.get('data') or []}
+        for order in chunk:
+            order_id = order[id_field]
+            entry = entries.get(order_id)
+            if entry is None:
+                # Request-level error, the chunk as a whole was rejected
+                entry = {id_field: order_id, 'clOrdId': '', 'sCode': response.get('code', ''),
+                         'sMsg': response.get('msg', '')}
+            if entry.get('sCode') == '0':
+                report.cancelled.append(entry)
+                report.failed.pop(order_id, None)
+                del pending[order_id]
+            else:
+                report.failed[order_id] = entry
+                if entry.get('sCode') in FINAL_CANCEL_CODES:
+                    del pending[order_id]
+
+
+if __name__ == '__main__':
+    from pyokx import tradeAPI
+
+
+    async def main():
+        report = await BulkCanceller(tradeAPI).cancel_orders(
+            [{'instId': 'BTC-USDT-SWAP', 'ordId': str(ordId)} for ordId in range(45)])
+        print(report)
+        print(report.failed)
+
+
+    asyncio.run(main())
@@ -0,0 +1,207 @@
+"""
+Columnar, numeric order book snapshots.
+
+`Orderbook_Snapshot` keeps every level as a pydantic `Ask`/`Bid` of four strings: a 400-level book is 800 validated
+models and 3200 strings to allocate. `ColumnarOrderbookSnapshot` keeps each side as four contiguous int64 arrays
+instead, price and quantity stored as exact integer multiples of 10^-decimals (ticks and lots), so no precision is
+lost and values can be compared, summed and searched without parsing.
+
+Conversion is lossless in both directions (`from_snapshot` / `to_snapshot`), so the columnar form can be used
+internally while APIs keep returning `Orderbook_Snapshot`. The decimals are taken from the decimal strings (or the
+instrument's tick and lot size), values too large to scale exactly through floats are parsed from their digits, and a
+value whose scaled integer does not fit in an int64 raises a ValueError. OKX sends canonical decimal strings (no
+exponent, no trailing zeros), which is the form values are rendered back to.
+
+Usage:
+    snapshot = ColumnarOrderbookSnapshot.from_array(instId, depth, data['asks'], data['bids'], data['ts'])
+    snapshot.asks.prices[:5], snapshot.to_snapshot()
+"""
+from typing import List, Sequence
+
+import numpy as np
+
+from pyokx.data_structures import Orderbook_Snapshot, Ask, Bid
+
+# Below 2^50 the scaled double of a decimal string is within 1/4 of the exact integer, so rounding it is exact
+FLOAT_EXACT_LIMIT = 2.0 ** 50
+
+
+def infer_decimals(values: Sequence[str]) -> int:
+    """Fewest decimals that represent every decimal string of `values` exactly ('43750.10' needs 1)."""
+    return max([len(value.partition('.')[2].rstrip('0')) for value in values], default=0)
+
+
+def to_scaled(values: Sequence[str], decimals: int) -> np.ndarray:
+    """
+    Decimal strings with at most `decimals` decimals as exact integer multiples of 10^-decimals.
+
+    Values whose scaled magnitude stays below `FLOAT_EXACT_LIMIT` (any realistic price or size) are scaled through
+    floats, the others are parsed as integers from their digits.
+
+    :raises ValueError: If a value is not a decimal string or its scaled integer overflows an int64.
+    """
+    scaled = np.rint(np.array(list(map(float, values))) * 10.0 ** decimals)
+    if not len(scaled) or np.abs(scaled).max() < FLOAT_EXACT_LIMIT:
+        return scaled.astype(np.int64)
+    integers = []
+    for value in values:
+        whole, _, fraction = value.partition('.')
+        fraction = fraction.rstrip('0')
+        if len(fraction) > decimals:
+            raise ValueError(f'{value} cannot be represented exactly with {decimals} decimals')
+        integers.append(int(whole + fraction) * 10 ** (decimals - len(fraction)))
+    try:
+        return np.array(integers, dtype=np.int64)
+    except OverflowError:
+        raise ValueError(f'Values scaled by 10^{decimals} overflow an int64') from None
+
+
+def format_scaled(value: int, decimals: int) -> str:
+    """Renders an integer multiple of 10^-decimals as the canonical decimal string (e.g. 437501, 1 -> '43750.1')."""
+    if not decimals:
+        return str(value)
+    sign, digits = ('-', str(-value)) if value < 0 else ('', str(value))
+    digits = digits.rjust(decimals + 1, '0')
+    return f'{sign}{digits[:-decimals]}.{digits[-decimals:]}'.rstrip('0').rstrip('.')
+
+
+class ColumnarSide:
+    """One side of a book, best level first, as int64 columns."""
+    __slots__ = ('price_ticks', 'quantity_lots', 'deprecated_values', 'order_counts', 'price_decimals',
+                 'quantity_decimals')
+
+    def __init__(self, price_ticks, quantity_lots, deprecated_values, order_counts, price_decimals: int,
+                 quantity_decimals: int):
+        self.price_ticks = price_ticks
+        self.quantity_lots = quantity_lots
+        self.deprecated_values = deprecated_values
+        self.order_counts = order_counts
+        self.price_decimals = price_decimals
+        self.quantity_decimals = quantity_decimals
+
+    def __len__(self):
+        return len(self.price_ticks)
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self.price_ticks / 10.0 ** self.price_decimals
+
+    @property
+    def quantities(self) -> np.ndarray:
+        return self.quantity_lots / 10.0 ** self.quantity_decimals
+
+    @property
+    def nbytes(self) -> int:
+        return self.price_ticks.nbytes + self.quantity_lots.nbytes + self.deprecated_values.nbytes + \
+            self.order_counts.nbytes
+
+    def to_levels(self) -> List[List[str]]:
+        """The side as OKX levels, [price, quantity, deprecated value, number of orders] strings."""
+        return [[format_scaled(price, self.price_decimals), format_scaled(quantity, self.quantity_decimals),
+                 str(deprecated_value), str(order_count)]
+                for price, quantity, deprecated_value, order_count in
+                zip(self.price_ticks.tolist(), self.quantity_lots.tolist(), self.deprecated_values.tolist(),
+                    self.order_counts.tolist())]
+
+
+class ColumnarOrderbookSnapshot:
+    """Numeric counterpart of `Orderbook_Snapshot`, both sides share the price and quantity decimals."""
+
+    def __init__(self, instId: str, depth: str, asks: ColumnarSide, bids: ColumnarSide, ts: str):
+        self.instId = instId
+        self.depth = depth
+        self.asks = asks
+        self.bids = bids
+        self.ts = ts
+
+    @staticmethod
+    def from_array(instId: str, depth, asks: List[List[str]], bids: List[List[str]], ts: str,
+                   price_decimals: int = None, quantity_decimals: int = None) -> 'ColumnarOrderbookSnapshot':
+        """
+        From OKX levels ([price, quantity, deprecated value, number of orders] strings, as in REST and websocket
+        books). Pass the instrument's tick and lot decimals when known, they are inferred from the values otherwise.
+
+        :raises ValueError: If a price or quantity cannot be scaled exactly into an int64.
+        """
+        columns = []
+        for levels in (asks, bids):
+            if levels:
+                price, quantity, deprecated_value, order_count = zip(*levels)
+                columns.append((price, quantity, np.array(list(map(int, deprecated_value)), dtype=np.int64),
+                                np.array(list(map(int, order_count)), dtype=np.int64)))
+            else:
+                columns.append(((), (), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)))
+        (ask_prices, ask_quantities, *ask_counts), (bid_prices, bid_quantities, *bid_counts) = columns
+
+        price_decimals = ColumnarOrderbookSnapshot._decimals(ask_prices + bid_prices, price_decimals, 'prices')
+        quantity_decimals = ColumnarOrderbookSnapshot._decimals(ask_quantities + bid_quantities, quantity_decimals,
+                                                                'quantities')
+        return ColumnarOrderbookSnapshot(
+            instId=instId, depth=str(depth), ts=str(ts),
+            asks=ColumnarSide(to_scaled(ask_prices, price_decimals), to_scaled(ask_quantities, quantity_decimals),
+                              *ask_counts, price_decimals, quantity_decimals),
+            bids=ColumnarSide(to_scaled(bid_prices, price_decimals), to_scaled(bid_quantities, quantity_decimals),
+                              *bid_counts, price_decimals, quantity_decimals))
+
+    @staticmethod
+    def _decimals(values: Sequence[str], decimals: int, name: str) -> int:
+        inferred = infer_decimals(values)
+        if decimals is None:
+            return inferred
+        if inferred > decimals:
+            raise ValueError(f'The {name} have {inferred} decimals, more than the {decimals} of the instrument')
+        return decimals
+
+    @staticmethod
+    def from_snapshot(order_book: Orderbook_Snapshot) -> 'ColumnarOrderbookSnapshot':
+        return ColumnarOrderbookSnapshot.from_array(
+            order_book.instId, order_book.depth,
+            [[ask.price, ask.quantity, ask.deprecated_value, ask.number_of_orders] for ask in order_book.asks],
+            [[bid.price, bid.quantity, bid.deprecated_value, bid.number_of_orders] for bid in order_book.bids],
+            order_book.ts)
+
+    def to_snapshot(self) -> Orderbook_Snapshot:
+        return Orderbook_Snapshot(
+            instId=self.instId, depth=self.depth, ts=self.ts,
+            asks=[Ask(price=price, quantity=quantity, deprecated_value=deprecated_value, number_of_orders=order_count)
+                  for price, quantity, deprecated_value, order_count in self.asks.to_levels()],
+            bids=[Bid(price=price, quantity=quantity, deprecated_value=deprecated_value, number_of_orders=order_count)
+                  for price, quantity, deprecated_value, order_count in self.bids.to_levels()])
+
+    @property
+    def nbytes(self) -> int:
+        return self.asks.nbytes + self.bids.nbytes
+
+
+if __name__ == '__main__':
+    # run as `python -m pyokx.columnar_snapshot`
+    import random
+    import time
+    import tracemalloc
+
+
+    def okx_levels(best, step, count):
+        return [[format_scaled(round((best + i * step) * 10), 1), str(random.randint(1, 3000)), '0',
+                 str(random.randint(1, 5))] for i in range(count)]
+
+
+    levels = 400
+    asks, bids = okx_levels(43750.1, 0.1, levels), okx_levels(43750, -0.1, levels)
+    runs = 200
+    for name, build in [('Orderbook_Snapshot', Orderbook_Snapshot.from_array),
+                        ('ColumnarOrderbookSnapshot', ColumnarOrderbookSnapshot.from_array)]:
+        start = time.perf_counter()
+        for _ in range(runs):
+            snapshot = build('BTC-USDT-SWAP', levels, asks, bids, '1703914467407')
+        construction_us = (time.perf_counter() - start) / runs * 1e6
+        tracemalloc.start()
+        snapshot = build('BTC-USDT-SWAP', levels, asks, bids, '1703914467407')
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{name:>26} (depth {levels}): construction {construction_us:.0f}us, memory {memory / 1024:.1f}KiB')
+
+    columnar = ColumnarOrderbookSnapshot.from_array('BTC-USDT-SWAP', levels, asks, bids, '1703914467407')
+    assert columnar.to_snapshot() == Orderbook_Snapshot.from_array('BTC-USDT-SWAP', levels, asks, bids,
+                                                                   '1703914467407')
+    assert ColumnarOrderbookSnapshot.from_snapshot(columnar.to_snapshot()).asks.to_levels() == asks
+    print('lossless round trip ok')
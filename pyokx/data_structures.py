@@ -346,6 +346,13 @@ class Orderbook_Snapshot(OKXBaseModel):
     bids: List[Bid]
     ts: str
 
+    @staticmethod
+    def from_array(instId: str, depth, asks: List[List[str]], bids: List[List[str]], ts: str):
+        return Orderbook_Snapshot(
+            instId=instId, depth=str(depth), ts=str(ts),
+            asks=[Ask(price=ask[0], quantity=ask[1], deprecated_value=ask[2], number_of_orders=ask[3]) for ask in asks],
+            bids=[Bid(price=bid[0], quantity=bid[1], deprecated_value=bid[2], number_of_orders=bid[3]) for bid in bids])
+
 
 class Simplified_Balance_Details(OKXBaseModel):
     Currency: str
@@ -0,0 +1,129 @@
+"""
+Deadline-aware trading requests with safe, idempotent retry.
+
+Every trading request carries a time budget (`Deadline`). Orders are identified by a client-generated id
+(`clOrdId` / `algoClOrdId`) before they are sent, so when an attempt times out we do not have to guess whether the
+order reached OKX: `send_idempotent` first reconciles by looking the id up, returns the exchange's record if the order
+exists and only re-sends it (with the same id) if it does not, all within the remaining budget. A request is thus
+neither duplicated nor abandoned, and the time a slow OKX response can stall signal handling is bounded.
+
+Usage:
+    deadline = Deadline(5)
+    clOrdId = generate_client_order_id()
+    response = await send_idempotent(lambda: tradeAPI.place_order(..., clOrdId=clOrdId),
+                                     lambda: find_order_by_clOrdId(instId, clOrdId),
+                                     deadline, clOrdId, 'place_order')
+"""
+import asyncio
+import os
+import time
+import uuid
+
+import httpx
+
+from shared import logging
+
+logger = logging.setup_logger(__name__)
+
+ORDER_REQUEST_BUDGET = float(os.getenv('ORDER_REQUEST_BUDGET', 5))  # seconds per trading request
+ORDER_ATTEMPT_TIMEOUT = float(os.getenv('ORDER_ATTEMPT_TIMEOUT', 2))  # seconds per attempt within the budget
+RETRY_BACKOFF = 0.05  # seconds before the first retry, doubled on each following one
+
+
+class LookupFailed(Exception):
+    """OKX answered a reconciliation lookup with an error, whether the request took effect is still unknown."""
+
+
+RETRYABLE_ERRORS = (asyncio.TimeoutError, httpx.TransportError, LookupFailed)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when a request could not be confirmed within its budget, `client_id` identifies it for later checks."""
+
+    def __init__(self, message, client_id=None):
+        super().__init__(message)
+        self.client_id = client_id
+
+
+class Deadline:
+    """A point in time by which a request (and its retries) must be done."""
+
+    def __init__(self, budget: float = ORDER_REQUEST_BUDGET):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    async def sleep(self, seconds: float):
+        """Sleeps for `seconds`, or until the deadline if that comes first."""
+        await asyncio.sleep(min(seconds, self.remaining()))
+
+    async def run(self, awaitable, timeout: float = None):
+        """Awaits `awaitable` for at most the remaining budget (or `timeout`, whichever is shorter)."""
+        remaining = self.remaining()
+        if timeout is not None:
+            remaining = min(remaining, timeout)
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(f'Deadline of {self.budget}s exceeded')
+        return await asyncio.wait_for(awaitable, remaining)
+
+
+def generate_client_order_id(prefix: str = '') -> str:
+    """Unique OKX client order id (alphanumeric, at most 32 characters)."""
+    return (prefix + uuid.uuid4().hex)[:32]
+
+
+async def send_idempotent(send, reconcile, deadline: Deadline, client_id: str, description: str):
+    """
+    Sends a request identified by `client_id`, retrying safely until it is confirmed or `deadline` expires.
+
+    :param send: Zero-argument coroutine function sending the request, re-invoked with the same client id on retry.
+    :param reconcile: Zero-argument coroutine function returning a response equivalent to `send`'s if the request
+        already took effect on OKX (looked up by `client_id`), None only if OKX says it does not exist, and raising
+        `LookupFailed` for any other error. Pass None for requests that are idempotent by nature (e.g. cancels),
+        which are simply re-sent.
+    :param deadline: Budget shared by every attempt.
+    :param client_id: The client-generated id of the order, used for reconciliation and logging.
+    :param description: Name of the request for logging.
+    :raises DeadlineExceeded: If the request could not be confirmed within the budget.
+    """
+    attempt = 0
+    try:
+        while True:
+            attempt += 1
+            try:
+                return await deadline.run(send(), ORDER_ATTEMPT_TIMEOUT)
+            except DeadlineExceeded:
+                raise
+            except RETRYABLE_ERRORS as e:
+                logger.warning(f'{description} {client_id} attempt {attempt} failed ({type(e).__name__}), '
+                               f'{deadline.remaining():.2f}s of budget left')
+                await deadline.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+            if reconcile is not None:
+                reconciled = await _reconcile(reconcile, deadline, client_id, description)
+                if reconciled is not None:
+                    logger.info(f'{description} {client_id} reconciled after a timed out attempt')
+                    return reconciled
+    except DeadlineExceeded:
+        raise DeadlineExceeded(f'{description} {client_id} was not confirmed within {deadline.budget}s', client_id)
+
+
+async def _reconcile(reconcile, deadline: Deadline, client_id: str, description: str):
+    """Looks the request up until OKX gives a definite answer, an unknown state is never treated as "not found"."""
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await deadline.run(reconcile(), ORDER_ATTEMPT_TIMEOUT)
+        except DeadlineExceeded:
+            raise
+        except RETRYABLE_ERRORS as e:
+            logger.warning(f'{description} {client_id} reconciliation failed ({type(e).__name__}), retrying')
+            await deadline.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
@@ -0,0 +1,175 @@
+"""
+Historical fill metrics per instrument and timeframe, in one vectorized pass.
+
+`analyze_transaction_history` used to filter the pandas frame of all fills once per timeframe and instrument, which
+costs timeframes x instruments x fills every cycle. `fill_historical_metrics` parses the fills once into numeric arrays
+and assigns every fill the shortest timeframe it falls in (the timeframes are nested windows ending now). One grouped
+pass (`np.bincount` and `np.maximum.at` over instrument x timeframe) aggregates each group, and a cumulative sum (or
+max/min) along the timeframes turns the groups into the windows. The report is the one the loop produced: every
+instrument of the fills in every timeframe (first seen first), NaN where a window has no fills or trades. Sums may
+differ from the loop's in the last bits, the additions happen in another order.
+
+Usage:
+    fill_metrics: FillHistoricalMetrics = fill_historical_metrics(fill_sync.history(days=90))
+
+Run `python -m pyokx.fill_metrics` for the benchmark against the former loop.
+"""
+from datetime import datetime
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from pyokx.data_structures import FillEntry, FillHistoricalMetrics
+from shared.tmp_shared import get_timestamp_from_days_ago
+
+TIMEFRAMES = {
+    "ONE_DAY": 1,
+    "ONE_WEEK": 7,
+    "ONE_MONTH": 30,
+    "THREE_MONTHS": 90
+}
+
+
+def fill_historical_metrics(fills: List[FillEntry], reference_time: datetime = None) -> FillHistoricalMetrics:
+    """Metrics of `fills` per instrument over each of `TIMEFRAMES`, ending at `reference_time` (default now)."""
+    reference_time = reference_time or datetime.now()
+    end = get_timestamp_from_days_ago(reference_time=reference_time)
+    # Window starts oldest first, the timeframe of a fill is the shortest window it falls in
+    starts = np.array([get_timestamp_from_days_ago(days_ago=days, reference_time=reference_time)
+                       for days in reversed(TIMEFRAMES.values())], dtype=np.int64)
+    n_timeframes = len(TIMEFRAMES)
+
+    codes, instruments = pd.factorize(np.array([fill.instId for fill in fills], dtype=object))
+    fill_size = np.array([fill.fillSz for fill in fills], dtype=np.float64)
+    fill_price = np.array([fill.fillPx for fill in fills], dtype=np.float64)
+    fee = np.array([fill.fee for fill in fills], dtype=np.float64)
+    fill_pnl = np.array([fill.fillPnl for fill in fills], dtype=np.float64)
+    fill_time = np.array([fill.fillTime for fill in fills], dtype=np.int64)
+
+    timeframe = n_timeframes - np.searchsorted(starts, fill_time, side='right')
+    in_window = (timeframe < n_timeframes) & (fill_time <= end)
+    groups = codes[in_window] * n_timeframes + timeframe[in_window]
+    n_groups = len(instruments) * n_timeframes
+    shape = (len(instruments), n_timeframes)
+
+    def windows(weights):
+        return np.bincount(groups, weights=weights[in_window], minlength=n_groups).reshape(shape).cumsum(axis=1)
+
+    volume_traded = windows(fill_size)
+    notional = windows(fill_price * fill_size)
+    profit_loss = windows(fill_pnl)
+    fees_paid = windows(fee)
+    profitable_trades = np.bincount(groups[fill_pnl[in_window] > 0], minlength=n_groups).reshape(shape).cumsum(axis=1)
+    loss_making_trades = np.bincount(groups[fill_pnl[in_window] < 0], minlength=n_groups).reshape(shape).cumsum(axis=1)
+    fill_count = np.bincount(groups, minlength=n_groups).reshape(shape).cumsum(axis=1)
+
+    best_trade = np.full(n_groups, -np.inf)
+    worst_trade = np.full(n_groups, np.inf)
+    np.maximum.at(best_trade, groups, fill_pnl[in_window])
+    np.minimum.at(worst_trade, groups, fill_pnl[in_window])
+    best_trade = np.where(fill_count > 0, np.maximum.accumulate(best_trade.reshape(shape), axis=1), np.nan)
+    worst_trade = np.where(fill_count > 0, np.minimum.accumulate(worst_trade.reshape(shape), axis=1), np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average_fill_price = notional / volume_traded
+        avg_fill_pnl = profit_loss / (profitable_trades + loss_making_trades)
+
+    returning_fill_historical_metrics_dict = {}
+    for column, timeframe_name in enumerate(TIMEFRAMES):
+        returning_fill_historical_metrics_dict[timeframe_name] = [{
+            "instrument_id": instrument,
+            "volume_traded": float(volume_traded[row, column]),
+            "average_fill_price": float(average_fill_price[row, column]),
+            "profit_loss": float(profit_loss[row, column]),
+            "fees_paid": float(fees_paid[row, column]),
+            "profitable_trades": int(profitable_trades[row, column]),
+            "loss_making_trades": int(loss_making_trades[row, column]),
+            "best_trade": float(best_trade[row, column]),
+            "worst_trade": float(worst_trade[row, column]),
+            "avg_fill_pnl": float(avg_fill_pnl[row, column]),
+        } for row, instrument in enumerate(instruments)]
+    return FillHistoricalMetrics(**returning_fill_historical_metrics_dict)
+
+
+if __name__ == '__main__':
+    # run as `python -m pyokx.fill_metrics`
+    import random
+    import time
+    import warnings
+
+    warnings.simplefilter('ignore', RuntimeWarning)  # the loop divides by zero for windows without fills
+
+
+    def loop_fill_historical_metrics(fills, reference_time):
+        # the former `analyze_transaction_history` loop
+        df = pd.DataFrame([fill.model_dump() for fill in fills])
+        df['fillSz'] = df['fillSz'].astype(float)
+        df['fillPx'] = df['fillPx'].astype(float)
+        df['fee'] = df['fee'].astype(float)
+        df['fillPnl'] = df['fillPnl'].astype(float)
+        df['fillTime'] = df['fillTime'].astype(int)
+        metrics = {}
+        for timeframe in TIMEFRAMES:
+            metrics[timeframe] = []
+            start_query_timestamp = get_timestamp_from_days_ago(days_ago=TIMEFRAMES[timeframe],
+                                                                reference_time=reference_time)
+            end_query_timestamp = get_timestamp_from_days_ago(reference_time=reference_time)
+            for instrument in df['instId'].unique():
+                instrument_df = df[df['instId'] == instrument]
+                instrument_df = instrument_df[(instrument_df['fillTime'] >= start_query_timestamp) & (
+                        instrument_df['fillTime'] <= end_query_timestamp)]
+                volume_traded = instrument_df['fillSz'].sum()
+                profit_loss = instrument_df['fillPnl'].sum()
+                profitable_trades = instrument_df[instrument_df['fillPnl'] > 0].shape[0]
+                loss_making_trades = instrument_df[instrument_df['fillPnl'] < 0].shape[0]
+                metrics[timeframe].append({
+                    "instrument_id": instrument,
+                    "volume_traded": volume_traded,
+                    "average_fill_price": (instrument_df['fillPx'] * instrument_df['fillSz']).sum() / volume_traded,
+                    "profit_loss": profit_loss,
+                    "fees_paid": instrument_df['fee'].sum(),
+                    "profitable_trades": profitable_trades,
+                    "loss_making_trades": loss_making_trades,
+                    "best_trade": instrument_df['fillPnl'].max(),
+                    "worst_trade": instrument_df['fillPnl'].min(),
+                    "avg_fill_pnl": profit_loss / (profitable_trades + loss_making_trades),
+                })
+        return FillHistoricalMetrics(**metrics)
+
+
+    n_fills, n_instruments = 100_000, 200
+    reference_time = datetime.now()
+    now = get_timestamp_from_days_ago(reference_time=reference_time)
+    # the last instruments only traded more than a week ago, so some windows have no fills
+    instruments = [f'COIN{i}-USDT-SWAP' for i in range(n_instruments)]
+    fills = []
+    for bill in range(n_fills):
+        instrument = random.randrange(n_instruments)
+        age = random.randrange(8 * 86_400_000 if instrument >= n_instruments - 5 else 0, 95 * 86_400_000)
+        fills.append(FillEntry(
+            side=random.choice(['buy', 'sell']), fillSz=str(random.randint(1, 50)),
+            fillPx=f'{random.uniform(0.5, 50000):.2f}', fee=f'{-random.uniform(0, 2):.4f}',
+            fillPnl=random.choice(['0', f'{random.uniform(-100, 100):.4f}']), ordId=str(bill), instType='SWAP',
+            instId=instruments[instrument], clOrdId='', posSide='net', billId=str(bill), fillTime=str(now - age),
+            execType='T', tradeId=str(bill), feeCcy='USDT', ts=str(now - age)))
+
+    start = time.perf_counter()
+    expected = loop_fill_historical_metrics(fills, reference_time)
+    loop_s = time.perf_counter() - start
+    start = time.perf_counter()
+    result = fill_historical_metrics(fills, reference_time)
+    vectorized_s = time.perf_counter() - start
+
+    for timeframe in TIMEFRAMES:
+        for entry, expected_entry in zip(getattr(result, timeframe), getattr(expected, timeframe), strict=True):
+            entry, expected_entry = entry.model_dump(), expected_entry.model_dump()
+            assert entry['instrument_id'] == expected_entry['instrument_id']
+            for field in ('profitable_trades', 'loss_making_trades'):
+                assert entry[field] == expected_entry[field], (timeframe, field, entry, expected_entry)
+            for field in ('volume_traded', 'average_fill_price', 'profit_loss', 'fees_paid', 'best_trade',
+                          'worst_trade', 'avg_fill_pnl'):
+                assert np.isclose(entry[field], expected_entry[field], rtol=1e-9, equal_nan=True), \
+                    (timeframe, field, entry, expected_entry)
+    print(f'{n_fills} fills, {n_instruments} instruments, {len(TIMEFRAMES)} timeframes: '
+          f'pandas loop {loop_s:.2f}s, vectorized {vectorized_s * 1000:.1f}ms ({loop_s / vectorized_s:.0f}x)')
@@ -0,0 +1,174 @@
+"""
+Incremental synchronization of the fill history.
+
+The slow polling service used to download the last 90 days of fills page by page every 30 seconds, almost all of them
+fills it already had. `FillSynchronizer` keeps a cursor per instType (the `billId` and `ts` of the newest fill synced)
+in Redis and requests only the fills newer than it: pages are requested from the newest fill backwards until the
+cursor is reached, so however long the service was down, the gap is backfilled. The cursor only moves once the fills
+up to it are published, an interrupted synchronization is requested again from the same cursor on the next cycle.
+
+Each cycle appends the new fills as one entry of `okx:rest@fill@deltas`, in the same transaction as the new cursor.
+Entries older than `FILL_HISTORY_DAYS` are trimmed from that stream. It is the durable history: on start the
+synchronizer rebuilds its fills from it, and a cursor without the fills behind it (e.g. a flushed stream) is dropped,
+which makes the next cycle request the whole window again. `okx:rest@fill@3months` keeps its contract, its single
+entry is the whole history of the last `FILL_HISTORY_DAYS` days, republished whenever fills were added or aged out.
+
+Usage:
+    new_fills = await fill_sync.sync(async_redis, ['FUTURES', 'SWAP'])
+    fill_history = fill_sync.history()  # the fills of the last FILL_HISTORY_DAYS days, newest first
+"""
+import json
+import os
+from typing import Dict, List, Optional
+
+import aioredis
+
+from pyokx import tradeAPI
+from pyokx.data_structures import FillEntry
+from pyokx.low_rest_api.decoding import decode_models
+from pyokx.low_rest_api.exceptions import OkxRequestException
+from redis_tools.utils import serialize_for_redis, deserialize_from_redis
+from shared import logging
+from shared.tmp_shared import get_timestamp_from_days_ago
+
+logger = logging.setup_logger(__name__)
+
+FILL_HISTORY_STREAM = 'okx:rest@fill@3months'
+FILL_DELTAS_STREAM = 'okx:rest@fill@deltas'
+FILL_SYNC_CURSOR_KEY = 'okx:fill_sync@cursor'
+FILL_HISTORY_DAYS = int(os.getenv('FILL_HISTORY_DAYS', 90))  # the fills-history endpoint covers the last 3 months
+FILLS_PAGE_LIMIT = 100
+
+
+class FillSynchronizer:
+    """Fill history kept in sync with OKX through a persisted cursor, see the module docstring."""
+
+    def __init__(self, trade_api=tradeAPI, stream: str = FILL_HISTORY_STREAM, deltas_stream: str = FILL_DELTAS_STREAM,
+                 cursor_key: str = FILL_SYNC_CURSOR_KEY, days: int = FILL_HISTORY_DAYS):
+        self.trade_api = trade_api
+        self.stream = stream
+        self.deltas_stream = deltas_stream
+        self.cursor_key = cursor_key
+        self.days = days
+        self.fills: Dict[str, FillEntry] = {}  # billId -> fill
+        self.cursors: Dict[str, dict] = {}  # instType -> {'billId': ..., 'ts': ...}
+        self.loaded = False
+        self.history_changed = True  # the history stream has to be republished
+        self.stats = {'requests': 0, 'fills_synced': 0}
+
+    async def load(self, async_redis: aioredis.Redis):
+        """Rebuilds the fills and cursors from Redis."""
+        deltas = await async_redis.xrange(self.deltas_stream)
+        for _, message in deltas:
+            if message.get('data'):
+                self._add(FillEntry(**fill) for fill in deserialize_from_redis(message['data']))
+        if not deltas:
+            # Before the deltas were kept, the latest history entry was the only copy of the fills
+            latest = await async_redis.xrevrange(self.stream, count=1)
+            if latest and latest[0][1].get('data'):
+                seeded = self._add(FillEntry(**fill) for fill in deserialize_from_redis(latest[0][1]['data']))
+                if seeded:
+                    await async_redis.xadd(self.deltas_stream, {'data': serialize_for_redis(seeded)})
+        cursors = await async_redis.hgetall(self.cursor_key)
+        self.cursors = {instType: json.loads(cursor) for instType, cursor in cursors.items()}
+        for instType, cursor in list(self.cursors.items()):
+            if cursor['billId'] not in self.fills:
+                logger.warning(f'Fill cursor of {instType} at {cursor} has no fills behind it, synchronizing the last '
+                               f'{self.days} days again')
+                del self.cursors[instType]
+        # Histories published without a cursor (before it was persisted) continue from their newest fill
+        persisted = set(self.cursors)
+        for fill in self.fills.values():
+            cursor = self.cursors.get(fill.instType)
+            if fill.instType not in persisted and (cursor is None or int(fill.billId) > int(cursor['billId'])):
+                self.cursors[fill.instType] = {'billId': fill.billId, 'ts': fill.ts}
+        self.loaded = True
+        logger.info(f'Loaded {len(self.fills)} fills, cursors: {self.cursors}')
+
+    def _add(self, fills) -> List[FillEntry]:
+        added = []
+        for fill in fills:
+            if fill.billId not in self.fills:
+                self.fills[fill.billId] = fill
+                added.append(fill)
+        return added
+
+    async def fetch_since(self, instType: str, cursor: Optional[dict]) -> List[FillEntry]:
+        """
+        The fills of `instType` newer than `cursor` (or of the last `days` days without one), newest first.
+
+        :raises OkxRequestException: If a page could not be requested, so no gap is left behind the new cursor.
+        """
+        begin = get_timestamp_from_days_ago(days_ago=self.days)
+        if cursor:
+            begin = max(begin, int(cursor['ts']) - 1)  # fills in the millisecond of the cursor are filtered by billId
+        cursor_bill_id = int(cursor['billId']) if cursor else 0
+        after = ''
+        fills = []
+        while True:
+            self.stats['requests'] += 1
+            fills_response = await self.trade_api.get_fills_history(instType=instType, after=after,
+                                                                    limit=FILLS_PAGE_LIMIT, begin=begin)
+            if fills_response.get('code') != '0':
+                raise OkxRequestException(f'get_fills_history of {instType} after {after!r} failed: '
+                                          f'{fills_response.get("code")} {fills_response.get("msg")}')
+            page = fills_response['data']
+            newer = [fill for fill in page if int(fill['billId']) > cursor_bill_id]
+            fills.extend(newer)
+            if len(newer) < len(page) or len(page) < FILLS_PAGE_LIMIT or int(page[-1]['ts']) < begin:
+                break  # reached the cursor or the start of the window
+            after = page[-1]['billId']
+        return decode_models(fills, FillEntry)
+
+    async def sync(self, async_redis: aioredis.Redis, instTypes: List[str]) -> List[FillEntry]:
+        """Requests, publishes and returns the fills newer than the cursors, newest first."""
+        if not self.loaded:
+            await self.load(async_redis)
+        new_fills = []
+        cursors = {}
+        for instType in instTypes:
+            fetched = [fill for fill in await self.fetch_since(instType, self.cursors.get(instType))
+                       if fill.billId not in self.fills]
+            if fetched:
+                newest = max(fetched, key=lambda fill: int(fill.billId))
+                cursors[instType] = {'billId': newest.billId, 'ts': newest.ts}
+                new_fills.extend(fetched)
+        if new_fills:
+            new_fills.sort(key=lambda fill: int(fill.billId), reverse=True)
+            pipeline = async_redis.pipeline(transaction=True)
+            pipeline.xadd(self.deltas_stream, {'data': serialize_for_redis(new_fills)})
+            pipeline.hset(self.cursor_key, mapping={instType: json.dumps(cursor) for instType, cursor in
+                                                    cursors.items()})
+            pipeline.execute_command('XTRIM', self.deltas_stream, 'MINID', '~',
+                                     get_timestamp_from_days_ago(self.days))
+            await pipeline.execute()
+            self._add(new_fills)
+            self.cursors.update(cursors)
+            self.stats['fills_synced'] += len(new_fills)
+            self.history_changed = True
+            logger.info(f'Synchronized {len(new_fills)} new fills, cursors: {cursors}')
+        if self._prune():
+            self.history_changed = True
+        if self.history_changed:
+            await async_redis.xadd(self.stream, {'data': serialize_for_redis(self.history())}, maxlen=1)
+            self.history_changed = False
+        return new_fills
+
+    def _prune(self) -> int:
+        start = get_timestamp_from_days_ago(days_ago=self.days)
+        pruned = 0
+        for billId in [billId for billId, fill in self.fills.items() if int(fill.ts) < start]:
+            if all(cursor['billId'] != billId for cursor in self.cursors.values()):
+                del self.fills[billId]
+                pruned += 1
+        return pruned
+
+    def history(self, days: int = None) -> List[FillEntry]:
+        """The fills of the last `days` (default all the synchronized ones), newest first."""
+        start = get_timestamp_from_days_ago(days_ago=days if days is not None else self.days)
+        return sorted((fill for fill in self.fills.values() if int(fill.ts) >= start),
+                      key=lambda fill: int(fill.billId), reverse=True)
+
+
+# Shared by the slow polling service of the process
+fill_sync = FillSynchronizer()
@@ -0,0 +1,156 @@
+"""
+Per-instrument profiles of the instrument definition, parsed once for signal validation and sizing.
+
+Validating a signal used to read and decode the whole instrument map published by the slow polling service
+(`okx:rest@instruments`) to find one instrument, twice more for the token checks of the webhook, and the sizing parsed
+the contract value and size limits from their string fields every time. An `InstrumentProfile` holds the numeric
+`ctVal`, `lotSz`, `tickSz`, `minSz`, `maxLmtSz`, `maxMktSz` and `lever`, the expiry and the enforced margin mode and
+position side, so validating and sizing a signal is arithmetic on cached values.
+
+`InstrumentProfileCache` keeps the id of the instruments stream entry it decoded. At most every
+`INSTRUMENT_PROFILE_CHECK_INTERVAL` seconds it asks Redis for a newer entry only (an exclusive range from that id, an
+empty reply while nothing was published). A newer entry replaces the map, and only the profiles of the instruments whose
+definition changed are rebuilt, lazily on their next lookup. Without any entry in Redis the instruments are requested
+from OKX, as `get_instruments_searcher_from_redis` does.
+
+Usage:
+    profile = await instrument_profiles.get(async_redis, 'BTC-USDT-SWAP')
+    contracts = profile.usd_to_contracts(usd_amount=100, last_price=43000.0, leverage=5)
+"""
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+
+import aioredis
+from pydantic import BaseModel
+
+from pyokx import ENFORCED_INSTRUMENT_TYPES, ENFORCED_TD_MODE, ENFORCED_POS_SIDE_TYPE
+from pyokx.InstrumentSearcher import InstrumentSearcher
+from pyokx.data_structures import Instrument
+from redis_tools.utils import deserialize_from_redis
+
+INSTRUMENTS_STREAM = 'okx:rest@instruments'
+INSTRUMENT_PROFILE_CHECK_INTERVAL = float(os.getenv('INSTRUMENT_PROFILE_CHECK_INTERVAL', 5))  # seconds
+
+
+def _number(value: str, default: float = 0.0) -> float:
+    """OKX sends '' for the limits that do not apply to an instrument."""
+    return float(value) if value not in (None, '') else default
+
+
+class InstrumentProfile:
+    """The parsed definition of one instrument, see the module docstring."""
+    __slots__ = ('instrument', 'instId', 'instType', 'ctVal', 'ctValCcy', 'lotSz', 'tickSz', 'minSz', 'maxLmtSz',
+                 'maxMktSz', 'lever', 'expTime', 'tdMode', 'posSide')
+
+    def __init__(self, instrument: Instrument, tdMode: str = ENFORCED_TD_MODE, posSide: str = ENFORCED_POS_SIDE_TYPE):
+        self.instrument = instrument
+        self.instId = instrument.instId
+        self.instType = instrument.instType
+        self.ctVal = _number(instrument.ctVal)
+        self.ctValCcy = instrument.ctValCcy
+        self.lotSz = _number(instrument.lotSz)
+        self.tickSz = _number(instrument.tickSz)
+        self.minSz = _number(instrument.minSz)
+        self.maxLmtSz = _number(instrument.maxLmtSz, float('inf'))
+        self.maxMktSz = _number(instrument.maxMktSz, float('inf'))
+        self.lever = int(_number(instrument.lever))
+        self.expTime = int(instrument.expTime) if instrument.expTime else None  # ms, None for perpetuals
+        self.tdMode = tdMode
+        self.posSide = posSide
+
+    def expired(self, now_ms: int = None) -> bool:
+        if self.expTime is None:
+            return False
+        return self.expTime < (now_ms if now_ms is not None else int(time.time() * 1000))
+
+    def usd_to_contracts(self, usd_amount: float, last_price: float, leverage: int, usd_base_ratio: float = 1) -> int:
+        """
+        Whole contracts `usd_amount` buys at `last_price` with `leverage`, as `ccy_usd_to_contracts` computes them.
+
+        :raises ValueError: If the contracts are fewer than `minSz` or more than `maxMktSz`.
+        """
+        if self.ctValCcy == 'USD':
+            cost_of_one_contract_in_usd = self.ctVal
+            base_equivalent = usd_amount
+        else:
+            cost_of_one_contract_in_usd = self.ctVal * last_price
+            base_equivalent = usd_amount * usd_base_ratio
+        leveraged_cost_of_one_contract_usd = cost_of_one_contract_in_usd / (leverage or 1)
+
+        contracts = int(base_equivalent / leveraged_cost_of_one_contract_usd)  # round down to whole contracts
+        if contracts < self.minSz:
+            raise ValueError(f"USD equivalent of {usd_amount} is not enough to buy the minimum quantity of "
+                             f"{self.minSz} contracts of {self.instId} at {last_price} with {leverage} leverage. The "
+                             f"minimum cost is {self.minSz * leveraged_cost_of_one_contract_usd} USDT")
+        if contracts > self.maxMktSz:
+            raise ValueError(f"USD equivalent of {usd_amount} is too much to buy the maximum quantity of "
+                             f"{self.maxMktSz} contracts of {self.instId} at {last_price} with {leverage} leverage. "
+                             f"The maximum cost is {self.maxMktSz * leveraged_cost_of_one_contract_usd} USDT")
+        return contracts
+
+    def __repr__(self):
+        return (f'InstrumentProfile({self.instId}, ctVal={self.ctVal} {self.ctValCcy}, lotSz={self.lotSz}, '
+                f'tickSz={self.tickSz}, minSz={self.minSz}, maxMktSz={self.maxMktSz}, lever={self.lever})')
+
+
+class InstrumentProfileCache:
+    """Profiles of the published instruments, refreshed when the instrument definitions change."""
+
+    def __init__(self, stream: str = INSTRUMENTS_STREAM, check_interval: float = INSTRUMENT_PROFILE_CHECK_INTERVAL):
+        self.stream = stream
+        self.check_interval = check_interval
+        self.stream_id: Optional[str] = None  # instruments entry the definitions were taken from
+        self.definitions: Dict[str, dict] = {}
+        self.profiles: Dict[str, InstrumentProfile] = {}
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {'entries_loaded': 0, 'profiles_built': 0}
+
+    def _load(self, instrument_map: dict):
+        definitions = {instId: instrument.model_dump() if isinstance(instrument, BaseModel) else instrument
+                       for instId, instrument in instrument_map.items()}
+        for instId in list(self.profiles):
+            if definitions.get(instId) != self.definitions.get(instId):
+                del self.profiles[instId]  # rebuilt on its next lookup
+        self.definitions = definitions
+        self.stats['entries_loaded'] += 1
+
+    async def refresh(self, async_redis: aioredis.Redis, force: bool = False):
+        """Loads the instruments entry published since the last check, if any."""
+        if not force and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        async with self._lock:
+            if not force and time.monotonic() - self._checked_at < self.check_interval:
+                return  # refreshed by a concurrent lookup meanwhile
+            newer = await async_redis.xrevrange(self.stream, min=f'({self.stream_id}' if self.stream_id else '-',
+                                                count=1)
+            if newer:
+                stream_id, message = newer[0]
+                if message.get('data'):
+                    self._load(deserialize_from_redis(message['data']))
+                    self.stream_id = stream_id
+                else:
+                    print(f"A message in the instruments stream {self.stream} with id {stream_id} was empty")
+            if not self.definitions:
+                print(f"no instruments in cache, requesting the instruments of {ENFORCED_INSTRUMENT_TYPES}")
+                okx_instrument_searcher = InstrumentSearcher(instTypes=ENFORCED_INSTRUMENT_TYPES)
+                self._load(await okx_instrument_searcher.update_instruments())
+            self._checked_at = time.monotonic()
+
+    async def get(self, async_redis: aioredis.Redis, instId: str) -> Optional[InstrumentProfile]:
+        """The profile of `instId`, None when there is no such instrument."""
+        await self.refresh(async_redis)
+        profile = self.profiles.get(instId)
+        if profile is None:
+            definition = self.definitions.get(instId)
+            if definition is None:
+                return None
+            profile = self.profiles[instId] = InstrumentProfile(Instrument(**definition))
+            self.stats['profiles_built'] += 1
+        return profile
+
+
+# Shared by the signal path and the webhook token checks of the process
+instrument_profiles = InstrumentProfileCache()
@@ -0,0 +1,137 @@
+"""
+Local order books maintained from the websocket `books` channel, for signal-time limit pricing.
+
+The websocket service subscribes to the `books` channel (400 levels: a snapshot, then incremental updates every 100ms)
+of every instrument in `ORDER_BOOK_INSTRUMENTS` (comma separated instIds, see env_example, both the websocket and
+the REST service read it). `LocalOrderBooks` applies each message to its book and verifies the book against the CRC32
+checksum OKX sends with it (top 25 levels). A verified book is published to the Redis stream `okx:books@<instId>`, at
+most once per `LOCAL_ORDER_BOOK_PUBLISH_INTERVAL` seconds: the updates in between are published together, with the
+book as it is at the end of the interval. A mismatch (missed or out-of-order message) discards the book, removes it
+from Redis and resubscribes, so a fresh snapshot rebuilds it and readers never see a corrupted book in the meantime.
+
+The REST service reads the latest published book with `get_local_order_book`, a Redis lookup instead of an OKX round
+trip. It returns None when the book is missing or was not refreshed for `LOCAL_ORDER_BOOK_MAX_AGE` seconds (e.g. the
+websocket service is down), callers then fall back to the REST order book. Instruments outside
+`ORDER_BOOK_INSTRUMENTS` have no local book, they go to the REST order book without the Redis lookup.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, Optional, Union
+
+import aioredis
+
+from pyokx.columnar_snapshot import ColumnarOrderbookSnapshot
+from pyokx.data_structures import Orderbook_Snapshot
+from pyokx.okx_market_maker.market_data_service.WssMarketDataService import on_orderbook_snapshot_or_update
+from pyokx.okx_market_maker.market_data_service.model.OrderBook import OrderBook
+from redis_tools.utils import serialize_for_redis, deserialize_from_redis
+from shared.logging import setup_logger
+
+logger = setup_logger(__name__)
+
+LOCAL_ORDER_BOOK_CHANNEL = 'books'
+LOCAL_ORDER_BOOK_MAX_AGE = float(os.getenv('LOCAL_ORDER_BOOK_MAX_AGE', 10))  # seconds
+LOCAL_ORDER_BOOK_PUBLISH_INTERVAL = float(os.getenv('LOCAL_ORDER_BOOK_PUBLISH_INTERVAL', 0.5))  # seconds
+LOCAL_ORDER_BOOK_STREAM_MAX_LEN = 10
+ORDER_BOOK_INSTRUMENTS = [instId.strip().upper() for instId in os.getenv('ORDER_BOOK_INSTRUMENTS', '').split(',')
+                          if instId.strip()]
+
+
+def local_order_book_stream(instId: str) -> str:
+    return f'okx:books@{instId}'
+
+
+def order_book_to_array(book: OrderBook) -> dict:
+    """The book in the shape of the REST `/market/books` data (levels as [price, quantity, '0', order count])."""
+    return {
+        'instId': book.inst_id,
+        'ts': str(book.timestamp),
+        'asks': [[level.price_string, level.quantity_string, '0', level.order_count_string] for level in book._asks],
+        'bids': [[level.price_string, level.quantity_string, '0', level.order_count_string] for level in book._bids],
+    }
+
+
+class LocalOrderBooks:
+    """Checksum-verified books of the websocket service, published to Redis at a bounded rate."""
+
+    def __init__(self, publish_interval: float = LOCAL_ORDER_BOOK_PUBLISH_INTERVAL):
+        self.books: Dict[str, OrderBook] = {}
+        self.publish_interval = publish_interval
+        self._published_at: Dict[str, float] = {}  # instId -> monotonic time of its last publish
+        self._pending: Dict[str, asyncio.Task] = {}  # instId -> publish scheduled for the end of the interval
+        self.stats = {'updates': 0, 'checksum_failures': 0, 'published': 0}
+
+    async def on_message(self, message_json: dict, async_redis: aioredis.Redis, resubscribe=None):
+        """
+        Applies a `books` channel message. `resubscribe` is an async callable taking the channel arg, called after a
+        checksum mismatch so OKX sends a new snapshot.
+        """
+        arg = message_json.get('arg')
+        instId = arg.get('instId')
+        if message_json.get('action') == 'update' and instId not in self.books:
+            return  # waiting for the snapshot that follows a resubscription
+
+        if message_json.get('action') == 'snapshot':
+            self.books.pop(instId, None)
+        book = on_orderbook_snapshot_or_update(message_json, self.books)
+        self.stats['updates'] += 1
+        if not book.do_check_sum():
+            self.stats['checksum_failures'] += 1
+            logger.warning(f'Order book checksum mismatch for {instId}, discarding it and resubscribing')
+            self.books.pop(instId, None)
+            pending = self._pending.pop(instId, None)
+            if pending is not None:
+                pending.cancel()
+            await async_redis.delete(local_order_book_stream(instId))
+            if resubscribe is not None:
+                await resubscribe({'channel': arg.get('channel'), 'instId': instId})
+            return
+
+        if instId in self._pending:
+            return  # published with the scheduled publish
+        wait = self._published_at.get(instId, float('-inf')) + self.publish_interval - time.monotonic()
+        if wait <= 0:
+            await self._publish(instId, async_redis)
+        else:
+            self._pending[instId] = asyncio.create_task(self._publish_later(instId, async_redis, wait))
+
+    async def _publish(self, instId: str, async_redis: aioredis.Redis):
+        book = self.books.get(instId)
+        if book is None:
+            return  # discarded after a checksum mismatch
+        self._published_at[instId] = time.monotonic()
+        self.stats['published'] += 1
+        await async_redis.xadd(local_order_book_stream(instId), {'data': serialize_for_redis(order_book_to_array(book))},
+                               maxlen=LOCAL_ORDER_BOOK_STREAM_MAX_LEN)
+
+    async def _publish_later(self, instId: str, async_redis: aioredis.Redis, wait: float):
+        await asyncio.sleep(wait)
+        del self._pending[instId]
+        try:
+            await self._publish(instId, async_redis)
+        except Exception as e:
+            logger.warning(f'Could not publish the local order book of {instId}: {e}')
+
+
+async def get_local_order_book(async_redis: aioredis.Redis, instId: str, depth: int = 400,
+                               max_age: float = LOCAL_ORDER_BOOK_MAX_AGE, columnar: bool = False
+                               ) -> Optional[Union[Orderbook_Snapshot, ColumnarOrderbookSnapshot]]:
+    """
+    The latest verified book of `instId` (best `depth` levels per side), None if missing, stale or not in
+    `ORDER_BOOK_INSTRUMENTS`. `columnar` returns it as a `ColumnarOrderbookSnapshot`.
+    """
+    if instId.upper() not in ORDER_BOOK_INSTRUMENTS:
+        return None
+    messages = await async_redis.xrevrange(local_order_book_stream(instId), count=1)
+    if not messages:
+        return None
+    redis_stream_id, message = messages[0]
+    published_at = int(redis_stream_id.split('-')[0]) / 1000  # stream ids start with the publish time in ms
+    if time.time() - published_at > max_age:
+        logger.warning(f'Local order book of {instId} is {time.time() - published_at:.1f}s old, not using it')
+        return None
+    book = deserialize_from_redis(message.get('data'))
+    snapshot_type = ColumnarOrderbookSnapshot if columnar else Orderbook_Snapshot
+    return snapshot_type.from_array(instId=instId, depth=depth, asks=book['asks'][:depth],
+                                         bids=book['bids'][:depth], ts=book['ts'])
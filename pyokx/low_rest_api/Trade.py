@@ -5,8 +5,8 @@ from .consts import *
 class TradeAPI(Client):
 
     def __init__(self, api_key='-1', api_secret_key='-1', passphrase='-1', use_server_time=False, flag='1',
-                 domain='https://www.okx.com', debug=True):
-        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag, domain, debug)
+                 domain='https://www.okx.com', debug=True, **kwargs):
+        Client.__init__(self, api_key, api_secret_key, passphrase, use_server_time, flag, domain, debug, **kwargs)
 
     # Place Order
     def place_order(self, instId, tdMode, side, ordType, sz, ccy='', clOrdId='', tag='', posSide='', px='',
@@ -79,9 +79,7 @@ class TradeAPI(Client):
         return self._request_with_params(POST, AMEND_BATCH_ORDER, orders_data)
 
     # Close Positions
-
-
-    async def close_positions(self, instId, mgnMode, posSide='', ccy='', autoCxl='', clOrdId='', tag=''):
+    def close_positions(self, instId, mgnMode, posSide='', ccy='', autoCxl='', clOrdId='', tag=''):
         """
         Closes a position based on the given parameters.
 
@@ -99,12 +97,12 @@ class TradeAPI(Client):
         :type clOrdId: str, optional
         :param tag: A tag for the position. Defaults to an empty string.
         :type tag: str, optional
-        :returns: The response from the position close request.
+        :returns: The response from the position close request (awaitable when the client uses the async
+            transport).
         """
         params = {'instId': instId, 'mgnMode': mgnMode, 'posSide': posSide, 'ccy': ccy, 'autoCxl': autoCxl,
                   'clOrdId': clOrdId, 'tag': tag}
-        closed_position_return = self._request_with_params(POST, CLOSE_POSITION, params)
-        return closed_position_return
+        return self._request_with_params(POST, CLOSE_POSITION, params)
 
     # Get Order Details
     def get_order(self, instId, ordId='', clOrdId=''):
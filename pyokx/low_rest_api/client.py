@@ -1,54 +1,178 @@
-import json
+import time
 
 import httpx
 
 from . import consts as c, utils, exceptions
+from .clock_sync import get_server_clock, stop_server_clocks
+from .coalescing import is_coalescable, read_coalescer
+from .decoding import decode_body
+from .hedging import get_hedger, is_hedgeable
+from .metrics import request_metrics
+from .rate_limit import is_rate_limited
+
+_async_transports = {}
+
+
+def get_async_transport(base_api=c.API_URL):
+    """
+    Returns the long-lived `httpx.AsyncClient` shared by every async API client pointed at `base_api`.
+
+    A single bounded keep-alive pool per host lets concurrent callers (webhooks, pollers) overlap their network waits
+    while reusing warm TCP/TLS connections instead of opening one per request.
+    """
+    transport = _async_transports.get(base_api)
+    if transport is None or transport.is_closed:
+        transport = httpx.AsyncClient(
+            base_url=base_api, http2=False,
+            limits=httpx.Limits(max_connections=c.ASYNC_POOL_MAX_CONNECTIONS,
+                                max_keepalive_connections=c.ASYNC_POOL_MAX_KEEPALIVE_CONNECTIONS,
+                                keepalive_expiry=c.ASYNC_POOL_KEEPALIVE_EXPIRY),
+            timeout=c.ASYNC_REQUEST_TIMEOUT)
+        _async_transports[base_api] = transport
+    return transport
+
+
+async def close_async_transports():
+    """Closes every pooled async transport, meant to be awaited on application shutdown."""
+    await stop_server_clocks()
+    for transport in list(_async_transports.values()):
+        await transport.aclose()
+    _async_transports.clear()
 
 
 class Client(object):
 
-    def __init__(self, api_key = '-1', api_secret_key = '-1', passphrase = '-1', use_server_time=False, flag='1', base_api = c.API_URL,debug = 'True'):
+    def __init__(self, api_key = '-1', api_secret_key = '-1', passphrase = '-1', use_server_time=False, flag='1', base_api = c.API_URL,debug = 'True', use_async=False,
+                 rate_limiter=None, coalesce_reads=True, server_clock=None, hedge_reads=False):
         self.API_KEY = api_key
         self.API_SECRET_KEY = api_secret_key
         self.PASSPHRASE = passphrase
         self.use_server_time = use_server_time
+        # server-aligned timestamps come from a background-synced clock instead of a time request per call
+        self.server_clock = server_clock or (get_server_clock(base_api) if use_server_time else None)
         self.flag = flag
         self.domain = base_api
         self.debug = debug
-        self.client = httpx.Client(base_url=base_api, http2=False)
+        self.signer = utils.RequestSigner(api_key, api_secret_key, passphrase, flag) if api_key != '-1' else None
+        self.use_async = use_async
+        self.rate_limiter = rate_limiter
+        # identical concurrent public GETs share one in-flight call (async transport only)
+        self.coalescer = read_coalescer if use_async and coalesce_reads else None
+        # slow reads are duplicated to the alternate (AWS) host, first answer wins (async transport only)
+        self.hedger = get_hedger(base_api) if use_async and hedge_reads else None
+        if use_async:
+            self.client = get_async_transport(base_api)
+        else:
+            self.client = httpx.Client(base_url=base_api, http2=False)
 
-    def _request(self, method, request_path, params):
+    def _prepare_request(self, method, request_path, params, timestamp):
         if method == c.GET:
             request_path = request_path + utils.parse_params_to_str(params)
-        timestamp = utils.get_timestamp()
-        if self.use_server_time:
-            timestamp = self._get_timestamp()
-        body = json.dumps(params) if method == c.POST else ""
-        if self.API_KEY != '-1':
-            sign = utils.sign(utils.pre_hash(timestamp, method, request_path, str(body), self.debug), self.API_SECRET_KEY)
-            header = utils.get_header(self.API_KEY, sign, timestamp, self.PASSPHRASE, self.flag, self.debug)
+        body = utils.encode_body(params) if method == c.POST else ""
+        if self.signer is not None:
+            header = self.signer.get_header(timestamp, method, request_path, body)
+            if self.debug == True:
+                print('body: ', body)
+                print('header: ', header)
         else:
             header = utils.get_header_no_sign(self.flag, self.debug)
-        response = None
         if self.debug == True:
             print('domain:',self.domain)
             print('url:',request_path)
-        if method == c.GET:
-            response = self.client.get(request_path, headers=header)
-        elif method == c.POST:
-            response = self.client.post(request_path, data=body, headers=header)
-        return response.json()
+        return request_path, body, header
+
+    def _request(self, method, request_path, params):
+        if self.use_async:
+            return self._request_async(method, request_path, params)
+        for attempt in range(c.RATE_LIMIT_MAX_RETRIES + 1):
+            if self.rate_limiter is not None:
+                waited = self.rate_limiter.acquire_blocking(method, request_path, params, self.API_KEY)
+                request_metrics.observe_rate_limit_wait(method, request_path, waited)
+            if self.use_server_time:
+                if self.server_clock.is_stale() and not self.server_clock.backing_off():
+                    self.server_clock.sync_blocking(self.client)
+                timestamp = utils.get_timestamp(self.server_clock.offset())
+            else:
+                timestamp = utils.get_timestamp()
+            signed_path, body, header = self._prepare_request(method, request_path, params, timestamp)
+            response = None
+            start = time.perf_counter()
+            try:
+                if method == c.GET:
+                    response = self.client.get(signed_path, headers=header)
+                elif method == c.POST:
+                    response = self.client.post(signed_path, data=body, headers=header)
+                response_json = decode_body(response.content)
+            except Exception as e:
+                request_metrics.observe_error(method, request_path, time.perf_counter() - start, e)
+                raise
+            request_metrics.observe_response(method, request_path, time.perf_counter() - start,
+                                             response.status_code, response_json)
+            if not self._should_retry_rate_limited(method, request_path, params, response, response_json, attempt):
+                return response_json
+
+    async def _request_async(self, method, request_path, params):
+        if self.coalescer is not None and is_coalescable(method, request_path):
+            key = (self.domain, self.flag, self.API_KEY, request_path + utils.parse_params_to_str(params))
+            return await self.coalescer.do(key, lambda: self._dispatch_async(method, request_path, params))
+        return await self._dispatch_async(method, request_path, params)
+
+    async def _dispatch_async(self, method, request_path, params):
+        if self.hedger is None or not is_hedgeable(method, request_path):
+            return await self._send_async(method, request_path, params)
+        return await self.hedger.request(
+            request_path,
+            lambda transport=None: self._send_async(method, request_path, params, transport),
+            get_async_transport(self.hedger.alternate_api),
+            can_hedge=lambda: self.rate_limiter is None or self.rate_limiter.has_capacity(
+                method, request_path, params, self.API_KEY))
+
+    async def _send_async(self, method, request_path, params, transport=None):
+        transport = transport or self.client
+        for attempt in range(c.RATE_LIMIT_MAX_RETRIES + 1):
+            if self.rate_limiter is not None:
+                waited = await self.rate_limiter.acquire(method, request_path, params, self.API_KEY)
+                request_metrics.observe_rate_limit_wait(method, request_path, waited)
+            if self.use_server_time:
+                await self.server_clock.ensure_synced(self.client)
+                self.server_clock.start()
+                timestamp = utils.get_timestamp(self.server_clock.offset())
+            else:
+                timestamp = utils.get_timestamp()
+            signed_path, body, header = self._prepare_request(method, request_path, params, timestamp)
+            response = None
+            start = time.perf_counter()
+            try:
+                if method == c.GET:
+                    response = await transport.get(signed_path, headers=header)
+                elif method == c.POST:
+                    response = await transport.post(signed_path, content=body, headers=header)
+                response_json = decode_body(response.content)
+            except Exception as e:
+                request_metrics.observe_error(method, request_path, time.perf_counter() - start, e)
+                raise
+            request_metrics.observe_response(method, request_path, time.perf_counter() - start,
+                                             response.status_code, response_json)
+            if not self._should_retry_rate_limited(method, request_path, params, response, response_json, attempt):
+                return response_json
+
+    def _should_retry_rate_limited(self, method, request_path, params, response, response_json, attempt):
+        """
+        Rejections for exceeding the rate limit are safe to resend since OKX did not act on them, so when limiting is
+        enabled the endpoint's bucket is backed off and the request retried up to `RATE_LIMIT_MAX_RETRIES` times.
+        """
+        if self.rate_limiter is None or attempt >= c.RATE_LIMIT_MAX_RETRIES:
+            return False
+        if not is_rate_limited(response.status_code, response_json):
+            return False
+        if self.debug == True:
+            print('rate limited, backing off:', method, request_path)
+        self.rate_limiter.penalize(method, request_path, params, self.API_KEY)
+        request_metrics.observe_retry(method, request_path)
+        return True
 
     def _request_without_params(self, method, request_path):
         return self._request(method, request_path, {})
 
     def _request_with_params(self, method, request_path, params):
         return self._request(method, request_path, params)
-
-    def _get_timestamp(self):
-        request_path = c.API_URL + c.SERVER_TIMESTAMP_URL
-        response = self.client.get(request_path)
-        if response.status_code == 200:
-            return response.json()['ts']
-        else:
-            return ""
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Local-to-OKX clock offset tracking.
+
+OKX rejects signed requests whose `OK-ACCESS-TIMESTAMP` is too far from its own clock, which is why the client can
+sign with server time (`use_server_time`). Rather than paying a `/api/v5/public/time` round trip before every signed
+request, `ServerClock` samples the server time in the background and estimates the offset NTP-style:
+
+    - each sync sends a short burst of time requests and keeps the sample with the smallest round trip (the one
+      least distorted by queuing delays), its offset being `server_time - (local_send + local_receive) / 2`
+    - the best sample of each burst is kept in a sliding window, a least-squares fit over the window gives the offset
+      at the latest sample and the drift of the local clock relative to OKX
+    - the error bound of the estimate is half the best round trip, plus the timestamp resolution, plus the residual
+      dispersion of the fit, plus a 15ppm frequency tolerance for every second since the last sample (as in NTP)
+
+`utils.get_timestamp(offset)` then produces server-aligned timestamps locally. The first signed requests share a
+single sync (`ensure_synced`), and after a sync in which every sample failed they sign with the local clock for
+`CLOCK_SYNC_RETRY_INTERVAL` seconds instead of sending another burst each.
+
+The estimate is shared by the whole process, the lock of `ensure_synced` and the background re-sync task belong to an
+event loop and are created lazily in each loop that uses the clock (e.g. a test loop, or a thread running its own).
+"""
+import asyncio
+import statistics
+import time
+import weakref
+from collections import deque
+
+import httpx
+
+from . import consts as c
+
+_server_clocks = {}
+
+
+class ServerClock(object):
+
+    def __init__(self, base_api=c.API_URL, sync_interval=c.CLOCK_SYNC_INTERVAL, burst_size=c.CLOCK_SYNC_BURST_SIZE,
+                 window_size=c.CLOCK_SYNC_WINDOW_SIZE):
+        self.base_api = base_api
+        self.sync_interval = sync_interval
+        self.burst_size = burst_size
+        self.samples = deque(maxlen=window_size)  # (local_time, offset, round_trip) best sample of each burst
+        self._offset = 0.0
+        self._drift = 0.0
+        self._dispersion = 0.0
+        self._reference_time = None
+        self._failed_at = None
+        self._locks = weakref.WeakKeyDictionary()  # event loop -> lock of ensure_synced
+        self._tasks = weakref.WeakKeyDictionary()  # event loop -> background re-sync task
+
+    # ---------------------------------------------------------------- estimate
+    @property
+    def synced(self):
+        return self._reference_time is not None
+
+    @property
+    def drift(self):
+        """Drift of the local clock relative to OKX, in seconds per second."""
+        return self._drift
+
+    def offset(self, now=None):
+        """Seconds to add to the local clock to get OKX server time, extrapolated with the estimated drift."""
+        if self._reference_time is None:
+            return 0.0
+        now = time.time() if now is None else now
+        return self._offset + self._drift * (now - self._reference_time)
+
+    def error_bound(self, now=None):
+        """Upper bound (seconds) on the error of `offset()`, infinite until the first sample is taken."""
+        if self._reference_time is None:
+            return float('inf')
+        now = time.time() if now is None else now
+        best_round_trip = min(round_trip for _, _, round_trip in self.samples)
+        age = max(0.0, now - self._reference_time)
+        return (best_round_trip / 2 + c.CLOCK_SYNC_RESOLUTION + self._dispersion
+                + c.CLOCK_SYNC_FREQUENCY_TOLERANCE * age)
+
+    def server_time(self):
+        """Current OKX server time estimate as epoch seconds."""
+        now = time.time()
+        return now + self.offset(now)
+
+    def is_stale(self):
+        return self._reference_time is None or time.time() - self._reference_time > self.sync_interval
+
+    def backing_off(self):
+        """Whether the last sync got no sample less than `CLOCK_SYNC_RETRY_INTERVAL` seconds ago."""
+        return self._failed_at is not None and time.monotonic() - self._failed_at < c.CLOCK_SYNC_RETRY_INTERVAL
+
+    def add_sample(self, local_send_time, server_time, round_trip):
+        """Feeds the best sample of a burst and re-fits offset and drift over the sample window."""
+        local_time = local_send_time + round_trip / 2
+        self.samples.append((local_time, server_time - local_time, round_trip))
+        self._fit()
+
+    def _fit(self):
+        local_times = [sample[0] for sample in self.samples]
+        offsets = [sample[1] for sample in self.samples]
+        latest_time = local_times[-1]
+        if len(self.samples) < 3 or latest_time - local_times[0] < self.sync_interval:
+            self._offset, self._drift, self._dispersion = offsets[-1], 0.0, 0.0
+            self._reference_time = latest_time
+            return
+        mean_time = statistics.fmean(local_times)
+        mean_offset = statistics.fmean(offsets)
+        variance = sum((t - mean_time) ** 2 for t in local_times)
+        drift = sum((t - mean_time) * (o - mean_offset) for t, o in zip(local_times, offsets)) / variance
+        residuals = [o - (mean_offset + drift * (t - mean_time)) for t, o in zip(local_times, offsets)]
+        self._drift = drift
+        self._offset = mean_offset + drift * (latest_time - mean_time)
+        self._dispersion = statistics.pstdev(residuals)
+        self._reference_time = latest_time
+
+    # ---------------------------------------------------------------- sampling
+    @staticmethod
+    def _parse_server_time(response):
+        return int(response.json()['data'][0]['ts']) / 1000
+
+    def _take_best(self, samples):
+        if samples:
+            self._failed_at = None
+            self.add_sample(*min(samples, key=lambda sample: sample[2]))
+        else:
+            self._failed_at = time.monotonic()
+
+    async def ensure_synced(self, transport=None):
+        """Syncs once if no sample was ever taken, concurrent callers waiting for the same sync."""
+        if self.synced or self.backing_off():
+            return
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        async with lock:
+            if not self.synced and not self.backing_off():
+                await self.sync(transport)
+
+    async def sync(self, transport=None):
+        """Takes one burst of time samples over the async transport."""
+        from .client import get_async_transport
+        transport = transport or get_async_transport(self.base_api)
+        samples = []
+        for _ in range(self.burst_size):
+            try:
+                local_send_time, start = time.time(), time.perf_counter()
+                response = await transport.get(c.SERVER_TIMESTAMP_URL)
+                round_trip = time.perf_counter() - start
+                samples.append((local_send_time, self._parse_server_time(response), round_trip))
+            except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+                print('clock sync sample failed:', e)
+        self._take_best(samples)
+
+    def sync_blocking(self, transport):
+        """Takes one burst of time samples over a blocking `httpx.Client`."""
+        samples = []
+        for _ in range(self.burst_size):
+            try:
+                local_send_time, start = time.time(), time.perf_counter()
+                response = transport.get(c.SERVER_TIMESTAMP_URL)
+                round_trip = time.perf_counter() - start
+                samples.append((local_send_time, self._parse_server_time(response), round_trip))
+            except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+                print('clock sync sample failed:', e)
+        self._take_best(samples)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+    def start(self):
+        """Starts re-syncing every `sync_interval` in the background of the running loop (no-op if already running)."""
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(loop)
+        if task is None or task.done():
+            task = self._tasks[loop] = loop.create_task(self._run())
+        return task
+
+    async def stop(self):
+        """Stops the background re-sync of the running loop."""
+        task = self._tasks.pop(asyncio.get_running_loop(), None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self):
+        return {
+            'offset_ms': self.offset() * 1000,
+            'drift_ppm': self._drift * 1e6,
+            'error_bound_ms': self.error_bound() * 1000,
+            'samples': len(self.samples),
+        }
+
+
+def get_server_clock(base_api=c.API_URL):
+    """Returns the process-wide `ServerClock` for `base_api`."""
+    clock = _server_clocks.get(base_api)
+    if clock is None:
+        clock = _server_clocks[base_api] = ServerClock(base_api)
+    return clock
+
+
+async def stop_server_clocks():
+    for clock in _server_clocks.values():
+        await clock.stop()
+
+
+if __name__ == '__main__':
+    async def main():
+        clock = get_server_clock()
+        await clock.sync()
+        print(clock.stats())
+
+
+    asyncio.run(main())
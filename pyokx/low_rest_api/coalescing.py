@@ -0,0 +1,112 @@
+"""
+Single-flight coalescing of identical in-flight REST reads.
+
+When several coroutines issue the same GET at the same moment (e.g. a burst of TradingView alerts each asking for the
+same ticker or order book) only the first one goes out on the wire; the rest await its result. This saves both the
+round trip and the rate-limit budget of the duplicates. Nothing is cached: once the shared call completes the next
+identical request goes to the exchange again.
+
+Only the public market data reads (`COALESCABLE_PREFIXES`) are coalesced. Private reads (positions, orders, account)
+are always sent: a caller reading an order or position right after changing it must not be handed the answer of a
+request that left before the change.
+"""
+import asyncio
+import copy
+
+from . import consts as c
+
+COALESCABLE_PREFIXES = ('/api/v5/market/', '/api/v5/public/')
+
+
+def is_coalescable(method, request_path):
+    return method == c.GET and request_path.startswith(COALESCABLE_PREFIXES)
+
+
+class _Flight(object):
+    __slots__ = ('future', 'waiters')
+
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 1
+
+
+class SingleFlight(object):
+    """
+    Runs at most one call per key at a time and shares its result with every concurrent caller of the same key.
+
+    Each caller is shielded from the others: cancelling one waiter does not cancel the shared call. Callers that shared
+    a flight get their own deep copy of the result so that one of them mutating the response cannot affect the rest,
+    uncontended calls return the response as is.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def do(self, key, call):
+        """
+        Returns the result of `call()` (a coroutine function), joining the in-flight call for `key` if there is one.
+
+        :param key: Hashable identity of the request, callers with equal keys share one call.
+        :param call: Zero-argument coroutine function performing the request.
+        """
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.hits += 1
+            flight.waiters += 1
+        else:
+            self.misses += 1
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._in_flight[key] = flight
+            flight.future.add_done_callback(lambda _: self._forget(key, flight))
+        result = await asyncio.shield(flight.future)
+        # every waiter has joined by the time the call completes, so `waiters` is final here
+        if flight.waiters > 1:
+            return copy.deepcopy(result)
+        return result
+
+    def _forget(self, key, flight):
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    def stats(self):
+        """Hit/miss counters, a hit being a request served by joining another caller's in-flight call."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'in_flight': len(self._in_flight),
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+# Shared by every async client in the process so that reads issued through different API objects coalesce too
+read_coalescer = SingleFlight()
+
+
+def get_coalescing_stats():
+    return read_coalescer.stats()
+
+
+if __name__ == '__main__':
+    async def main():
+        calls = 0
+
+        async def fake_ticker_request():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.1)
+            return {'code': '0', 'data': [{'instId': 'BTC-USDT-SWAP', 'last': '42000'}]}
+
+        flights = SingleFlight()
+        await asyncio.gather(*[flights.do(('GET', '/api/v5/market/ticker?instId=BTC-USDT-SWAP'), fake_ticker_request)
+                               for _ in range(10)])
+        print(f'10 concurrent requests, {calls} sent, {flights.stats()}')
+
+
+    asyncio.run(main())
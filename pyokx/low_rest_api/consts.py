@@ -1,5 +1,6 @@
 # http header
 API_URL = 'https://www.okx.com'
+AWS_API_URL = 'https://aws.okx.com'
 
 CONTENT_TYPE = 'Content-Type'
 OK_ACCESS_KEY = 'OK-ACCESS-KEY'
@@ -13,6 +14,32 @@ LOCALE = 'Locale='
 
 APPLICATION_JSON = 'application/json'
 
+# async transport, one bounded keep-alive pool per host
+ASYNC_POOL_MAX_CONNECTIONS = 50
+ASYNC_POOL_MAX_KEEPALIVE_CONNECTIONS = 20
+ASYNC_POOL_KEEPALIVE_EXPIRY = 30  # seconds
+ASYNC_REQUEST_TIMEOUT = 10  # seconds
+
+# rate limiting, see rate_limit.RATE_LIMITS for the per-endpoint table
+RATE_LIMIT_ERROR_CODE = '50011'
+RATE_LIMIT_MAX_RETRIES = 2
+RATE_LIMIT_BACKOFF = 1  # seconds the bucket is pushed back after a 50011/429 rejection
+
+# server clock sync, see clock_sync.ServerClock
+CLOCK_SYNC_INTERVAL = 60  # seconds between background syncs
+CLOCK_SYNC_BURST_SIZE = 4  # time requests per sync, the one with the shortest round trip is kept
+CLOCK_SYNC_WINDOW_SIZE = 16  # syncs used to fit offset and drift
+CLOCK_SYNC_RETRY_INTERVAL = 5  # seconds before a sync that got no sample is retried by a request
+CLOCK_SYNC_RESOLUTION = 0.001  # OKX server time has millisecond resolution
+CLOCK_SYNC_FREQUENCY_TOLERANCE = 15e-6  # NTP's PHI, error growth in seconds per second since the last sample
+
+# hedged reads, see hedging.Hedger
+HEDGE_PERCENTILE = 95  # primary-host latency percentile after which a read is duplicated to the alternate host
+HEDGE_LATENCY_WINDOW = 200  # latencies kept per endpoint
+HEDGE_MIN_SAMPLES = 20  # latencies needed before the percentile is trusted
+HEDGE_DEFAULT_DELAY = 0.3  # seconds, used until the endpoint has enough samples
+HEDGE_MIN_DELAY = 0.05  # seconds, floor so that a fast streak does not hedge everything
+
 GET = "GET"
 POST = "POST"
 
@@ -0,0 +1,148 @@
+"""
+Hedged GET requests across the OKX primary and AWS REST hosts.
+
+A read sent to the primary host that has not answered within the endpoint's recent latency percentile is duplicated
+to the alternate host; whichever answers first is used and the other request is cancelled. This trims the latency tail
+caused by a slow connection or a busy edge without doubling the load, since only the slowest few percent of reads are
+ever hedged.
+
+Only the idempotent market data, account and order-status reads in `HEDGEABLE_ENDPOINTS` are eligible, order-mutating
+endpoints are never hedged. The duplicate goes through the client's rate limiter like any other request, and is skipped
+altogether when the endpoint's bucket has no spare token. A hedged private read therefore never pushes the account
+past its per-UID limits, it only spends budget the account is not using.
+"""
+import asyncio
+import time
+from collections import deque
+
+from . import consts as c
+
+HEDGEABLE_ENDPOINTS = frozenset([
+    # market data
+    c.TICKER_INFO,
+    c.TICKERS_INFO,
+    c.ORDER_BOOKS,
+    c.GET_ORDER_LITE_BOOK,
+    c.MARKET_TRADES,
+    c.MARK_PRICE,
+    c.INSTRUMENT_INFO,
+    # account, read-only
+    c.POSITION_INFO,
+    c.ACCOUNT_INFO,
+    c.ACCOUNT_CONFIG,
+    c.GET_LEVERAGE,
+    c.MAX_TRADE_SIZE,
+    c.MAX_AVAIL_SIZE,
+    # trade, read-only
+    c.ORDER_INFO,
+    c.ORDERS_PENDING,
+    c.ORDERS_ALGO_OENDING,
+])
+
+ALTERNATE_HOSTS = {
+    c.API_URL: c.AWS_API_URL,
+    c.AWS_API_URL: c.API_URL,
+}
+
+
+def is_hedgeable(method, request_path):
+    return method == c.GET and request_path in HEDGEABLE_ENDPOINTS
+
+
+class LatencyTracker(object):
+    """Sliding window of recent response latencies per endpoint."""
+
+    def __init__(self, window_size=c.HEDGE_LATENCY_WINDOW):
+        self.window_size = window_size
+        self._latencies = {}
+
+    def record(self, request_path, latency):
+        window = self._latencies.get(request_path)
+        if window is None:
+            window = self._latencies[request_path] = deque(maxlen=self.window_size)
+        window.append(latency)
+
+    def percentile(self, request_path, percentile):
+        """Latency at `percentile` (0-100) for the endpoint, None until enough samples were recorded."""
+        window = self._latencies.get(request_path)
+        if not window or len(window) < c.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(window)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+class Hedger(object):
+
+    def __init__(self, alternate_api, percentile=c.HEDGE_PERCENTILE):
+        self.alternate_api = alternate_api
+        self.percentile = percentile
+        self.latencies = LatencyTracker()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self, request_path):
+        """How long to wait on the primary host before hedging, the endpoint's latency percentile once warmed up."""
+        delay = self.latencies.percentile(request_path, self.percentile)
+        if delay is None:
+            return c.HEDGE_DEFAULT_DELAY
+        return max(delay, c.HEDGE_MIN_DELAY)
+
+    async def request(self, request_path, send, alternate_transport, can_hedge=None):
+        """
+        Runs `send()` against the primary host and hedges it with `send(alternate_transport)` if it is slow.
+
+        :param request_path: Endpoint path, used for the latency statistics.
+        :param send: Coroutine function performing the request, taking an optional transport to send it through.
+        :param alternate_transport: Transport of the alternate host.
+        :param can_hedge: Optional callable, checked right before hedging (e.g. whether rate-limit budget is left).
+        """
+        self.requests += 1
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(send())
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay(request_path))
+        if done or (can_hedge is not None and not can_hedge()):
+            result = await primary
+            self.latencies.record(request_path, time.perf_counter() - start)
+            return result
+
+        self.hedges += 1
+        hedge = asyncio.ensure_future(send(alternate_transport))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Both may finish in the same round, a failure only counts once neither request succeeded
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded or not pending:
+                    task = succeeded[0] if succeeded else next(iter(done))
+                    if task is hedge:
+                        self.hedge_wins += 1
+                    self.latencies.record(request_path, time.perf_counter() - start)
+                    return task.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'hedge_ratio': self.hedges / self.requests if self.requests else 0.0,
+        }
+
+
+_hedgers = {}
+
+
+def get_hedger(base_api=c.API_URL):
+    """Returns the process-wide `Hedger` for `base_api`, None if no alternate host is known for it."""
+    alternate_api = ALTERNATE_HOSTS.get(base_api)
+    if alternate_api is None:
+        return None
+    hedger = _hedgers.get(base_api)
+    if hedger is None:
+        hedger = _hedgers[base_api] = Hedger(alternate_api)
+    return hedger
@@ -0,0 +1,167 @@
+"""
+In-process metrics of the OKX REST client, exposed in the Prometheus text format.
+
+Every request sent by `Client` is recorded, labelled by HTTP method and endpoint path (never the query string):
+
+    - okx_rest_request_duration_seconds   histogram of response latency
+    - okx_rest_responses_total            count per HTTP status
+    - okx_rest_okx_codes_total            count per OKX `code` of the response body ('0' is success)
+    - okx_rest_errors_total               count per transport exception (timeouts, connection errors)
+    - okx_rest_retries_total              count of requests resent after a rate-limit rejection
+    - okx_rest_rate_limit_wait_seconds    histogram of time spent waiting on the rate limiter
+
+Histograms use fixed buckets and the label sets are bounded (endpoints, statuses and OKX codes are finite, with
+`MAX_CODES_PER_ENDPOINT` as a safety cap), so memory stays constant no matter how many requests are made.
+
+The services expose them on `/metrics`, which requires the same bearer token as the other routes
+(`check_token_validity`), e.g. set in the `authorization` section of the Prometheus scrape config.
+"""
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RATE_LIMIT_WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+MAX_CODES_PER_ENDPOINT = 32
+
+
+class Histogram(object):
+    """Fixed-bucket histogram: per-bucket counts, sum and count."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+
+def _format_labels(labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class RequestMetrics(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}  # (method, path) -> Histogram
+        self.rate_limit_wait = {}  # (method, path) -> Histogram
+        self.responses = {}  # (method, path, status) -> count
+        self.okx_codes = {}  # (method, path, code) -> count
+        self.errors = {}  # (method, path, exception) -> count
+        self.retries = {}  # (method, path) -> count
+
+    def _histogram(self, histograms, key, buckets):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+        return histogram
+
+    def observe_response(self, method, path, latency, status_code, response_json):
+        okx_code = response_json.get('code') if isinstance(response_json, dict) else None
+        with self._lock:
+            self._histogram(self.latency, (method, path), LATENCY_BUCKETS).observe(latency)
+            key = (method, path, status_code)
+            self.responses[key] = self.responses.get(key, 0) + 1
+            if okx_code is not None:
+                key = (method, path, str(okx_code))
+                if key not in self.okx_codes and self._codes_for(method, path) >= MAX_CODES_PER_ENDPOINT:
+                    key = (method, path, 'other')
+                self.okx_codes[key] = self.okx_codes.get(key, 0) + 1
+
+    def _codes_for(self, method, path):
+        return sum(1 for key in self.okx_codes if key[0] == method and key[1] == path)
+
+    def observe_error(self, method, path, latency, exception):
+        with self._lock:
+            self._histogram(self.latency, (method, path), LATENCY_BUCKETS).observe(latency)
+            key = (method, path, type(exception).__name__)
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def observe_retry(self, method, path):
+        with self._lock:
+            self.retries[(method, path)] = self.retries.get((method, path), 0) + 1
+
+    def observe_rate_limit_wait(self, method, path, seconds):
+        with self._lock:
+            self._histogram(self.rate_limit_wait, (method, path), RATE_LIMIT_WAIT_BUCKETS).observe(seconds)
+
+    # --------------------------------------------------------------- exposition
+    def _render_histogram(self, lines, name, documentation, histograms):
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} histogram')
+        for (method, path), histogram in sorted(histograms.items()):
+            labels = (('method', method), ('path', path))
+            for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.cumulative_counts()):
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", bound),))} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {histogram.sum}')
+            lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+
+    @staticmethod
+    def _render_counter(lines, name, documentation, counters, label_names):
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} counter')
+        for key, count in sorted(counters.items(), key=lambda item: tuple(map(str, item[0]))):
+            lines.append(f'{name}{_format_labels(tuple(zip(label_names, key)))} {count}')
+
+    def render(self):
+        lines = []
+        with self._lock:
+            self._render_histogram(lines, 'okx_rest_request_duration_seconds',
+                                   'Latency of OKX REST responses.', self.latency)
+            self._render_counter(lines, 'okx_rest_responses_total', 'OKX REST responses by HTTP status.',
+                                 self.responses, ('method', 'path', 'status'))
+            self._render_counter(lines, 'okx_rest_okx_codes_total', 'OKX REST responses by OKX response code.',
+                                 self.okx_codes, ('method', 'path', 'code'))
+            self._render_counter(lines, 'okx_rest_errors_total', 'OKX REST requests that raised, by exception.',
+                                 self.errors, ('method', 'path', 'exception'))
+            self._render_counter(lines, 'okx_rest_retries_total', 'OKX REST requests resent after a rate limit.',
+                                 self.retries, ('method', 'path'))
+            self._render_histogram(lines, 'okx_rest_rate_limit_wait_seconds',
+                                   'Time spent waiting on the client-side rate limiter.', self.rate_limit_wait)
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every client in the process
+request_metrics = RequestMetrics()
+
+
+def _render_samples(lines, name, documentation, metric_type, values):
+    lines.append(f'# HELP {name} {documentation}')
+    lines.append(f'# TYPE {name} {metric_type}')
+    for labels, value in values:
+        lines.append(f'{name}{_format_labels(labels) if labels else ""} {value}')
+
+
+def render_metrics():
+    """Prometheus text exposition of the REST client metrics, plus coalescing, hedging and clock-sync gauges."""
+    from .clock_sync import _server_clocks
+    from .coalescing import get_coalescing_stats
+    from .hedging import _hedgers
+
+    lines = [request_metrics.render().rstrip('\n')]
+    coalescing = get_coalescing_stats()
+    _render_samples(lines, 'okx_rest_coalesced_requests_total',
+                    'GETs by whether they joined an in-flight identical request (hit) or were sent (miss).', 'counter',
+                    [((('result', 'hit'),), coalescing['hits']), ((('result', 'miss'),), coalescing['misses'])])
+    _render_samples(lines, 'okx_rest_hedged_requests_total',
+                    'Reads duplicated to the alternate host (hedges) and hedges that answered first (hedge_wins).',
+                    'counter', [((('host', base_api), ('result', result)), hedger.stats()[result])
+                                for base_api, hedger in _hedgers.items() for result in ('hedges', 'hedge_wins')])
+    _render_samples(lines, 'okx_server_clock_offset_seconds', 'Estimated OKX server clock offset.', 'gauge',
+                    [((('host', base_api),), clock.offset()) for base_api, clock in _server_clocks.items()
+                     if clock.synced])
+    _render_samples(lines, 'okx_server_clock_error_bound_seconds', 'Error bound of the server clock offset.', 'gauge',
+                    [((('host', base_api),), clock.error_bound()) for base_api, clock in _server_clocks.items()
+                     if clock.synced])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,230 @@
+"""
+Token-bucket rate limiting for the OKX REST API.
+
+OKX publishes a limit for every endpoint as "N requests per T seconds", counted either per IP, per user (API key) or
+per user and instrument (instId) / instrument family (instFamily, instType). `RATE_LIMITS` declares those limits and
+`RateLimiter` keeps one token bucket per (endpoint, scope) pair so callers can fire requests as fast as OKX allows
+without hand-tuned sleeps, and without `50011 Too Many Requests` rejections under burst load.
+
+Buckets hand out reservations rather than rejections: a caller that finds the bucket empty is told how long to wait
+until its token is available, which keeps concurrent callers in arrival order and works the same for the blocking
+(`acquire_blocking`) and the asyncio (`acquire`) transports.
+"""
+import asyncio
+import threading
+import time
+
+from . import consts as c
+
+IP = 'ip'
+USER = 'user'
+
+
+class RateLimit(object):
+    """
+    One published OKX limit: `requests` per `per_seconds`.
+
+    `scope` is IP for public endpoints or USER for private ones, `scope_params` lists the request params the limit is
+    additionally keyed on (e.g. ('instId',) for "UserID + Instrument ID" limits). When `per_item` is set the limit is
+    counted per element of a batch request (OKX counts batch orders per order, not per call).
+    """
+
+    def __init__(self, requests, per_seconds, scope=USER, scope_params=(), per_item=False):
+        self.requests = requests
+        self.per_seconds = per_seconds
+        self.scope = scope
+        self.scope_params = tuple(scope_params)
+        self.per_item = per_item
+
+    def __repr__(self):
+        return f'RateLimit({self.requests}/{self.per_seconds}s, scope={self.scope}, ' \
+               f'scope_params={self.scope_params}, per_item={self.per_item})'
+
+
+# Published limits, https://www.okx.com/docs-v5/en/ (keyed by (method, request_path))
+RATE_LIMITS = {
+    # trade
+    (c.POST, c.PLACR_ORDER): RateLimit(60, 2, USER, ('instId',)),
+    (c.POST, c.BATCH_ORDERS): RateLimit(300, 2, USER, per_item=True),
+    (c.POST, c.CANCEL_ORDER): RateLimit(60, 2, USER, ('instId',)),
+    (c.POST, c.CANCEL_BATCH_ORDERS): RateLimit(300, 2, USER, per_item=True),
+    (c.POST, c.AMEND_ORDER): RateLimit(60, 2, USER, ('instId',)),
+    (c.POST, c.AMEND_BATCH_ORDER): RateLimit(300, 2, USER, per_item=True),
+    (c.POST, c.CLOSE_POSITION): RateLimit(20, 2, USER, ('instId',)),
+    (c.GET, c.ORDER_INFO): RateLimit(60, 2, USER, ('instId',)),
+    (c.GET, c.ORDERS_PENDING): RateLimit(60, 2, USER),
+    (c.GET, c.ORDERS_HISTORY): RateLimit(40, 2, USER),
+    (c.GET, c.ORDERS_HISTORY_ARCHIVE): RateLimit(20, 2, USER),
+    (c.GET, c.ORDER_FILLS): RateLimit(60, 2, USER),
+    (c.GET, c.ORDERS_FILLS_HISTORY): RateLimit(10, 2, USER),
+    (c.POST, c.PLACE_ALGO_ORDER): RateLimit(20, 2, USER, ('instId',)),
+    (c.POST, c.CANCEL_ALGOS): RateLimit(20, 2, USER),
+    (c.POST, c.Cancel_Advance_Algos): RateLimit(20, 2, USER),
+    (c.POST, c.AMEND_ALGO_ORDER): RateLimit(20, 2, USER, ('instId',)),
+    (c.GET, c.ORDERS_ALGO_OENDING): RateLimit(20, 2, USER),
+    (c.GET, c.ORDERS_ALGO_HISTORY): RateLimit(20, 2, USER),
+    (c.GET, c.GET_ALGO_ORDER_DETAILS): RateLimit(20, 2, USER),
+    # account
+    (c.GET, c.ACCOUNT_INFO): RateLimit(10, 2, USER),
+    (c.GET, c.POSITION_INFO): RateLimit(10, 2, USER),
+    (c.GET, c.POSITIONS_HISTORY): RateLimit(10, 2, USER),
+    (c.GET, c.POSITION_RISK): RateLimit(10, 2, USER),
+    (c.GET, c.BILLS_DETAIL): RateLimit(5, 1, USER),
+    (c.GET, c.BILLS_ARCHIVE): RateLimit(5, 2, USER),
+    (c.GET, c.ACCOUNT_CONFIG): RateLimit(5, 2, USER),
+    (c.POST, c.POSITION_MODE): RateLimit(5, 2, USER),
+    (c.POST, c.SET_LEVERAGE): RateLimit(20, 2, USER),
+    (c.GET, c.GET_LEVERAGE): RateLimit(20, 2, USER),
+    (c.GET, c.MAX_TRADE_SIZE): RateLimit(20, 2, USER),
+    (c.GET, c.MAX_AVAIL_SIZE): RateLimit(20, 2, USER),
+    (c.POST, c.ADJUSTMENT_MARGIN): RateLimit(20, 2, USER),
+    (c.GET, c.FEE_RATES): RateLimit(5, 2, USER),
+    (c.GET, c.MAX_WITHDRAWAL): RateLimit(20, 2, USER),
+    # funding
+    (c.GET, c.GET_BALANCES): RateLimit(6, 1, USER),
+    (c.POST, c.FUNDS_TRANSFER): RateLimit(1, 1, USER, ('ccy',)),
+    # market data
+    (c.GET, c.TICKERS_INFO): RateLimit(20, 2, IP),
+    (c.GET, c.TICKER_INFO): RateLimit(20, 2, IP),
+    (c.GET, c.INDEX_TICKERS): RateLimit(20, 2, IP),
+    (c.GET, c.ORDER_BOOKS): RateLimit(40, 2, IP),
+    (c.GET, c.GET_ORDER_LITE_BOOK): RateLimit(6, 1, IP),
+    (c.GET, c.MARKET_CANDLES): RateLimit(40, 2, IP),
+    (c.GET, c.HISTORY_CANDLES): RateLimit(20, 2, IP),
+    (c.GET, c.INDEX_CANSLES): RateLimit(20, 2, IP),
+    (c.GET, c.MARKPRICE_CANDLES): RateLimit(20, 2, IP),
+    (c.GET, c.MARKET_TRADES): RateLimit(100, 2, IP),
+    (c.GET, c.HISTORY_TRADES): RateLimit(20, 2, IP),
+    (c.GET, c.GET_OPTION_TRADES): RateLimit(20, 2, IP, ('instFamily',)),
+    # public data
+    (c.GET, c.INSTRUMENT_INFO): RateLimit(20, 2, IP, ('instType',)),
+    (c.GET, c.SERVER_TIMESTAMP_URL): RateLimit(10, 2, IP),
+    (c.GET, c.MARK_PRICE): RateLimit(10, 2, IP),
+    (c.GET, c.FUNDING_RATE): RateLimit(20, 2, IP, ('instId',)),
+    (c.GET, c.FUNDING_RATE_HISTORY): RateLimit(10, 2, IP, ('instId',)),
+}
+
+# Fallback for endpoints missing from the table, the most conservative limit OKX documents for regular endpoints
+DEFAULT_RATE_LIMIT = RateLimit(5, 2, USER)
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket holding at most `capacity` tokens, refilled continuously at `refill_rate` per second."""
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def reserve(self, cost=1):
+        """
+        Takes `cost` tokens and returns how many seconds the caller must wait before using them (0 when available).
+
+        The balance is allowed to go negative so that waiting callers queue up behind each other in arrival order.
+        """
+        cost = min(float(cost), self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= cost
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.refill_rate
+
+    def has_capacity(self, cost=1):
+        """True when `cost` tokens could be taken right now without waiting."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens >= cost
+
+    def drain(self, seconds):
+        """Empties the bucket and pushes it `seconds` into debt, used to back off after OKX rejected a request."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.refill_rate
+
+
+class RateLimiter(object):
+    """Keeps one `TokenBucket` per endpoint and scope, sized from `limits`."""
+
+    def __init__(self, limits=None, default_limit=DEFAULT_RATE_LIMIT):
+        self.limits = RATE_LIMITS if limits is None else limits
+        self.default_limit = default_limit
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_limit(self, method, request_path):
+        return self.limits.get((method, request_path), self.default_limit)
+
+    def _bucket_key(self, limit, method, request_path, params, api_key):
+        key = (method, request_path)
+        if limit.scope == USER:
+            key += (api_key,)
+        if limit.scope_params and isinstance(params, dict):
+            key += tuple(params.get(param, '') for param in limit.scope_params)
+        return key
+
+    def get_bucket(self, method, request_path, params=None, api_key='-1'):
+        limit = self.get_limit(method, request_path)
+        key = self._bucket_key(limit, method, request_path, params, api_key)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(
+                    key, TokenBucket(limit.requests, limit.requests / limit.per_seconds))
+        return bucket
+
+    def reserve(self, method, request_path, params=None, api_key='-1'):
+        limit = self.get_limit(method, request_path)
+        cost = len(params) if limit.per_item and isinstance(params, list) and params else 1
+        return self.get_bucket(method, request_path, params, api_key).reserve(cost)
+
+    def has_capacity(self, method, request_path, params=None, api_key='-1'):
+        return self.get_bucket(method, request_path, params, api_key).has_capacity()
+
+    async def acquire(self, method, request_path, params=None, api_key='-1'):
+        """Waits (without blocking the event loop) until the request may be sent, returns the seconds waited."""
+        wait = self.reserve(method, request_path, params, api_key)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def acquire_blocking(self, method, request_path, params=None, api_key='-1'):
+        """Blocks the calling thread until the request may be sent, returns the seconds waited."""
+        wait = self.reserve(method, request_path, params, api_key)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, method, request_path, params=None, api_key='-1', seconds=c.RATE_LIMIT_BACKOFF):
+        """Backs the bucket off after OKX answered with a rate-limit rejection despite the local accounting."""
+        self.get_bucket(method, request_path, params, api_key).drain(seconds)
+
+
+# Limits are enforced by OKX per IP and per account, so every client in the process shares the same buckets
+rate_limiter = RateLimiter()
+
+
+def is_rate_limited(status_code, response_json):
+    """True when OKX rejected the request for exceeding its rate limit (HTTP 429 or error code 50011)."""
+    if status_code == 429:
+        return True
+    return isinstance(response_json, dict) and str(response_json.get('code')) == c.RATE_LIMIT_ERROR_CODE
+
+
+if __name__ == '__main__':
+    async def main():
+        limiter = RateLimiter()
+        start = time.monotonic()
+        # 25 concurrent ticker requests against a 20/2s bucket, the last 5 wait for the refill
+        await asyncio.gather(*[limiter.acquire(c.GET, c.TICKER_INFO, {'instId': 'BTC-USDT-SWAP'})
+                               for _ in range(25)])
+        print(f'25 ticker requests admitted in {time.monotonic() - start:.2f}s')
+
+
+    asyncio.run(main())
@@ -1,6 +1,11 @@
 import hmac
 import base64
 import datetime
+import hashlib
+import time
+
+import orjson
+
 from . import consts as c
 
 
@@ -37,19 +42,58 @@ def get_header_no_sign(flag,debug = True):
     return header
 
 def parse_params_to_str(params):
-    url = '?'
-    for key, value in params.items():
-        if(value != ''):
-            url = url + str(key) + '=' + str(value) + '&'
-    url = url[0:-1]
-    #print('url:',url)
-    return url
+    query = '&'.join([f'{key}={value}' for key, value in params.items() if value != ''])
+    return '?' + query if query else ''
+
+
+def encode_body(params):
+    """Serializes a POST body, orjson is several times faster than json.dumps on batch-order payloads."""
+    return orjson.dumps(params).decode()
+
+
+_timestamp_second = None
+_timestamp_prefix = ''
+
+
+def get_timestamp(offset=0.0):
+    """ISO-8601 UTC timestamp in milliseconds, shifted by `offset` seconds (see clock_sync.ServerClock.offset)."""
+    global _timestamp_second, _timestamp_prefix
+    # rounded to the microsecond first like datetime does, truncating the float directly can lose a millisecond
+    second, microsecond = divmod(round((time.time() + offset) * 1000000), 1000000)
+    if second != _timestamp_second:
+        # the date/time part only changes once a second, format it once and reuse it
+        _timestamp_prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+        _timestamp_second = second
+    return f'{_timestamp_prefix}.{microsecond // 1000:03d}Z'
+
+
+class RequestSigner(object):
+    """
+    Signs requests for one set of credentials.
+
+    The keyed HMAC state is built once from the secret and copied per request, and the static part of the headers is
+    kept as a template so that each request only fills in its timestamp and signature.
+    """
 
+    def __init__(self, api_key, secret_key, passphrase, flag):
+        self._hmac = hmac.new(bytes(secret_key, encoding='utf8'), digestmod=hashlib.sha256)
+        self._header_template = {
+            c.CONTENT_TYPE: c.APPLICATION_JSON,
+            c.OK_ACCESS_KEY: api_key,
+            c.OK_ACCESS_PASSPHRASE: passphrase,
+            'x-simulated-trading': flag,
+        }
 
-def get_timestamp():
-    now = datetime.datetime.utcnow()
-    t = now.isoformat("T", "milliseconds")
-    return t + "Z"
+    def sign(self, timestamp, method, request_path, body):
+        mac = self._hmac.copy()
+        mac.update(f'{timestamp}{method}{request_path}{body}'.encode())
+        return base64.b64encode(mac.digest()).decode()
+
+    def get_header(self, timestamp, method, request_path, body):
+        header = self._header_template.copy()
+        header[c.OK_ACCESS_SIGN] = self.sign(timestamp, method, request_path, body)
+        header[c.OK_ACCESS_TIMESTAMP] = timestamp
+        return header
 
 
 def signature(timestamp, method, request_path, body, secret_key):
@@ -61,3 +105,32 @@ def signature(timestamp, method, request_path, body, secret_key):
     d = mac.digest()
 
     return base64.b64encode(d)
+
+
+if __name__ == '__main__':
+    # run as `python -m pyokx.low_rest_api.utils`
+    import json
+    import timeit
+
+    # per-request CPU cost of signing + encoding a 20-order batch-orders POST
+    batch_orders = [dict(instId='BTC-USDT-SWAP', tdMode='isolated', side='buy', ordType='limit', px=str(42000 + i),
+                         sz='1', clOrdId=f'antbot{i:026d}') for i in range(20)]
+    signer = RequestSigner('api-key', 'secret-key', 'passphrase', '1')
+
+
+    def legacy():
+        timestamp = datetime.datetime.utcnow().isoformat("T", "milliseconds") + "Z"
+        body = json.dumps(batch_orders)
+        sign_ = sign(pre_hash(timestamp, c.POST, c.BATCH_ORDERS, body, False), 'secret-key')
+        return get_header('api-key', sign_, timestamp, 'passphrase', '1', False)
+
+
+    def pipeline():
+        body = encode_body(batch_orders)
+        return signer.get_header(get_timestamp(), c.POST, c.BATCH_ORDERS, body)
+
+
+    number = 20000
+    for name, func in [('legacy', legacy), ('pipeline', pipeline)]:
+        seconds = min(timeit.repeat(func, number=number, repeat=5))
+        print(f'{name:>8}: {seconds / number * 1e6:.2f} us/request')
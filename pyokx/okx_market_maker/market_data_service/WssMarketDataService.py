@@ -28,8 +28,10 @@ def _callback(message):
         # print(order_books)
 
 
-def on_orderbook_snapshot_or_update(message):
+def on_orderbook_snapshot_or_update(message, order_books: Dict[str, OrderBook] = order_books):
     """
+    Applies a books channel snapshot or incremental update to the book of its instrument in `order_books` (the shared
+    market maker books by default) and returns that book.
     """
     arg = message.get("arg")
     inst_id = arg.get("instId")
@@ -55,11 +55,13 @@ class OrderBook:
 
     def set_bids_on_update(self, order_book_level: OrderBookLevel):
         if not self._bids or self._bids[-1] > order_book_level:
-            self._bids.append(order_book_level)
+            if order_book_level.quantity != 0:  # deletion of a level we do not hold
+                self._bids.append(order_book_level)
         else:
             for i in range(len(self._bids)):
                 if order_book_level > self._bids[i]:
-                    self._bids.insert(i, order_book_level)
+                    if order_book_level.quantity != 0:
+                        self._bids.insert(i, order_book_level)
                     break
                 elif order_book_level == self._bids[i]:
                     if order_book_level.quantity == 0:
@@ -70,11 +72,13 @@ class OrderBook:
 
     def set_asks_on_update(self, order_book_level: OrderBookLevel):
         if not self._asks or self._asks[-1] < order_book_level:
-            self._asks.append(order_book_level)
+            if order_book_level.quantity != 0:  # deletion of a level we do not hold
+                self._asks.append(order_book_level)
         else:
             for i in range(len(self._asks)):
                 if order_book_level < self._asks[i]:
-                    self._asks.insert(i, order_book_level)
+                    if order_book_level.quantity != 0:
+                        self._asks.insert(i, order_book_level)
                     break
                 elif order_book_level == self._asks[i]:
                     if order_book_level.quantity == 0:
@@ -0,0 +1,221 @@
+"""
+Depth analysis of order book snapshots on numeric arrays.
+
+`OrderBookDepth` converts each side of an `Orderbook_Snapshot` once, on first use, into numpy arrays (prices,
+quantities and their running sums, best level first) and answers depth queries with cumulative sums and binary
+searches instead of walking levels in Python:
+
+    - price_to_fill(quantity)         price of the level at which `quantity` is fully available
+    - vwap(quantity)                  average price of sweeping `quantity` through the book
+    - slippage(quantity)              relative cost of that sweep against the mid price
+    - liquidity_within(ticks, tick)   quantity resting within `ticks` ticks of the best price
+    - limit_price_index(quantity, reference_price)   the level `prepare_limit_price` prices an order at
+
+`analyze` answers all of them for one order at once. Both sides are kept in full, whatever their lengths.
+
+Usage:
+    depth = OrderBookDepth.from_snapshot(order_book)
+    depth.side('buy').vwap(25), depth.analyze('sell', 25, tick_size=0.1, ticks=10)
+"""
+from typing import Union
+
+import numpy as np
+
+from pyokx.columnar_snapshot import ColumnarOrderbookSnapshot
+from pyokx.data_structures import Orderbook_Snapshot
+
+MAX_CACHED_DEPTHS = 32
+
+
+class BookSide:
+    """
+    One side of a book, best level first. Prices are also kept as `keys` (the prices for asks, negated prices for
+    bids) which always increase away from the best level, so binary searches work the same for both sides.
+    """
+    __slots__ = ('is_ask', 'prices', 'quantities', 'keys', 'cumulative_quantities', 'cumulative_notionals')
+
+    def __init__(self, prices: np.ndarray, quantities: np.ndarray, is_ask: bool):
+        self.is_ask = is_ask
+        self.prices = prices
+        self.quantities = quantities
+        self.keys = prices if is_ask else -prices
+        self.cumulative_quantities = np.cumsum(quantities)
+        self.cumulative_notionals = np.cumsum(prices * quantities)
+
+    @staticmethod
+    def from_levels(levels, is_ask: bool) -> 'BookSide':
+        """From `Ask`/`Bid` models, numpy parses the price and quantity strings in one go."""
+        prices = np.array([level.price for level in levels], dtype=np.float64)
+        quantities = np.array([level.quantity for level in levels], dtype=np.float64)
+        return BookSide(prices, quantities, is_ask)
+
+    def __len__(self):
+        return len(self.prices)
+
+    @property
+    def total_quantity(self) -> float:
+        return float(self.cumulative_quantities[-1]) if len(self) else 0.0
+
+    def fill_index(self, quantity: float) -> int:
+        """Index of the first level at which `quantity` is available in total, -1 if the side is too thin."""
+        index = int(np.searchsorted(self.cumulative_quantities, quantity, side='left'))
+        return index if index < len(self) else -1
+
+    def price_to_fill(self, quantity: float):
+        index = self.fill_index(quantity)
+        return float(self.prices[index]) if index >= 0 else None
+
+    def vwap(self, quantity: float):
+        """Average price of sweeping `quantity` (whole levels, then part of the last one), None if too thin."""
+        index = self.fill_index(quantity)
+        if index < 0 or quantity <= 0:
+            return None
+        filled_quantity = self.cumulative_quantities[index - 1] if index else 0.0
+        filled_notional = self.cumulative_notionals[index - 1] if index else 0.0
+        return float((filled_notional + (quantity - filled_quantity) * self.prices[index]) / quantity)
+
+    def liquidity_within(self, ticks: int, tick_size: float) -> float:
+        """Quantity resting at most `ticks` ticks away from the best price (inclusive)."""
+        if not len(self):
+            return 0.0
+        # Half a tick of slack so float prices exactly on the boundary are included
+        index = int(np.searchsorted(self.keys, self.keys[0] + (ticks + 0.5) * tick_size, side='right'))
+        return float(self.cumulative_quantities[index - 1]) if index else 0.0
+
+    def limit_price_index(self, quantity: float, reference_price: float) -> int:
+        """
+        Index of the first level at or beyond `reference_price` (worse for the taker) by which `quantity` is available
+        in total, counting the levels before the reference price too. -1 if no level qualifies.
+        """
+        reference_key = reference_price if self.is_ask else -reference_price
+        index = max(int(np.searchsorted(self.keys, reference_key, side='left')),
+                    int(np.searchsorted(self.cumulative_quantities, quantity, side='left')))
+        return index if index < len(self) else -1
+
+
+class OrderBookDepth:
+    """
+    Numeric view of both sides of a book snapshot. `asks` and `bids` are `BookSide`s, or the `Ask`/`Bid` levels of a
+    snapshot, which are converted when the side is first queried (a buy order never pays for parsing the bids).
+    """
+
+    def __init__(self, asks, bids, instId: str = '', ts: str = ''):
+        self._asks = asks
+        self._bids = bids
+        self.instId = instId
+        self.ts = ts
+
+    @property
+    def asks(self) -> BookSide:
+        if not isinstance(self._asks, BookSide):
+            self._asks = BookSide.from_levels(self._asks, is_ask=True)
+        return self._asks
+
+    @property
+    def bids(self) -> BookSide:
+        if not isinstance(self._bids, BookSide):
+            self._bids = BookSide.from_levels(self._bids, is_ask=False)
+        return self._bids
+
+    @staticmethod
+    def from_snapshot(order_book: Union[Orderbook_Snapshot, ColumnarOrderbookSnapshot]) -> 'OrderBookDepth':
+        """Builds the view of `order_book`, reused while the same snapshot (instId, ts and depth) is priced again."""
+        key = (order_book.instId, order_book.ts, len(order_book.asks), len(order_book.bids))
+        depth = _depth_cache.get(key)
+        if depth is None:
+            if isinstance(order_book, ColumnarOrderbookSnapshot):  # already numeric, nothing to parse
+                depth = OrderBookDepth(BookSide(order_book.asks.prices, order_book.asks.quantities, is_ask=True),
+                                       BookSide(order_book.bids.prices, order_book.bids.quantities, is_ask=False),
+                                       order_book.instId, order_book.ts)
+            else:
+                depth = OrderBookDepth(order_book.asks, order_book.bids, order_book.instId, order_book.ts)
+            if len(_depth_cache) >= MAX_CACHED_DEPTHS:
+                del _depth_cache[next(iter(_depth_cache))]
+            _depth_cache[key] = depth
+        return depth
+
+    def side(self, order_side: str) -> BookSide:
+        """The side an order of `order_side` ('buy' or 'sell') takes liquidity from."""
+        return self.asks if order_side.lower() == 'buy' else self.bids
+
+    @staticmethod
+    def _best_price(side):
+        if isinstance(side, BookSide):
+            return float(side.prices[0]) if len(side) else None
+        return float(side[0].price) if side else None
+
+    @property
+    def mid_price(self):
+        best_ask, best_bid = self._best_price(self._asks), self._best_price(self._bids)
+        if best_ask is None or best_bid is None:
+            return None
+        return (best_ask + best_bid) / 2
+
+    def slippage(self, order_side: str, quantity: float):
+        """Relative cost of sweeping `quantity` against the mid price (positive means worse than mid)."""
+        vwap, mid_price = self.side(order_side).vwap(quantity), self.mid_price
+        if vwap is None or mid_price is None:
+            return None
+        return (vwap - mid_price) / mid_price if order_side.lower() == 'buy' else (mid_price - vwap) / mid_price
+
+    def analyze(self, order_side: str, quantity: float, tick_size: float = None, ticks: int = 0) -> dict:
+        """All depth queries for an order of `quantity` on `order_side`."""
+        book_side = self.side(order_side)
+        return {
+            'price_to_fill': book_side.price_to_fill(quantity),
+            'vwap': book_side.vwap(quantity),
+            'slippage': self.slippage(order_side, quantity),
+            'mid_price': self.mid_price,
+            'liquidity_within_ticks': book_side.liquidity_within(ticks, tick_size) if tick_size else None,
+            'total_quantity': book_side.total_quantity,
+        }
+
+
+_depth_cache = {}
+
+if __name__ == '__main__':
+    # run as `python -m pyokx.order_book_depth`
+    import random
+    import time
+
+    from pyokx.data_structures import Ask, Bid
+
+
+    def loop_limit_price(order_book, quantity, side, reference_price):
+        # the former `prepare_limit_price` walk
+        aggregate_quantity = 0
+        for ask_or_bid in (order_book.asks if side == 'buy' else order_book.bids):
+            aggregate_quantity += float(ask_or_bid.quantity)
+            if (side == 'buy' and reference_price > float(ask_or_bid.price)) or \
+                    (side == 'sell' and reference_price < float(ask_or_bid.price)):
+                continue
+            if aggregate_quantity >= quantity:
+                return float(ask_or_bid.price)
+
+
+    levels = 400
+    asks = [Ask(price=f'{43750 + i * 0.1:.1f}', quantity=str(random.randint(1, 300)), deprecated_value='0',
+                number_of_orders='1') for i in range(levels)]
+    bids = [Bid(price=f'{43749.9 - i * 0.1:.1f}', quantity=str(random.randint(1, 300)), deprecated_value='0',
+                number_of_orders='1') for i in range(levels)]
+    quantity = sum(float(ask.quantity) for ask in asks) * 0.9  # deep sweep, close to the worst case of the loop
+    runs = 1000
+
+    for label, order_book in [('new snapshot each run', None), ('same snapshot reused', 'reused')]:
+        start = time.perf_counter()
+        for run in range(runs):
+            book = Orderbook_Snapshot(instId='BTC-USDT-SWAP', depth='400', asks=asks, bids=bids, ts=str(run))
+            loop_price = loop_limit_price(book, quantity, 'buy', 43750)
+        loop_us = (time.perf_counter() - start) / runs * 1e6
+
+        start = time.perf_counter()
+        for run in range(runs):
+            book = Orderbook_Snapshot(instId='BTC-USDT-SWAP', depth='400', asks=asks, bids=bids,
+                                      ts='0' if order_book else str(run))
+            depth = OrderBookDepth.from_snapshot(book)
+            price = float(depth.asks.prices[depth.asks.limit_price_index(quantity, 43750)])
+            depth.analyze('buy', quantity, tick_size=0.1, ticks=10)
+        engine_us = (time.perf_counter() - start) / runs * 1e6
+        assert price == loop_price, (price, loop_price)
+        print(f'depth {levels}, {label}: python loop {loop_us:.1f}us (limit price only), '
+              f'numpy engine {engine_us:.1f}us (limit price + all depth queries)')
@@ -14,6 +14,7 @@ async def get_instruments_searcher_from_redis(async_redis: aioredis.Redis) -> In
     if not instrument_stream:
         print(f"no instruments in cache, creating InstrumentSearcher with instTypes {ENFORCED_INSTRUMENT_TYPES}")
         okx_instrument_searcher = InstrumentSearcher(instTypes=ENFORCED_INSTRUMENT_TYPES)
+        await okx_instrument_searcher.update_instruments()
     else:
         message = instrument_stream[0]
         redis_stream_id = message[0]
@@ -23,6 +24,7 @@ async def get_instruments_searcher_from_redis(async_redis: aioredis.Redis) -> In
                 f"A message in the instruments stream {'okx:rest@instruments'} with id {redis_stream_id} was empty"
                 f", creating InstrumentSearcher with instTypes {ENFORCED_INSTRUMENT_TYPES}")
             okx_instrument_searcher = InstrumentSearcher(instTypes=ENFORCED_INSTRUMENT_TYPES)
+            await okx_instrument_searcher.update_instruments()
         else:
             deserialized_message = deserialize_from_redis(message_serialized)
             okx_instrument_searcher = InstrumentSearcher(_instrument_map=deserialized_message)
@@ -125,6 +127,7 @@ async def get_stream_okx_order_messages(async_redis: aioredis.Redis, count: int
 
 
 async def get_okx_fills_history(redis_client, count: int = 10) -> List[List[FillEntry]]:
+    """The latest `count` published fill histories (each the fills of the last 90 days), oldest first."""
     fill_history_serialized = await redis_client.xrevrange('okx:rest@fill@3months', count=count)
     if not fill_history_serialized:
         print(f"fills information not ready in fills cache!")
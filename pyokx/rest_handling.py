@@ -11,6 +11,12 @@ from typing import List, Any, Union
 from urllib.error import HTTPError
 
 from pyokx.InstrumentSearcher import InstrumentSearcher
+from pyokx.account_state import AccountStateCache
+from pyokx.bulk_cancel import BulkCanceller
+from pyokx.columnar_snapshot import ColumnarOrderbookSnapshot
+from pyokx.deadlines import Deadline, DeadlineExceeded, LookupFailed, generate_client_order_id, send_idempotent
+from pyokx.instrument_profiles import InstrumentProfile, instrument_profiles
+from pyokx.local_order_book import get_local_order_book
 from pyokx.OkxEnum import InstType
 from pyokx.data_structures import (Order, Cancelled_Order, Order_Placement_Return,
                                    Position, Closed_Position, Ticker,
@@ -21,12 +27,16 @@ from pyokx.data_structures import (Order, Cancelled_Order, Order_Placement_Retur
                                    Simplified_Balance_Details,
                                    OKXPremiumIndicatorSignalRequestForm, FillEntry, OKXSignalInput, DCAInputParameters,
                                    DCAOrderParameters)
-from pyokx.redis_structured_streams import get_instruments_searcher_from_redis, get_stream_okx_incomplete_algo_orders, \
-    get_stream_okx_incomplete_orders, get_stream_okx_position_messages
+from pyokx.low_rest_api.decoding import decode_models
+from pyokx.order_book_depth import OrderBookDepth
+from pyokx.order_gateway import OrderGateway
+from pyokx.signal_tracing import stage, timed
+from pyokx.stream_snapshots import orders_snapshot, positions_snapshot, algo_orders_snapshot, refresh_snapshots
+from pyokx.task_graph import TaskGraph
 from pyokx.ws_data_structures import PositionsChannel, WSPosition, InstrumentStatusReport
 from redis_tools.utils import get_async_redis
 from shared import logging
-from shared.tmp_shared import calculate_tp_stop_prices_usd, calculate_sl_stop_prices_usd, ccy_usd_to_contracts
+from shared.tmp_shared import calculate_tp_stop_prices_usd, calculate_sl_stop_prices_usd
 
 logger = logging.setup_logger(__name__)
 
@@ -35,6 +45,15 @@ from pyokx import okx_client, tradeAPI, marketAPI, accountAPI, ENFORCED_TD_MODE,
 
 REDIS_STREAM_MAX_LEN = int(os.getenv('REDIS_STREAM_MAX_LEN', 1000))
 
+# Orders placed within a few milliseconds of each other (e.g. concurrent signals) share one batch-orders request
+order_gateway = OrderGateway(tradeAPI)
+DUPLICATED_CLORDID_CODE = '51016'
+ORDER_NOT_FOUND_CODE = '51603'  # the definite "Order does not exist" answer of order lookups
+# Bulk cancels send all their batch-cancel chunks at once and re-issue only the orders that failed
+bulk_canceller = BulkCanceller(tradeAPI)
+# Leverage and account configuration, set_leverage is only sent when the leverage actually changes
+account_state = AccountStateCache(accountAPI)
+
 """NOTE: THE MODULE NEEDS TO BE UPDATED WITH ENUMS AND STRUCTURED DATA TYPES WHERE APPLICABLE"""
 
 
@@ -56,10 +75,7 @@ async def get_request_data(returned_data, target_data_structure):
               returned_data["msg"])
         return []
 
-    structured_data = []
-    for data in returned_data['data']:
-        structured_data.append(target_data_structure(**data))
-    return structured_data
+    return decode_models(returned_data['data'], target_data_structure)
 
 
 async def get_ticker_with_higher_volume(seed_symbol_name, instrument_type="FUTURES", top_n=1):
@@ -78,9 +94,9 @@ async def get_ticker_with_higher_volume(seed_symbol_name, instrument_type="FUTUR
     print(f'{seed_symbol_name = }')  # tickers_data = okx_client.marketAPI.get_tickers(instType=instrument_type)
 
     # raise DeprecationWarning("This function is deprecated. Waiting to update to Structured Data Types.")
-    all_positions = okx_client.accountAPI.get_positions(instType=instrument_type)
+    all_positions = await okx_client.accountAPI.get_positions(instType=instrument_type)
     all_position_symbols = [position['instId'] for position in all_positions['data']]
-    tickers_data = okx_client.marketAPI.get_tickers(instType=instrument_type)
+    tickers_data = await okx_client.marketAPI.get_tickers(instType=instrument_type)
 
     # If any tickers data are returned, find the ticker data for the symbol we are trading
     # fixme this is a hack since okx is returning multiple instId's
@@ -129,14 +145,14 @@ async def assert_okx_account_level(account_level: [1, 2, 3, 4]):
     assert account_level in ACCLV_MAPPING.keys(), f"Account level must be one of {ACCLV_MAPPING.keys()}"
 
     # Set account level
-    result_set_account_level = accountAPI.set_account_level(acctLv=2)
+    result_set_account_level = await accountAPI.set_account_level(acctLv=2)
     print(result_set_account_level)
     if result_set_account_level['code'] != "0":
         print("Unsuccessful request，\n  error_code = ", result_set_account_level['code'], ", \n  Error_message = ",
               result_set_account_level["msg"])
 
     # Get account configuration
-    result_get_account_config = accountAPI.get_account_config()
+    result_get_account_config = await accountAPI.get_account_config()
 
     if result_get_account_config['code'] == "0":
         acctLv = result_get_account_config["data"][0]["acctLv"]
@@ -176,24 +192,12 @@ async def get_orders(instType: str = None, instId: str = None, ordType: str = No
         params['state'] = state
     if instFamily is not None:
         params['instFamily'] = instFamily
-    all_orders_stream = await get_stream_okx_incomplete_orders(async_redis=await get_async_redis())
-    if not all_orders_stream:
-        return []
-    all_orders: List[Order] = all_orders_stream[-1]
-    orders_list = []
-    for order in all_orders:
-        matches_instId = instId is None or order.instId == instId
-        matches_instType = instType is None or order.instType == instType
-        matches_ordType = ordType is None or order.ordType == ordType
-        matches_state = state is None or order.state == state
-        matches_instFamily = instFamily is None or order.instFamily == instFamily
-        if matches_instId and matches_instType and matches_ordType and matches_state and matches_instFamily:
-            orders_list.append(order)
-    return orders_list
+    # Rebuilt only when a new snapshot was published, filtered through its indexes
+    return await orders_snapshot.get(await get_async_redis(), **params)
 
 
 async def cancel_all_orders(orders_list: List[Order] = None, instType: InstType = None,
-                            instId: str = None) -> List[Cancelled_Order]:
+                            instId: str = None, deadline: Deadline = None) -> List[Cancelled_Order]:
     """
     Cancels all or specific orders based on the provided parameters.
 
@@ -201,6 +205,7 @@ async def cancel_all_orders(orders_list: List[Order] = None, instType: InstType
         orders_list (List[Order], optional): A list of specific orders to cancel. If not provided, all orders are cancelled.
         instType (InstType, optional): The type of instrument to cancel orders for.
         instId (str, optional): The specific instrument ID to cancel orders for.
+        deadline (Deadline, optional): Time budget shared by all cancel requests, defaults to `ORDER_REQUEST_BUDGET`.
 
     Returns:
         List[Cancelled_Order]: A list of the orders that were successfully cancelled.
@@ -212,44 +217,22 @@ async def cancel_all_orders(orders_list: List[Order] = None, instType: InstType
         if instId is not None:
             params['instId'] = instId
         # orders_list = await fetch_incomplete_orders(**params)
-        all_orders_stream = await get_stream_okx_incomplete_orders(async_redis=await get_async_redis())
-        if not all_orders_stream:
-            return []
-        all_orders: List[Order] = all_orders_stream[-1]
-        orders_list = []
-        for order in all_orders:
-            matches_instId = instId is None or order.instId == instId
-            matches_instType = instType is None or order.instType == instType
-            if matches_instId and matches_instType:
-                orders_list.append(order)
-
-    # cancelled_orders = []
-    orders_to_cancel = []
-    for order in orders_list:
-        orders_to_cancel.append(order)
-
-    # In chunks of 20
-    cancelled_orders = []
-    for i in range(0, len(orders_to_cancel), 20):
-        chunk = orders_to_cancel[i:i + 20]
-        result = tradeAPI.cancel_multiple_orders(
-            orders_data=[
-                {'instId': order.instId,
-                 'ordId': order.ordId,
-                 } for order in chunk
-            ]
-        )
-        if result["code"] != "0":
-            print("Unsuccessful cancel_all_orders request，\n  error_code = ", result["code"], ", \n  Error_message = ",
-                  result["msg"])
-            continue
-        cancelled_orders.extend(await get_request_data(result, Cancelled_Order))
+        orders_list = await get_orders(**params)
+
+    if not orders_list:
+        return []
+
+    # All chunks of 20 are sent concurrently, failed orders are re-issued
+    report = await bulk_canceller.cancel_orders(
+        [{'instId': order.instId, 'ordId': order.ordId} for order in orders_list], deadline)
+    cancelled_orders = decode_models(report.cancelled, Cancelled_Order)
 
     return cancelled_orders
 
 
 async def close_positions(positions_list: List[Position] = None,
-                          instType: InstType = None, instId: str = None) -> List[Closed_Position]:
+                          instType: InstType = None, instId: str = None,
+                          deadline: Deadline = None) -> List[Closed_Position]:
     """
     Closes all or specific positions based on the provided parameters.
 
@@ -259,6 +242,8 @@ async def close_positions(positions_list: List[Position] = None,
     :type instType: InstType, optional
     :param instId: The specific instrument ID to close positions for.
     :type instId: str, optional
+    :param deadline: Time budget for the requests and their retries, defaults to `ORDER_REQUEST_BUDGET` seconds.
+    :type deadline: Deadline, optional
     :returns: A list of the positions that were successfully closed.
     """
     if positions_list is None:
@@ -269,15 +254,25 @@ async def close_positions(positions_list: List[Position] = None,
             params['instId'] = instId
         positions_list = await get_positions(**params)
 
+    async def close_position(position):
+        # Closing is idempotent by nature, a re-sent close of a closed position is answered with an error
+        try:
+            return await send_idempotent(lambda: tradeAPI.close_positions(
+                instId=position.instId, mgnMode=position.mgnMode, posSide=position.posSide, ccy=position.ccy,
+                autoCxl='true', clOrdId=f'{position.posId}CLOSED', tag=''),
+                None, deadline, f'{position.posId}CLOSED', 'close_positions')
+        except DeadlineExceeded as e:
+            logger.error(f'{e}')
+            return None
+
+    deadline = deadline or Deadline()
     closed_positions_return = await asyncio.gather(
-        *[tradeAPI.close_positions(instId=position.instId, mgnMode=position.mgnMode,
-                                   posSide=position.posSide, ccy=position.ccy,
-                                   autoCxl='true', clOrdId=f'{position.posId}CLOSED',
-                                   tag='') for position in positions_list if position.pos != '0']
-    )
+        *[close_position(position) for position in positions_list if position.pos != '0'])
 
     closed_positions = []
     for closed_position in closed_positions_return:
+        if closed_position is None:
+            continue
         try:
             assert closed_position['code'] == '0', f' {closed_position = }'
             closed_position = await get_request_data(closed_position, Closed_Position)
@@ -303,19 +298,8 @@ async def get_positions(instType: InstType = None, instId: str = None) -> List[W
         params['instType'] = instType
     if instId is not None:
         params['instId'] = instId
-    all_positions_stream: List[PositionsChannel] = await get_stream_okx_position_messages(
-        async_redis=await get_async_redis(), count=1)
-    if not all_positions_stream:
-        return []
-    all_positions: List[WSPosition] = all_positions_stream[-1].data
-    positions_list = []
-    for position in all_positions:
-        if position.pos != '0':
-            matches_instId = instId is None or position.instId == instId
-            matches_instType = instType is None or position.instType == instType
-            if matches_instId and matches_instType:
-                positions_list.append(position)
-    return positions_list
+    # Open positions of the latest positions message, rebuilt only when a new one was published
+    return await positions_snapshot.get(await get_async_redis(), **params)
 
 
 #
@@ -345,6 +329,7 @@ async def place_order(instId: Any,
                       # This one is commented out because it needs multiple TP's to work and is not
                       # developed yet downstream
                       # amendPxOnTriggerType: str = ''
+                      deadline: Deadline = None
                       ):
     """
     Places an order with the specified parameters.
@@ -360,22 +345,46 @@ async def place_order(instId: Any,
     :param sz: The size of the order.
     :type sz: Any
     ... (and so on for other parameters)
+    :param deadline: Time budget for the request and its retries, defaults to `ORDER_REQUEST_BUDGET` seconds.
+    :type deadline: Deadline, optional
     :returns: The response from the order placement request.
     """
-    result = tradeAPI.place_order(
-        instId=instId, tdMode=tdMode, side=side, ordType=ordType, sz=sz,
-        ccy=ccy, clOrdId=clOrdId, tag=tag, posSide=posSide,
-        px=px, reduceOnly=reduceOnly, tgtCcy=tgtCcy,
-        tpTriggerPx=tpTriggerPx, tpOrdPx=tpOrdPx,
-        slTriggerPx=slTriggerPx, slOrdPx=slOrdPx,
-        tpTriggerPxType=tpTriggerPxType, slTriggerPxType=slTriggerPxType,
-        quickMgnType=quickMgnType, stpId=stpId, stpMode=stpMode,
-        algoClOrdId=algoClOrdId,
-        # This one is commented out because it needs multiple TP's to work and is not
-        # developed yet downstream
-        # amendPxOnTriggerType=amendPxOnTriggerType,
+    # A client id is always set so that a timed out request can be reconciled instead of duplicated
+    clOrdId = clOrdId or generate_client_order_id()
+
+    async def find_placed_order():
+        found = await tradeAPI.get_order(instId=instId, clOrdId=clOrdId)
+        if found["code"] == ORDER_NOT_FOUND_CODE or (found["code"] == "0" and not found["data"]):
+            return None
+        if found["code"] != "0":
+            raise LookupFailed(f'get_order {clOrdId}: {found["code"]} {found["msg"]}')
+        return {'code': '0', 'msg': '', 'data': [{'clOrdId': clOrdId, 'ordId': found["data"][0]['ordId'],
+                                                  'sCode': '0', 'sMsg': '', 'tag': found["data"][0].get('tag', '')}]}
 
-    )
+    try:
+        result = await send_idempotent(lambda: order_gateway.place_order(
+            instId=instId, tdMode=tdMode, side=side, ordType=ordType, sz=sz,
+            ccy=ccy, clOrdId=clOrdId, tag=tag, posSide=posSide,
+            px=px, reduceOnly=reduceOnly, tgtCcy=tgtCcy,
+            tpTriggerPx=tpTriggerPx, tpOrdPx=tpOrdPx,
+            slTriggerPx=slTriggerPx, slOrdPx=slOrdPx,
+            tpTriggerPxType=tpTriggerPxType, slTriggerPxType=slTriggerPxType,
+            quickMgnType=quickMgnType, stpId=stpId, stpMode=stpMode,
+            algoClOrdId=algoClOrdId,
+            # This one is commented out because it needs multiple TP's to work and is not
+            # developed yet downstream
+            # amendPxOnTriggerType=amendPxOnTriggerType,
+        ), find_placed_order, deadline or Deadline(), clOrdId, 'place_order')
+    except DeadlineExceeded as e:
+        logger.error(f'{e}')
+        return None
+
+    if result["code"] != "0" and result["data"] and result["data"][0].get('sCode') == DUPLICATED_CLORDID_CODE:
+        # a previous attempt did reach OKX after all
+        try:
+            result = await find_placed_order() or result
+        except LookupFailed as e:
+            logger.error(f'{e}')
 
     if result["code"] != "0":
         print(f'{result = }')
@@ -395,7 +404,7 @@ async def get_ticker(instId):
     :type instId: str
     :returns: The latest ticker information for the specified instrument.
     """
-    result = await get_request_data(marketAPI.get_ticker(instId=instId), Ticker)
+    result = await get_request_data(await marketAPI.get_ticker(instId=instId), Ticker)
 
     if result:
         return result[0]
@@ -404,38 +413,18 @@ async def get_ticker(instId):
 
 
 async def get_algo_orders(instId=None, ordType=None) -> List[Algo_Order]:
-    all_algo_orders_stream = await get_stream_okx_incomplete_algo_orders(async_redis=await get_async_redis())
-    if not all_algo_orders_stream:
-        return []
-    all_algo_orders: List[Algo_Order] = all_algo_orders_stream[-1]
-    algo_orders_list = []
-    for algo_order in all_algo_orders:
-        matches_instId = instId is None or algo_order.instId == instId
-        matches_ordType = ordType is None or algo_order.ordType == ordType
-        if matches_instId and matches_ordType:
-            algo_orders_list.append(algo_order)
-    return algo_orders_list
+    return await algo_orders_snapshot.get(await get_async_redis(), instId=instId, ordType=ordType)
 
 
 async def cancel_all_algo_orders_with_params(algo_orders_list: List[Algo_Order] = None, instId=None,
-                                             ordType=None) -> List[Cancelled_Algo_Order]:
+                                             ordType=None, deadline: Deadline = None) -> List[Cancelled_Algo_Order]:
     if algo_orders_list is None:
         params = {}
         if instId is not None:
             params['instId'] = instId
         if ordType is not None:
             params['ordType'] = ordType
-        all_algo_orders_stream: List[List[Algo_Order]] = await (
-            get_stream_okx_incomplete_algo_orders(async_redis=await get_async_redis()))
-        if not all_algo_orders_stream:
-            return []
-        all_algo_orders: List[Algo_Order] = all_algo_orders_stream[-1]
-        algo_orders_list = []
-        for algo_order in all_algo_orders:
-            matches_instId = instId is None or algo_order.instId == instId
-            matches_ordType = ordType is None or algo_order.ordType == ordType
-            if matches_instId and matches_ordType:
-                algo_orders_list.append(algo_order)
+        algo_orders_list = await get_algo_orders(**params)
 
     if algo_orders_list is None or len(algo_orders_list) == 0:
         return []
@@ -459,34 +448,12 @@ async def cancel_all_algo_orders_with_params(algo_orders_list: List[Algo_Order]
                                               'instId': algo_order.instId,
                                               })
 
-    # Cancel regular algo orders
-    cancelled_algo_orders = []
-    for i in range(0, len(regular_algo_order_params), 10):
-        chunk = regular_algo_order_params[i:i + 10]
-        result = tradeAPI.cancel_algo_order(
-            params=chunk
-        )
-        if result["code"] != "0":
-            print("Unsuccessful cancel_all_algo_orders_with_params request，\n  error_code = ", result["code"],
-                  ", \n  Error_message = ",
-                  result["msg"])
-            continue
-        cancelled_algo_orders.extend(await get_request_data(result, Cancelled_Algo_Order))
-
-    # Cancel advanced algo orders
-    for i in range(0, len(advanced_algo_order_params), 10):
-        chunk = advanced_algo_order_params[i:i + 10]
-        result = tradeAPI.cancel_advance_algos(
-            params=chunk
-        )
-        if result["code"] != "0":
-            print("Unsuccessful cancel_all_algo_orders_with_params request，\n  error_code = ", result["code"],
-                  ", \n  Error_message = ",
-                  result["msg"])
-            continue
-        cancelled_algo_orders.extend(await get_request_data(result, Cancelled_Algo_Order))
-
-    return cancelled_algo_orders
+    # Cancel regular and advanced algo orders, all chunks of 10 concurrently
+    deadline = deadline or Deadline()
+    reports = await asyncio.gather(
+        bulk_canceller.cancel_algo_orders(regular_algo_order_params, deadline=deadline),
+        bulk_canceller.cancel_algo_orders(advanced_algo_order_params, advanced=True, deadline=deadline))
+    return decode_models([entry for report in reports for entry in report.cancelled], Cancelled_Algo_Order)
 
 
 async def place_algo_order(
@@ -520,7 +487,8 @@ async def place_algo_order(
         closeFraction: str = '',
         quickMgnType: str = '',
         algoClOrdId: str = '',
-        cxlOnClosePos: str = ''
+        cxlOnClosePos: str = '',
+        deadline: Deadline = None
 ):
     """
     Places an algorithmic order with detailed parameters.
@@ -531,25 +499,44 @@ async def place_algo_order(
     :param tdMode: The trade mode for the order (e.g., 'cash', 'margin').
     :type tdMode: str
     ... (and so on for other parameters)
-    :returns: The response from the algorithmic order placement request.
+    :param deadline: Time budget for the request and its retries, defaults to `ORDER_REQUEST_BUDGET` seconds.
+    :type deadline: Deadline, optional
+    :returns: The response from the algorithmic order placement request, None if it could not be confirmed within
+        the deadline.
     """
-    result = tradeAPI.place_algo_order(
-        # Main Order with TP and SL
-        instId=instId,
-        tdMode=tdMode,
-        side=side,
-        ordType=ordType,
-        sz=sz,
-        ccy=ccy,
-        posSide=posSide,
-        reduceOnly=reduceOnly,
-        tpTriggerPx=tpTriggerPx, tpOrdPx=tpOrdPx, slTriggerPx=slTriggerPx, slOrdPx=slOrdPx, triggerPx=triggerPx,
-        orderPx=orderPx, tgtCcy=tgtCcy, pxVar=pxVar, pxSpread=pxSpread, szLimit=szLimit, pxLimit=pxLimit,
-        timeInterval=timeInterval, tpTriggerPxType=tpTriggerPxType, slTriggerPxType=slTriggerPxType,
-        callbackRatio=callbackRatio, callbackSpread=callbackSpread, activePx=activePx, tag=tag,
-        triggerPxType=triggerPxType, closeFraction=closeFraction, quickMgnType=quickMgnType, algoClOrdId=algoClOrdId,
-        cxlOnClosePos=cxlOnClosePos
-    )
+    # A client id is always set so that a timed out request can be reconciled instead of duplicated
+    algoClOrdId = algoClOrdId or generate_client_order_id()
+
+    async def find_placed_algo_order():
+        found = await tradeAPI.get_algo_order_details(algoClOrdId=algoClOrdId)
+        if found["code"] == ORDER_NOT_FOUND_CODE or (found["code"] == "0" and not found["data"]):
+            return None
+        if found["code"] != "0":
+            raise LookupFailed(f'get_algo_order_details {algoClOrdId}: {found["code"]} {found["msg"]}')
+        return {'code': '0', 'msg': '', 'data': [{'algoClOrdId': algoClOrdId, 'algoId': found["data"][0]['algoId'],
+                                                  'clOrdId': '', 'sCode': '0', 'sMsg': '', 'tag': ''}]}
+
+    try:
+        result = await send_idempotent(lambda: tradeAPI.place_algo_order(
+            # Main Order with TP and SL
+            instId=instId,
+            tdMode=tdMode,
+            side=side,
+            ordType=ordType,
+            sz=sz,
+            ccy=ccy,
+            posSide=posSide,
+            reduceOnly=reduceOnly,
+            tpTriggerPx=tpTriggerPx, tpOrdPx=tpOrdPx, slTriggerPx=slTriggerPx, slOrdPx=slOrdPx, triggerPx=triggerPx,
+            orderPx=orderPx, tgtCcy=tgtCcy, pxVar=pxVar, pxSpread=pxSpread, szLimit=szLimit, pxLimit=pxLimit,
+            timeInterval=timeInterval, tpTriggerPxType=tpTriggerPxType, slTriggerPxType=slTriggerPxType,
+            callbackRatio=callbackRatio, callbackSpread=callbackSpread, activePx=activePx, tag=tag,
+            triggerPxType=triggerPxType, closeFraction=closeFraction, quickMgnType=quickMgnType,
+            algoClOrdId=algoClOrdId, cxlOnClosePos=cxlOnClosePos
+        ), find_placed_algo_order, deadline or Deadline(), algoClOrdId, 'place_algo_order')
+    except DeadlineExceeded as e:
+        logger.error(f'{e}')
+        return None  # as `place_order`: the placement could not be confirmed
     print(f'{result = }')
 
     if result["code"] != "0":
@@ -566,13 +553,12 @@ async def get_account_balance():
 
     :returns: The account balance data, structured according to the AccountBalanceData class.
     """
-    account_balance = accountAPI.get_account_balance()['data'][0]
+    account_balance = (await accountAPI.get_account_balance())['data'][0]
     details = account_balance['details']
     structured_details = []
     for detail in details:
         structured_details.append(AccountBalanceDetails(**detail))
-    account_balance['details'] = structured_details
-    return AccountBalanceData(**account_balance)
+    return AccountBalanceData(**{**account_balance, 'details': structured_details})
 
 
 async def get_account_config():
@@ -581,7 +567,7 @@ async def get_account_config():
 
     :returns: The account configuration data, structured according to the AccountConfigData class.
     """
-    return AccountConfigData(**accountAPI.get_account_config()['data'][0])
+    return await account_state.get_account_config()
 
 
 async def get_max_order_size(instId, tdMode):
@@ -595,7 +581,7 @@ async def get_max_order_size(instId, tdMode):
     :returns: The maximum order size data, structured according to the MaxOrderSizeData class.
     """
     # return MaxOrderSizeData(**accountAPI.get_max_order_size(instId=instId, tdMode=tdMode)['data'][0])
-    result = accountAPI.get_max_order_size(instId=instId, tdMode=tdMode)
+    result = await accountAPI.get_max_order_size(instId=instId, tdMode=tdMode)
     if result["code"] != "0":
         print("Unsuccessful get_max_order_size request，\n  error_code = ", result["code"], ", \n  Error_message = ",
               result["msg"])
@@ -614,7 +600,7 @@ async def get_max_avail_size(instId, tdMode):
     :returns: The maximum available size data, structured according to the MaxAvailSizeData class.
     """
     # return MaxAvailSizeData(**accountAPI.get_max_avail_size(instId=instId, tdMode=tdMode)['data'][0])
-    result = accountAPI.get_max_avail_size(instId=instId, tdMode=tdMode)
+    result = await accountAPI.get_max_avail_size(instId=instId, tdMode=tdMode)
     if result["code"] != "0":
         print("Unsuccessful get_max_avail_size request，\n  error_code = ", result["code"], ", \n  Error_message = ",
               result["msg"])
@@ -649,6 +635,9 @@ def generate_random_string(length, char_type='alphanumeric'):
     return ''.join(random.choices(char_set, k=length))
 
 
+_status_reports = {}  # instId -> (stream ids of the sources, InstrumentStatusReport)
+
+
 async def fetch_status_report_for_instrument(instId, TD_MODE):
     """
     Fetches a comprehensive status report for a specific instrument.
@@ -663,23 +652,24 @@ async def fetch_status_report_for_instrument(instId, TD_MODE):
     if instId is None:
         return None
 
-    (
-        # max_order_size, max_avail_size,
-        all_positions, all_orders, all_algo_orders) = await asyncio.gather(
-        # get_max_order_size(instId=instId, tdMode=TD_MODE),
-        # get_max_avail_size(instId=instId, tdMode=TD_MODE),
-        get_positions(instId=instId),
-        get_orders(instId=instId),
-        get_algo_orders(instId=instId)
-    )
-    return InstrumentStatusReport(
+    # Positions, orders and algo orders streams in one round trip, a report is reused until any of them advances
+    stream_ids = await refresh_snapshots(await get_async_redis(), positions_snapshot, orders_snapshot,
+                                         algo_orders_snapshot)
+    cached = _status_reports.get(instId)
+    if cached is not None and cached[0] == stream_ids:
+        return cached[1]
+
+    status_report = InstrumentStatusReport(
         instId=instId,
-        # max_order_size=max_order_size,
-        # max_avail_size=max_avail_size,
-        positions=all_positions,
-        orders=all_orders,
-        algo_orders=all_algo_orders
+        # max_order_size=await get_max_order_size(instId=instId, tdMode=TD_MODE),
+        # max_avail_size=await get_max_avail_size(instId=instId, tdMode=TD_MODE),
+        positions=positions_snapshot.select(instId=instId),
+        orders=orders_snapshot.select(instId=instId),
+        algo_orders=algo_orders_snapshot.select(instId=instId)
     )
+    account_state.on_positions(status_report.positions, stream_id=stream_ids[0])
+    _status_reports[instId] = (stream_ids, status_report)
+    return status_report
 
 
 async def fetch_initial_data(TD_MODE, instId=None):
@@ -692,7 +682,8 @@ async def fetch_initial_data(TD_MODE, instId=None):
     :type instId: str, optional
     :returns: A tuple containing simplified balance details, account configuration data, and instrument status report.
     """
-    account_balance, account_config = await asyncio.gather(get_account_balance(), get_account_config())
+    account_balance, account_config, instrument_status_report = await asyncio.gather(
+        get_account_balance(), get_account_config(), fetch_status_report_for_instrument(instId, TD_MODE))
 
     simplified_balance_details = [
         Simplified_Balance_Details(
@@ -705,12 +696,10 @@ async def fetch_initial_data(TD_MODE, instId=None):
         for detail in account_balance.details
     ]
 
-    instrument_status_report = await fetch_status_report_for_instrument(instId, TD_MODE)
-
     return simplified_balance_details, account_config, instrument_status_report
 
 
-async def get_order_book(instId, depth):
+async def get_order_book(instId, depth, columnar: bool = False):
     """
     Fetches the order book for a specific instrument.
 
@@ -718,25 +707,27 @@ async def get_order_book(instId, depth):
     :type instId: str
     :param depth: The depth of the order book to fetch.
     :type depth: int
+    :param columnar: Return the numeric ColumnarOrderbookSnapshot instead, much cheaper to build for deep books.
+    :type columnar: bool
     :returns: The order book snapshot, structured according to the Orderbook_Snapshot class.
     :raises ValueError: If the order book could not be fetched for the specified instrument ID.
     """
-    orderbook_return = marketAPI.get_orderbook(instId=instId, sz=depth)
+    # The websocket service keeps a checksum-verified book of the traded instruments, REST is the cold-start fallback
+    try:
+        local_order_book = await get_local_order_book(await get_async_redis(), instId, depth, columnar=columnar)
+    except Exception as e:
+        logger.warning(f'Could not read the local order book of {instId}: {e}')
+        local_order_book = None
+    if local_order_book is not None:
+        return local_order_book
+
+    orderbook_return = await marketAPI.get_orderbook(instId=instId, sz=depth)
     if orderbook_return['code'] != '0':
         print(f'{orderbook_return = }')
         raise ValueError(f'Could not fetch orderbook for {instId = }')
     data = orderbook_return['data'][0]
-    asks = data['asks']
-    bids = data['bids']
-    ts = data['ts']
-    structured_asks = []
-    structured_bids = []
-
-    for ask, bid in zip(asks, bids):
-        structured_asks.append(Ask(price=ask[0], quantity=ask[1], deprecated_value=ask[2], number_of_orders=ask[3]))
-        structured_bids.append(Bid(price=bid[0], quantity=bid[1], deprecated_value=bid[2], number_of_orders=bid[3]))
-
-    return Orderbook_Snapshot(instId=instId, depth=str(depth), ts=ts, asks=structured_asks, bids=structured_bids)
+    snapshot_type = ColumnarOrderbookSnapshot if columnar else Orderbook_Snapshot
+    return snapshot_type.from_array(instId=instId, depth=depth, asks=data['asks'], bids=data['bids'], ts=data['ts'])
 
 
 async def place_algo_trailing_stop_loss(
@@ -778,23 +769,19 @@ async def place_algo_trailing_stop_loss(
 
 
 async def get_leverage(instId, mgnMode):
-    result = accountAPI.get_leverage(instId=instId, mgnMode=mgnMode)
-    if result["code"] != "0":
-        print("Unsuccessful get_leverage request，\n  error_code = ", result["code"], ", \n  Error_message = ",
-              result["msg"])
-        return []
-    if len(result['data']) != 0:
-        leverage = result['data'][0]['lever']
+    leverage = await account_state.get_leverage(instId=instId, mgnMode=mgnMode)
+    if leverage is not None:
         return int(leverage)
 
 
-async def prepare_limit_price(order_book: Orderbook_Snapshot, quantity: Union[int, float], side, reference_price: float,
+async def prepare_limit_price(order_book: Union[Orderbook_Snapshot, ColumnarOrderbookSnapshot],
+                              quantity: Union[int, float], side, reference_price: float,
                               max_orderbook_price_offset=None):
     """
     Prepares a limit price based on the order book, quantity, side, reference price, and maximum order book price offset.
 
     :param order_book: The snapshot of the order book.
-    :type order_book: Orderbook_Snapshot
+    :type order_book: Union[Orderbook_Snapshot, ColumnarOrderbookSnapshot]
     :param quantity: The quantity for which to prepare the limit price.
     :type quantity: Union[int, float]
     :param side: The side of the order ('buy' or 'sell').
@@ -807,61 +794,43 @@ async def prepare_limit_price(order_book: Orderbook_Snapshot, quantity: Union[in
     :raises Exception: If a price in the order book that has enough volume to cover the quantity cannot be found.
     """
     assert side.lower() in ['buy', 'sell']
-    limit_price = None
-
-    reference_side = 'asks' if side == 'buy' else 'bids'
-    asks_or_bids = order_book.asks if reference_side == 'asks' else order_book.bids
-
-    aggregate_quantity = 0
-    for ask_or_bid in asks_or_bids:
-        # check that if buy order then skip if reference price is greater than ask price
-        # check that if sell order then skip if reference price is less than bid price
-        aggregate_quantity += float(ask_or_bid.quantity)
 
-        if (side == 'buy' and reference_price > float(ask_or_bid.price)) or \
-                (side == 'sell' and reference_price < float(ask_or_bid.price)):
-            continue
+    # First level at or past the reference price (asks for a buy, bids for a sell) by which the aggregate volume of
+    # the side covers the quantity, found by binary search over the side's cumulative volume
+    asks_or_bids = OrderBookDepth.from_snapshot(order_book).side(side)
+    index = asks_or_bids.limit_price_index(quantity, reference_price)
+    if index < 0:
+        raise Exception(f"Could not find a price in the orderbook that has enough volume to cover the quantity")
 
-        # Check if price meets the min_orderbook_limit_price_offset
-        if aggregate_quantity >= quantity:
-            print(f"ask_or_bid_price: {ask_or_bid.price}, ask_or_bid_volume: {ask_or_bid.quantity}")
-
-            # Check if the price is within the range we want to place our order
-            # get the price offset from the last price
-            price_offset = abs(float(ask_or_bid.price) - float(reference_price)) / reference_price
-            if (not max_orderbook_price_offset or price_offset <= max_orderbook_price_offset):
-                limit_price = float(ask_or_bid.price)
-                print(f"{price_offset}% diff between reference price: {reference_price} and and "
-                      f"limit price: {limit_price}")
-                break
-            else:
-                raise Exception(
-                    f"Computed Limit Price {ask_or_bid.price} is not within the range of the max_orderbook_price_offset "
-                    f"{max_orderbook_price_offset = } and reference price {reference_price = }")
+    limit_price = float(asks_or_bids.prices[index])
+    print(f"ask_or_bid_price: {limit_price}, ask_or_bid_volume: {asks_or_bids.quantities[index]}")
 
-    if limit_price is None:
-        raise Exception(f"Could not find a price in the orderbook that has enough volume to cover the quantity")
+    # Check if the price is within the range we want to place our order
+    # get the price offset from the last price
+    price_offset = abs(limit_price - float(reference_price)) / reference_price
+    if max_orderbook_price_offset and price_offset > max_orderbook_price_offset:
+        raise Exception(
+            f"Computed Limit Price {limit_price} is not within the range of the max_orderbook_price_offset "
+            f"{max_orderbook_price_offset = } and reference price {reference_price = }")
+    print(f"{price_offset}% diff between reference price: {reference_price} and and limit price: {limit_price}")
 
     return round(limit_price, 2)
 
 
-async def _validate_instID_and_return_ticker_info(instID):
+async def _validate_instID_and_return_ticker_info(instID) -> InstrumentProfile:
     """
     Cleans and verifies an instrument ID to ensure it's in the correct format and exists within the list of instruments.
 
     :param instID: The instrument ID to clean and verify.
     :type instID: str
-    :returns: The cleaned and verified instrument ID.
+    :returns: The cached profile of the instrument, its `instId` is the cleaned and verified instrument ID.
     :raises AssertionError: If the instrument ID is not in the correct format or the instrument is not found.
     """
     # Clean Input Data
     instID = instID.upper()
-    okx_instrument_searcher: InstrumentSearcher = await get_instruments_searcher_from_redis(
-        await get_async_redis())
-
-    instrument = okx_instrument_searcher.find_by_instId(instID)
-    assert instrument, f'Instrument not found. {instID = }'
-    return instrument
+    instrument_profile = await instrument_profiles.get(await get_async_redis(), instID)
+    assert instrument_profile, f'Instrument not found. {instID = }'
+    return instrument_profile
 
 
 async def _validate_okx_signal_input_tp_sl_trail_params(sl_trigger_price_offset=None,
@@ -1015,8 +984,8 @@ async def _validate_okx_signal_additional_params(
 
 
 async def prepare_dca(dca_parameters: List[DCAInputParameters], side: str, reference_price: float,
-                      ccy_contract_size: float, ccy_last_price: float, usd_to_base_rate: float, leverage: int,
-                      min_order_quantity: int, max_market_order_quantity: int, ctValCcy: str):
+                      instrument_profile: InstrumentProfile, ccy_last_price: float, usd_to_base_rate: float,
+                      leverage: int):
     # Assert the correct input parameters for dca
     assert all([isinstance(param, DCAInputParameters) for param in
                 dca_parameters]), f'The dca_parameters must be a list of DCAInputParameters. {dca_parameters = }'
@@ -1028,10 +997,8 @@ async def prepare_dca(dca_parameters: List[DCAInputParameters], side: str, refer
         order_exec_price = reference_price + params.execution_price_offset if side == 'BUY' else reference_price - params.execution_price_offset
         usd_amount = params.usd_amount
 
-        order_contracts = ccy_usd_to_contracts(usd_equivalent=usd_amount, ccy_contract_size=ccy_contract_size,
-                                               ccy_last_price=ccy_last_price, minimum_contract_size=min_order_quantity,
-                                               max_market_contract_size=max_market_order_quantity,
-                                               usd_base_ratio=usd_to_base_rate, leverage=leverage, ctValCcy=ctValCcy)
+        order_contracts = instrument_profile.usd_to_contracts(usd_amount=usd_amount, last_price=ccy_last_price,
+                                                              leverage=leverage, usd_base_ratio=usd_to_base_rate)
         orders.append(DCAOrderParameters(
             size=order_contracts,
             trigger_price=order_trigger_price,
@@ -1049,9 +1016,53 @@ async def prepare_dca(dca_parameters: List[DCAInputParameters], side: str, refer
     return orders
 
 
+def build_signal_graph(okx_signal: OKXSignalInput, speculate: bool = True) -> TaskGraph:
+    """
+    The steps a signal depends on as a dependency graph. With `speculate`, the reads that only depend on the raw input
+    (instrument, ticker, leverage, order book and, unless the instrument is cleared first, status report) start right
+    away and run while the signal is validated; the validation and the handler take their results from the graph, and
+    the ones the validated signal does not need are cancelled. Nothing that changes the account runs speculatively.
+    """
+    instId = (okx_signal.instID or '').upper()
+    graph = TaskGraph()
+    graph.add('instrument', lambda: timed('instrument_lookup', _validate_instID_and_return_ticker_info(instId)))
+    graph.add('ticker', lambda: timed('ticker', get_ticker(instId=instId)))
+    graph.add('leverage', lambda: timed('leverage', get_leverage(instId=instId, mgnMode='isolated')))
+    graph.add('order_book', lambda: timed('order_book', get_order_book(instId, 400, columnar=True)))
+    graph.add('close_cancel', lambda: timed('close_cancel', asyncio.gather(
+        close_positions(instId=instId), cancel_all_orders(instId=instId),
+        cancel_all_algo_orders_with_params(instId=instId))))
+
+    async def status_report(*_):
+        return await timed('status_report', fetch_status_report_for_instrument(instId, ENFORCED_TD_MODE))
+
+    if okx_signal.clear_prior_to_new_order:
+        graph.add('status_report', status_report, 'close_cancel')  # the report after clearing the instrument
+    else:
+        graph.add('status_report', status_report)
+
+    if speculate and instId and not okx_signal.red_button:
+        main_order = okx_signal.usd_order_size and okx_signal.order_side
+        speculative = ['instrument']
+        if not okx_signal.clear_prior_to_new_order:
+            speculative.append('status_report')
+        if main_order or okx_signal.dca_parameters:
+            speculative.append('ticker')
+            if not okx_signal.leverage:
+                speculative.append('leverage')
+        if (main_order and (okx_signal.order_type or 'limit').lower() != 'market') or any(
+                dca.usd_amount > 0 and dca.order_type.lower() != 'market' for dca in okx_signal.dca_parameters or []):
+            speculative.append('order_book')
+        graph.start(*speculative)
+    return graph
+
+
 async def validate_okx_signal_params(
-        okx_signal: OKXSignalInput
+        okx_signal: OKXSignalInput,
+        graph: TaskGraph = None
 ):
+    """Validates the signal, `graph` (see `build_signal_graph`) provides the reads it needs."""
+    graph = graph or build_signal_graph(okx_signal, speculate=False)
     generated_client_order_id = generate_random_string(16, 'alphanumeric')
     dca_parameters = None
     validated_order_params = {}
@@ -1062,9 +1073,9 @@ async def validate_okx_signal_params(
     else:
         red_button = False
 
-    instId_info = await _validate_instID_and_return_ticker_info(okx_signal.instID)
+    instrument_profile: InstrumentProfile = await graph.get('instrument')
 
-    assert instId_info, f'Instrument not found. {okx_signal.instID = }'
+    assert instrument_profile, f'Instrument not found. {okx_signal.instID = }'
 
     validated_additional_params = await _validate_okx_signal_additional_params(
         leverage=okx_signal.leverage, max_orderbook_limit_price_offset=okx_signal.max_orderbook_limit_price_offset,
@@ -1072,26 +1083,20 @@ async def validate_okx_signal_params(
         flip_position_if_opposite_side=okx_signal.flip_position_if_opposite_side,
         clear_prior_to_new_order=okx_signal.clear_prior_to_new_order)
 
-    if instId_info.expTime:
-        passed_expiration_test = False if int(instId_info.expTime) < int(time.time() * 1000) else True
-        assert passed_expiration_test, f'Instrument has expired. {instId_info.expTime = }'
+    assert not instrument_profile.expired(), f'Instrument has expired. {instrument_profile.expTime = }'
 
-    passed_leverage_test = False if int(instId_info.lever) <= validated_additional_params.get('leverage') else True
-    assert passed_leverage_test, f'Instrument has a higher leverage than the one provided. {instId_info.lever = }'
+    passed_leverage_test = False if instrument_profile.lever <= validated_additional_params.get('leverage') else True
+    assert passed_leverage_test, \
+        f'Instrument has a higher leverage than the one provided. {instrument_profile.lever = }'
 
     _main_order_flag = okx_signal.usd_order_size and okx_signal.order_side
 
     if _main_order_flag or okx_signal.dca_parameters:
-        ctValCcy = instId_info.ctValCcy
-        print(f'{ctValCcy = }')
-        min_order_quantity = int(instId_info.minSz)  # contracts
-        max_market_order_quantity = int(instId_info.maxMktSz)  # contracts
-        ctval_contract_size = float(instId_info.ctVal)
-        instId_ticker: Ticker = await get_ticker(instId=instId_info.instId)
-        assert instId_ticker, f'Could not fetch ticker for {instId_info.instId = }'
+        leverage = validated_additional_params.get('leverage')
+        reads = await graph.gather('ticker', *([] if leverage else ['leverage']))
+        instId_ticker, leverage = reads['ticker'], leverage or reads['leverage']
+        assert instId_ticker, f'Could not fetch ticker for {instrument_profile.instId = }'
         ccy_last_price = float(instId_ticker.last)
-        leverage = validated_additional_params.get('leverage') or await get_leverage(instId=instId_info.instId,
-                                                                                     mgnMode='isolated')
 
         usd_to_base_rate = 1  # TODO use the USD to USDT and USDC ratio but 1 is close enough
 
@@ -1100,22 +1105,16 @@ async def validate_okx_signal_params(
                 dca_parameters=okx_signal.dca_parameters,
                 side=validated_order_params.get('order_side'),
                 reference_price=ccy_last_price,
-                ccy_contract_size=ctval_contract_size, ccy_last_price=ccy_last_price,
-                usd_to_base_rate=usd_to_base_rate, leverage=leverage,
-                min_order_quantity=min_order_quantity,
-                max_market_order_quantity=max_market_order_quantity,
-                ctValCcy=ctValCcy)
+                instrument_profile=instrument_profile, ccy_last_price=ccy_last_price,
+                usd_to_base_rate=usd_to_base_rate, leverage=leverage)
 
     if _main_order_flag:
 
         usd_amount = float(okx_signal.usd_order_size)
-        order_contracts = ccy_usd_to_contracts(usd_equivalent=usd_amount, ccy_contract_size=ctval_contract_size,
-                                               ccy_last_price=ccy_last_price, minimum_contract_size=min_order_quantity,
-                                               max_market_contract_size=max_market_order_quantity,
-                                               usd_base_ratio=usd_to_base_rate, leverage=leverage,
-                                               ctValCcy=ctValCcy)
+        order_contracts = instrument_profile.usd_to_contracts(usd_amount=usd_amount, last_price=ccy_last_price,
+                                                              leverage=leverage, usd_base_ratio=usd_to_base_rate)
 
-        logger.info(f"Number of contracts you can buy: {order_contracts} {instId_info.instId}")
+        logger.info(f"Number of contracts you can buy: {order_contracts} {instrument_profile.instId}")
 
         # Convert these into trailing_stop_callback_offset to trailing_stop_callback_ratio
         if okx_signal.trailing_stop_callback_offset:
@@ -1149,7 +1148,7 @@ async def validate_okx_signal_params(
             sl_trigger_price_type=okx_signal.sl_trigger_price_type)
 
     result = {
-        'instID': instId_info.instId,
+        'instID': instrument_profile.instId,
         'order_size': validated_order_params.get('order_size'),
         'leverage': validated_additional_params.get('leverage'),
         'order_side': validated_order_params.get('order_side'),
@@ -1182,8 +1181,6 @@ async def fetch_incomplete_orders(instId: str = None, instType: str = None):
     limit = 100
     after = ''
     all_data = []
-    request_count = 0
-    start_time = time.time()
     if instId is None:
         instId = ''
     if instType is None:
@@ -1192,17 +1189,11 @@ async def fetch_incomplete_orders(instId: str = None, instType: str = None):
     while True:
         try:
             orders = await get_request_data(
-                tradeAPI.get_order_list(after=after, limit=limit, instId=instId, instType=instType), Order)
+                await tradeAPI.get_order_list(after=after, limit=limit, instId=instId, instType=instType), Order)
             if not orders:
                 break
             all_data.extend(orders)
-            after = orders[-1].ordId
-            request_count += 1
-            if request_count % 60 == 0:
-                elapsed = time.time() - start_time
-                if elapsed < 2:
-                    await asyncio.sleep(2 - elapsed)
-                start_time = time.time()
+            after = orders[-1].ordId  # pagination is paced by the client's orders-pending rate limiter
         except Exception as e:
             logger.error(f'Error fetching orders: {e}')
             break
@@ -1213,8 +1204,6 @@ async def fetch_incomplete_algo_orders(instId=None, ordType=None):
     limit = 100
     after = ''
     all_data = []
-    request_count = 0
-    start_time = time.time()
     if instId is None:
         instId = ''
 
@@ -1234,7 +1223,7 @@ async def fetch_incomplete_algo_orders(instId=None, ordType=None):
                         _keep_loop_alive = False
                         break
                     continue
-                response = tradeAPI.order_algos_list(
+                response = await tradeAPI.order_algos_list(
                     ordType=order_type, after=after_map[order_type], limit=limit,
                     instId=instId)
                 algo_orders = await get_request_data(response, Algo_Order)
@@ -1244,12 +1233,6 @@ async def fetch_incomplete_algo_orders(instId=None, ordType=None):
                     continue
                 all_data.extend(algo_orders)
                 after_map[order_type] = algo_orders[-1].algoId
-                request_count += 1
-                if request_count % 20 == 0:
-                    elapsed = time.time() - start_time
-                    if elapsed < 2:
-                        await asyncio.sleep(2 - elapsed)
-                    start_time = time.time()
         except Exception as e:
             logger.error(f'Error fetching algo orders: {e}')
             break
@@ -1288,12 +1271,10 @@ async def fetch_fill_history(start_timestamp, end_timestamp, instType=None):
     limit = 100
     after = ''
     all_data = []
-    request_count = 0
-    start_time = time.time()
 
     while True:
         try:
-            fills_response = tradeAPI.get_fills_history(
+            fills_response = await tradeAPI.get_fills_history(
                 instType=instType,
                 uly='',
                 instId='',
@@ -1321,18 +1302,7 @@ async def fetch_fill_history(start_timestamp, end_timestamp, instType=None):
 
             after = fills_message_data[-1]['billId']  # Prepare the 'after' for the next request
             logger.info(f'{after = }')
-            # The
-            request_count += 1
-            if request_count % 10 == 0:
-                elapsed = time.time() - start_time
-                if elapsed < 2:
-                    # time.sleep(2 - elapsed)
-                    await asyncio.sleep(2 - elapsed)
-                start_time = time.time()
-
-            await asyncio.sleep(0.1)  # FIXME Here to prevent hogging the CPU remove this line
-
-
+            # No pacing needed here, the client's fills-history bucket (10 requests/2s) spaces out the pages
 
         except HTTPError as http_err:
             logger.error(f'HTTP error occurred: {http_err}')
@@ -1341,7 +1311,7 @@ async def fetch_fill_history(start_timestamp, end_timestamp, instType=None):
             logger.error(f'Other error occurred: {err}')
             break  # Optional: Decide whether to break or retry
 
-    return [FillEntry(**fill) for fill in all_data]
+    return decode_models(all_data, FillEntry)
 
 
 async def okx_signal_handler(
@@ -1452,13 +1422,11 @@ async def okx_signal_handler(
     assert ENFORCED_POS_SIDE_TYPE in ['net', 'long', 'short'], f'{ENFORCED_POS_SIDE_TYPE = }'
 
     if red_button:
-        all_closed_positions: List[Closed_Position] = await close_positions()
-        all_cancelled_orders: List[Cancelled_Order] = await cancel_all_orders()
-        all_cancelled_algo_orders: List[Cancelled_Algo_Order] = await cancel_all_algo_orders_with_params()
+        all_closed_positions, all_cancelled_orders, all_cancelled_algo_orders = await timed(
+            'red_button', asyncio.gather(close_positions(), cancel_all_orders(), cancel_all_algo_orders_with_params()))
         #
-        all_positions: List[WSPosition] = await get_positions()
-        all_orders: List[Order] = await get_orders()
-        all_algo_orders: List[Algo_Order] = await get_algo_orders()
+        all_positions, all_orders, all_algo_orders = await timed('red_button', asyncio.gather(
+            get_positions(), get_orders(), get_algo_orders()))
 
         logger.info(f'{all_closed_positions = }')
         logger.info(f'{all_cancelled_orders = }')
@@ -1475,10 +1443,14 @@ async def okx_signal_handler(
                 'all_algo_orders': all_algo_orders
                 }
 
+    # Reads that do not depend on the validation run while it is in progress
+    graph = build_signal_graph(okx_signal_input)
+
     # Clean Input Data
     try:
-        validated_params = await validate_okx_signal_params(okx_signal_input)
+        validated_params = await timed('validation', validate_okx_signal_params(okx_signal_input, graph))
     except Exception as e:
+        graph.cancel()
         return {'error': str(e)}
 
     # Get back all the values validated
@@ -1508,30 +1480,39 @@ async def okx_signal_handler(
 
     assert isinstance(instID, str), f'{instID = }'
     if clear_prior_to_new_order:
-        closed_positions = await close_positions(instId=instID)
-        cancelled_orders = await cancel_all_orders(instId=instID)
-        cancelled_algo_orders = await cancel_all_algo_orders_with_params(instId=instID)
+        closed_positions, cancelled_orders, cancelled_algo_orders = await graph.get('close_cancel')
         print(f'{closed_positions = }')
         print(f'{cancelled_orders = }')
         print(f'{cancelled_algo_orders = }')
 
     # (simplified_balance_details, account_config, instrument_status_report) = await fetch_initial_data(TD_MODE,
     #                                                                                                   instId=instID)
-    instrument_status_report = await fetch_status_report_for_instrument(instId=instID, TD_MODE=ENFORCED_TD_MODE)
-
+    # Everything the orders below depend on is independent of each other, most of it was prefetched already
+    needs_order_book = (order_side and order_size and order_type != 'market') or any(
+        dca_order.size > 0 and dca_order.type != 'market' for dca_order in dca_parameters or [])
+    needed = ['status_report']
+    if order_side and order_size:
+        needed.append('ticker')
+    if needs_order_book:
+        needed.append('order_book')
     if leverage and leverage > 0:
-        accountAPI.set_leverage(
+        # Like the report, the leverage is set once the instrument was cleared (when it is)
+        graph.add('set_leverage', lambda *_: timed('leverage', account_state.set_leverage(
             lever=leverage,
             mgnMode=ENFORCED_TD_MODE,
             instId=instID,
             posSide=ENFORCED_POS_SIDE_TYPE
-        )
+        )), *(['close_cancel'] if clear_prior_to_new_order else []))
+        needed.append('set_leverage')
+    reads = await graph.gather(*needed)
+    graph.cancel()  # speculative reads the validated signal does not use
+    instrument_status_report, ticker, order_book = reads['status_report'], reads.get('ticker'), reads.get('order_book')
 
     position = instrument_status_report.positions[0] if len(
         instrument_status_report.positions) > 0 else None  # we are only using net so only one position
 
+    trailing_stop_order_request = None
     if order_side and order_size:
-        ticker = await get_ticker(instId=instID)
         print(f'{ticker = }')
         ask_price = float(ticker.askPx) if ticker.askPx else ticker.bidPx  # fixme sometimes okx returns '' for askPx
         bid_price = float(ticker.bidPx)  # FIXME try if empty do askprice
@@ -1544,12 +1525,12 @@ async def okx_signal_handler(
             elif order_side and position_side != order_side:
                 if flip_position_if_opposite_side:
                     logger.info(f'Flipping position from {position_side = } to {order_side = }')
-                    await close_positions(instId=instID)
+                    _, cancelled_orders, cancelled_algo_orders = await timed('close_cancel', asyncio.gather(
+                        close_positions(instId=instID), cancel_all_orders(instId=instID),
+                        cancel_all_algo_orders_with_params(instId=instID)))
                     logger.info(f'Closed all positions for {instID = }')
-                    cancelled_orders = await cancel_all_orders(instId=instID)
                     logger.info(f"Cancelling orders to flip position: \n"
                                 f"    {cancelled_orders = }")
-                    cancelled_algo_orders = await cancel_all_algo_orders_with_params(instId=instID)
                     logger.info(f"Cancelling Algo orders to flip position: \n"
                                 f"    {cancelled_algo_orders = }")
                 else:
@@ -1580,14 +1561,19 @@ async def okx_signal_handler(
                                 if algo_order.side != dominant_pos_side:
                                     algo_orders_to_cancel.append(algo_order)
 
+                            cancels = TaskGraph()
+                            if orders_to_cancel:
+                                cancels.add('orders', lambda: cancel_all_orders(orders_list=orders_to_cancel))
+                            if algo_orders_to_cancel:
+                                cancels.add('algo_orders', lambda: cancel_all_algo_orders_with_params(
+                                    algo_orders_list=algo_orders_to_cancel))
+                            cancelled = await timed('close_cancel', cancels.gather(*cancels.nodes))
+                            cancelled_algo_orders = cancelled.get('algo_orders')
                             if orders_to_cancel:
-                                await cancel_all_orders(orders_list=orders_to_cancel)
                                 logger.info(f"Cancelling orders to prep for incoming orders: \n"
                                             f"    {orders_to_cancel = }")
                             if algo_orders_to_cancel:
                                 logger.info(f'{algo_orders_to_cancel = }')
-                                cancelled_algo_orders = cancel_all_algo_orders_with_params(
-                                    algo_orders_list=algo_orders_to_cancel)
                                 logger.info(f"Cancelling Algo orders to prep for incoming orders: \n"
                                             f"    {cancelled_algo_orders = }")
 
@@ -1610,7 +1596,6 @@ async def okx_signal_handler(
         )
 
         if order_type != 'market':
-            order_book = await get_order_book(instID, 400)
             if not isinstance(min_orderbook_limit_price_offset, float):
                 min_orderbook_limit_price_offset = 0.0
 
@@ -1618,9 +1603,9 @@ async def okx_signal_handler(
                 reference_price - min_orderbook_limit_price_offset
             try:
 
-                limit_price = await prepare_limit_price(order_book, order_size, order_side,
+                limit_price = await timed('order_book', prepare_limit_price(order_book, order_size, order_side,
                                                         target_limit_price,
-                                                        max_orderbook_price_offset=max_orderbook_limit_price_offset)
+                                                        max_orderbook_price_offset=max_orderbook_limit_price_offset))
                 logger.info(f'Setting New Target Limit Price to {limit_price = }')
                 order_request_dict['px'] = limit_price
             except Exception as e:
@@ -1656,14 +1641,14 @@ async def okx_signal_handler(
                 algoClOrdId=f'{generated_client_order_id}TPORSL'
             )
 
-        order_placement_return = await place_order(**order_request_dict)
+        order_placement_return = await timed('entry_placement', place_order(**order_request_dict))
 
         logger.info(f'{order_placement_return = }')
 
         if order_placement_return and order_placement_return.sCode != '0':
             logger.info(f'{order_placement_return.sMsg = }')
-            await cancel_all_orders(instId=instID)
-            await cancel_all_algo_orders_with_params(instId=instID)
+            await timed('close_cancel', asyncio.gather(cancel_all_orders(instId=instID),
+                                                       cancel_all_algo_orders_with_params(instId=instID)))
             return {'error': 'Cancelling orders due to error msg=' + order_placement_return.sMsg}
 
         if trailing_stop_loss_activated:
@@ -1672,8 +1657,8 @@ async def okx_signal_handler(
                 activePx = reference_price + trailing_stop_activation_price_offset if order_side == 'buy' else \
                     reference_price - trailing_stop_activation_price_offset
 
-            # Create Trailing Stop Loss
-            trailing_stop_order_placement_return = await place_algo_trailing_stop_loss(
+            # Create Trailing Stop Loss, placed together with the DCA orders below
+            trailing_stop_order_request = dict(
                 instId=instID,
                 tdMode=ENFORCED_TD_MODE,
                 ordType="move_order_stop",
@@ -1686,11 +1671,9 @@ async def okx_signal_handler(
                 algoClOrdId=f'{generated_client_order_id}TrailS',
                 cxlOnClosePos="true",
             )
-            logger.info(f'{trailing_stop_order_placement_return = }')
 
+    dca_orders_to_call = []
     if dca_parameters and isinstance(dca_parameters, list):
-        dca_orders_to_call = []
-        _order_book = None
         for dca_order in dca_parameters:
             if dca_order.size <= 0:
                 logger.warning(f'Ignoring DCA order with size {dca_order.size = }')
@@ -1709,8 +1692,6 @@ async def okx_signal_handler(
                 algoClOrdId=f'{generate_random_string(16, "alphanumeric") + "DCA"}'
             )
 
-            if not _order_book and dca_order.type != 'market':
-                _order_book = await get_order_book(instID, 400)
             if dca_order.type != 'market':
 
                 if not isinstance(min_orderbook_limit_price_offset, float):
@@ -1719,11 +1700,11 @@ async def okx_signal_handler(
                 target_limit_price = dca_order.execution_price + min_orderbook_limit_price_offset if order_side == 'buy' else \
                     dca_order.execution_price - min_orderbook_limit_price_offset
                 try:
-                    dca_order_request_dict['orderPx'] = await prepare_limit_price(
-                        _order_book, dca_order.size,
+                    dca_order_request_dict['orderPx'] = await timed('dca', prepare_limit_price(
+                        order_book, dca_order.size,
                         str(dca_order.side).lower(),
                         target_limit_price,
-                        max_orderbook_price_offset=max_orderbook_limit_price_offset)
+                        max_orderbook_price_offset=max_orderbook_limit_price_offset))
                 except Exception as e:
                     logger.error(
                         f'Error preparing limit price: {e}\n   Will set to the reference price {target_limit_price = }')
@@ -1756,15 +1737,24 @@ async def okx_signal_handler(
 
             dca_orders_to_call.append(dca_order_request_dict)
 
-        dca_orders_placement_return = await asyncio.gather(
-            *[place_algo_order(**dca_order) for dca_order in dca_orders_to_call]
-        )
-
-        dca_orders_placement_return = list(itertools.chain(*dca_orders_placement_return))
-
+    # The trailing stop and every DCA leg are independent algo orders, all sent at once
+    placements = TaskGraph()
+    if trailing_stop_order_request:
+        placements.add('trailing_stop', lambda: timed('tp_sl', place_algo_trailing_stop_loss(
+            **trailing_stop_order_request)))
+    if dca_orders_to_call:
+        placements.add('dca', lambda: timed('dca', asyncio.gather(
+            *[place_algo_order(**dca_order) for dca_order in dca_orders_to_call])))
+    placed = await placements.gather(*placements.nodes)
+    if trailing_stop_order_request:
+        trailing_stop_order_placement_return = placed['trailing_stop']
+        logger.info(f'{trailing_stop_order_placement_return = }')
+    if dca_orders_to_call:
+        dca_orders_placement_return = list(itertools.chain(*[placement_return or [] for placement_return in
+                                                             placed['dca']]))
         logger.info(f'{dca_orders_placement_return = }')
 
-    return await fetch_status_report_for_instrument(instID, ENFORCED_TD_MODE)
+    return await timed('final_status_report', fetch_status_report_for_instrument(instID, ENFORCED_TD_MODE))
 
 
 async def okx_premium_indicator_handler(indicator_input: Union[OKXPremiumIndicatorSignalRequestForm, dict]):
@@ -1834,7 +1824,7 @@ async def okx_premium_indicator_handler(indicator_input: Union[OKXPremiumIndicat
         elif premium_indicator.Bullish_Exit:
             _close_signal = 'exit_buy'
 
-        instId_positions = await get_positions(instId=indicator_input.OKXSignalInput.instID)
+        instId_positions = await timed('status_report', get_positions(instId=indicator_input.OKXSignalInput.instID))
         if len(instId_positions) > 0:
             current_position = instId_positions[0]
             current_position_side = 'buy' if float(current_position.pos) > 0 else 'sell' if float(
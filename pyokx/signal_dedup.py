@@ -0,0 +1,90 @@
+"""
+Duplicate webhook suppression.
+
+TradingView retries and duplicated alert rules deliver the same payload several times within seconds, each copy would
+run a full close/cancel/place cycle. The webhooks fingerprint the normalized signal payload (`signal_fingerprint`) and
+claim it in Redis with SET NX and a short TTL (`SIGNAL_DEDUP_TTL`), so the claim is shared by every worker. Only the
+first copy is executed. The others get the record of the original right away: in flight, completed/failed with the
+id of its entry in the webhook response stream, or superseded when the signal queue dropped it for a newer signal. A
+claim whose signal was never queued (or was dropped on shutdown) is released, so a retry is executed.
+
+Usage:
+    fingerprint = signal_fingerprint(signal_input.OKXSignalInput)
+    original = await signal_deduplicator.claim(async_redis, fingerprint, instId=instId)
+    if original is not None:
+        return original  # duplicate
+    ...
+    await signal_deduplicator.complete(async_redis, fingerprint, COMPLETED, response_stream_id=response_id)
+"""
+import hashlib
+import json
+import os
+from typing import Optional
+
+import aioredis
+from pydantic import BaseModel
+
+from redis_tools.utils import serialize_for_redis, deserialize_from_redis
+
+SIGNAL_DEDUP_TTL = int(os.getenv('SIGNAL_DEDUP_TTL', 30))  # seconds
+
+IN_FLIGHT = 'in_flight'
+COMPLETED = 'completed'
+FAILED = 'failed'
+SUPERSEDED = 'superseded'
+
+
+def _normalize(value):
+    """Equal signals written differently ('BUY'/'buy', 100/100.0, None/'') normalize to the same value."""
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, bool) or value is None:
+        return value or ''
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+
+def signal_fingerprint(*payloads: BaseModel) -> str:
+    """Fingerprint of the normalized payloads (not of the api keys sent along, they do not change the signal)."""
+    normalized = [_normalize(payload.model_dump(mode='json')) for payload in payloads]
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+class SignalDeduplicator:
+    """Claims of signal fingerprints in Redis, see the module docstring."""
+
+    def __init__(self, ttl: int = SIGNAL_DEDUP_TTL, prefix: str = 'okx:signal_dedup@'):
+        self.ttl = ttl
+        self.prefix = prefix
+        self.stats = {'claimed': 0, 'duplicates': 0}
+
+    async def claim(self, async_redis: aioredis.Redis, fingerprint: str, **record) -> Optional[dict]:
+        """None when this copy is the first (it is then in flight), otherwise the record of the original."""
+        key = self.prefix + fingerprint
+        if await async_redis.set(key, serialize_for_redis({'status': IN_FLIGHT, **record}), nx=True, ex=self.ttl):
+            self.stats['claimed'] += 1
+            return None
+        self.stats['duplicates'] += 1
+        original = await async_redis.get(key)
+        # The claim may have expired in between, the copy is still too close to the original to be executed
+        return deserialize_from_redis(original) if original else {'status': IN_FLIGHT, **record}
+
+    async def complete(self, async_redis: aioredis.Redis, fingerprint: str, status: str = COMPLETED, **outcome):
+        """Records the outcome of the original, duplicates arriving within the TTL get it."""
+        key = self.prefix + fingerprint
+        original = await async_redis.get(key)
+        record = deserialize_from_redis(original) if original else {}
+        await async_redis.set(key, serialize_for_redis({**record, **outcome, 'status': status}), ex=self.ttl)
+
+    async def release(self, async_redis: aioredis.Redis, fingerprint: str):
+        """Forgets the claim of a signal that was not executed, the next copy is executed."""
+        await async_redis.delete(self.prefix + fingerprint)
+
+
+# Shared by the webhooks of the process, the claims themselves are shared through Redis
+signal_deduplicator = SignalDeduplicator()
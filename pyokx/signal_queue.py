@@ -0,0 +1,201 @@
+"""
+Per-instrument execution queue of trading signals.
+
+The webhooks acknowledge a signal as soon as it is queued instead of running the whole handler within the HTTP request.
+`SignalExecutor` runs the signals of one instrument one after the other, so the close/cancel/place steps of two bursts
+for the same instrument never interleave, while different instruments run in parallel (one worker task per instrument
+with queued work).
+
+A newer signal for an instrument supersedes the ones still waiting for it: they are dropped, only the signal running
+and the newest one are executed. Red button signals are never dropped (`supersedable=False`), a flatten always runs.
+The `on_drop` callback of a dropped signal is called with the reason ('superseded' or 'shutdown').
+
+A red button flattens every instrument, so it is submitted `exclusive=True`: it runs once every signal submitted before
+it (for any instrument) has finished or was dropped, and the signals submitted after it wait for it to finish. An entry
+signal queued right after the flatten therefore cannot run alongside it and reopen a position it is closing.
+
+Queue depth, running signals, wait times and outcomes are exposed on `/metrics`.
+
+Usage:
+    async def run(queue_wait):
+        ...  # handle the signal and publish its response
+    async def dropped(reason):
+        ...  # e.g. release the duplicate suppression claim of the signal
+    ack = signal_executor.submit(instId, run, description='antbot signal', on_drop=dropped)
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from pyokx.low_rest_api.metrics import Histogram
+from shared import logging
+
+logger = logging.setup_logger(__name__)
+
+QUEUE_WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SHUTDOWN_TIMEOUT = 10  # seconds the running signals get to finish on shutdown
+SUPERSEDED = 'superseded'
+SHUTDOWN = 'shutdown'
+
+
+class QueuedSignal:
+    __slots__ = ('instId', 'run', 'supersedable', 'exclusive', 'description', 'on_drop', 'seq', 'submitted')
+
+    def __init__(self, instId: str, run: Callable[[float], Awaitable], supersedable: bool, description: str,
+                 on_drop: Optional[Callable[[str], Awaitable]] = None, exclusive: bool = False, seq: int = 0):
+        self.instId = instId
+        self.run = run
+        self.supersedable = supersedable
+        self.exclusive = exclusive
+        self.description = description
+        self.on_drop = on_drop
+        self.seq = seq  # submission order across instruments
+        self.submitted = time.perf_counter()
+
+
+class SignalExecutor:
+    """Serializes signals per instId, see the module docstring."""
+
+    def __init__(self):
+        self.pending: Dict[str, Deque[QueuedSignal]] = {}
+        self.running: Dict[str, QueuedSignal] = {}
+        self.workers: Dict[str, asyncio.Task] = {}
+        self._drop_callbacks = set()
+        self._seq = itertools.count()
+        self._changed = asyncio.Event()  # replaced by a new event each time a signal finishes or is dropped
+        self.wait_time = Histogram(QUEUE_WAIT_BUCKETS)
+        self.stats = {'submitted': 0, 'superseded': 0, 'executed': 0, 'failed': 0}
+
+    def submit(self, instId: str, run: Callable[[float], Awaitable], supersedable: bool = True,
+               description: str = 'signal', on_drop: Optional[Callable[[str], Awaitable]] = None,
+               exclusive: bool = False) -> dict:
+        """
+        Queues `run` for `instId` (case insensitive, as OKX instIds), it is awaited with the seconds the signal waited
+        in the queue. `on_drop` is awaited with the reason if the signal is dropped instead. An `exclusive` signal runs
+        alone, after every signal submitted before it and before every signal submitted after it. Returns the
+        acknowledgement of the webhook.
+        """
+        instId = instId.upper()
+        self.stats['submitted'] += 1
+        queue = self.pending.setdefault(instId, deque())
+        superseded = 0
+        if supersedable:
+            kept = deque(signal for signal in queue if not signal.supersedable)
+            superseded = len(queue) - len(kept)
+            for signal in queue:
+                if signal.supersedable:
+                    self._dropped(signal, SUPERSEDED)
+            if superseded:
+                self.stats['superseded'] += superseded
+                logger.info(f'{superseded} queued signal(s) of {instId} superseded by a newer {description}')
+            self.pending[instId] = queue = kept
+            if superseded:
+                self._notify()
+        signal = QueuedSignal(instId, run, supersedable, description, on_drop, exclusive, next(self._seq))
+        queue.append(signal)
+        if instId not in self.workers:
+            self.workers[instId] = asyncio.create_task(self._work(instId))
+        if exclusive:
+            queued_ahead = len(self.running) + sum(len(queue) for queue in self.pending.values()) - 1
+        else:
+            queued_ahead = len(queue) - 1 + (instId in self.running)
+        return {'instId': instId, 'queued_ahead': queued_ahead, 'superseded': superseded}
+
+    def _blocked(self, signal: QueuedSignal) -> bool:
+        """Whether `signal` has to wait for a signal submitted before it to another instrument."""
+        ahead = (other for other in itertools.chain(self.running.values(), *self.pending.values())
+                 if other.seq < signal.seq)
+        if signal.exclusive:
+            return any(True for _ in ahead)
+        return any(other.exclusive for other in ahead)
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _work(self, instId: str):
+        try:
+            while self.pending.get(instId):
+                # The head of the queue may be superseded while it waits for an exclusive signal, or vice versa
+                while self.pending.get(instId) and self._blocked(self.pending[instId][0]):
+                    await self._changed.wait()
+                if not self.pending.get(instId):
+                    break
+                signal = self.pending[instId].popleft()
+                queue_wait = time.perf_counter() - signal.submitted
+                self.wait_time.observe(queue_wait)
+                self.running[instId] = signal
+                try:
+                    await signal.run(queue_wait)
+                    self.stats['executed'] += 1
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    logger.error(f'Exception running the {signal.description} of {instId}: {e!r}')
+                finally:
+                    del self.running[instId]
+                    self._notify()
+        finally:
+            del self.workers[instId]
+            if not self.pending.get(instId):
+                self.pending.pop(instId, None)
+
+    def _dropped(self, signal: QueuedSignal, reason: str):
+        if signal.on_drop is None:
+            return
+        task = asyncio.create_task(signal.on_drop(reason))
+        self._drop_callbacks.add(task)
+        task.add_done_callback(self._drop_callback_done)
+
+    def _drop_callback_done(self, task: asyncio.Task):
+        self._drop_callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f'Exception in the drop callback of a signal: {task.exception()!r}')
+
+    def depth(self) -> Dict[str, int]:
+        """Signals waiting per instId (not counting the running one)."""
+        return {instId: len(queue) for instId, queue in self.pending.items() if queue}
+
+    async def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT):
+        """Drops the queued signals, lets the running ones finish for up to `timeout` seconds and cancels the rest."""
+        dropped = sum(len(queue) for queue in self.pending.values())
+        if dropped:
+            logger.warning(f'Dropping {dropped} queued signal(s) on shutdown')
+        for queue in self.pending.values():
+            for signal in queue:
+                self._dropped(signal, SHUTDOWN)
+        self.pending.clear()
+        self._notify()
+        workers = list(self.workers.values())
+        if not workers:
+            return
+        _, still_running = await asyncio.wait(workers, timeout=timeout)
+        for worker in still_running:
+            worker.cancel()
+        await asyncio.gather(*workers, *self._drop_callbacks, return_exceptions=True)
+
+    def render(self) -> str:
+        """Prometheus text exposition of the queue."""
+        lines = ['# HELP okx_signal_queue_depth Signals waiting per instrument.',
+                 '# TYPE okx_signal_queue_depth gauge']
+        lines += [f'okx_signal_queue_depth{{instId="{instId}"}} {depth}' for instId, depth in
+                  sorted(self.depth().items())]
+        lines += ['# HELP okx_signal_queue_running Signals being executed.',
+                  '# TYPE okx_signal_queue_running gauge',
+                  f'okx_signal_queue_running {len(self.running)}',
+                  '# HELP okx_signal_queue_signals_total Signals by outcome.',
+                  '# TYPE okx_signal_queue_signals_total counter']
+        lines += [f'okx_signal_queue_signals_total{{result="{result}"}} {count}' for result, count in
+                  self.stats.items()]
+        name = 'okx_signal_queue_wait_seconds'
+        lines += [f'# HELP {name} Time signals waited in the queue before being executed.',
+                  f'# TYPE {name} histogram']
+        for bound, count in zip(list(self.wait_time.buckets) + ['+Inf'], self.wait_time.cumulative_counts()):
+            lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+        lines += [f'{name}_sum {self.wait_time.sum}', f'{name}_count {self.wait_time.count}']
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by the webhooks of the process
+signal_executor = SignalExecutor()
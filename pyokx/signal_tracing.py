@@ -0,0 +1,155 @@
+"""
+Per-stage latency tracing of signal handling.
+
+A webhook starts a `SignalTrace` for the signal it received (`start_trace`), the handlers mark their stages with
+`stage(name)` (a context manager) or `timed(name, awaitable)` (for awaitables run concurrently in a gather). The trace
+is held in a context variable, so the tasks of a gather record into the trace of their signal, concurrent signals never
+mix and code running without a trace (scripts, tests) records nothing. A stage entered more than once accumulates.
+
+Stages of the signal path: queue_wait, red_button, validation (which includes instrument_lookup), status_report,
+ticker, leverage, close_cancel, order_book, entry_placement, tp_sl, dca, final_status_report and response_publishing.
+Stages requested concurrently overlap, their sum can exceed the total. queue_wait is spent in the signal queue before
+the trace starts, so it is not part of the total. response_publishing happens after the response is written, so it is
+only part of the aggregated percentiles.
+
+Finished traces are aggregated by `signal_latency` into the latest `SIGNAL_LATENCY_SAMPLES` durations per stage and
+instrument, from which percentiles are computed, also exposed on `/metrics` as a Prometheus summary.
+
+Usage:
+    trace = start_trace(instId)
+    with stage('validation'):
+        ...
+    report, ticker = await asyncio.gather(timed('status_report', ...), timed('ticker', ...))
+    signal_latency.observe(trace)
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+SIGNAL_LATENCY_SAMPLES = int(os.getenv('SIGNAL_LATENCY_SAMPLES', 1000))
+SIGNAL_LATENCY_PERCENTILES = (50, 90, 99)
+TOTAL = 'total'
+
+_current_trace = contextvars.ContextVar('signal_trace', default=None)
+
+
+class SignalTrace:
+    """Durations of the stages of one signal, in seconds."""
+
+    def __init__(self, instId: str = ''):
+        self.instId = instId
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stages: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def as_dict(self) -> dict:
+        """Milliseconds per stage, as attached to the webhook responses."""
+        return {'instId': self.instId, 'total_ms': round(self.total * 1000, 3),
+                'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}}
+
+
+def start_trace(instId: str = '') -> SignalTrace:
+    """Starts the trace of a signal, in effect for the rest of the current task and the tasks it creates."""
+    trace = SignalTrace(instId)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[SignalTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Times the enclosed block as stage `name` of the current trace, if any."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(name, time.perf_counter() - start)
+
+
+async def timed(name: str, awaitable):
+    """Awaits `awaitable` as stage `name` of the current trace."""
+    with stage(name):
+        return await awaitable
+
+
+class SignalLatencyStats:
+    """Latest durations per (stage, instId) of the finished traces, and their percentiles."""
+
+    def __init__(self, max_samples: int = SIGNAL_LATENCY_SAMPLES):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self.samples: Dict[Tuple[str, str], deque] = {}
+        self.sums: Dict[Tuple[str, str], float] = {}
+        self.counts: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, trace: SignalTrace):
+        trace.finish()
+        with self._lock:
+            for name, seconds in list(trace.stages.items()) + [(TOTAL, trace.total)]:
+                key = (name, trace.instId)
+                samples = self.samples.get(key)
+                if samples is None:
+                    samples = self.samples[key] = deque(maxlen=self.max_samples)
+                samples.append(seconds)
+                self.sums[key] = self.sums.get(key, 0.0) + seconds
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def percentiles(self, instId: str = None, percentiles=SIGNAL_LATENCY_PERCENTILES) -> Dict[str, dict]:
+        """
+        {stage: {'count': n, 'p50_ms': ..., ...}} over the kept samples of `instId`, or of all instruments when None.
+        """
+        with self._lock:
+            by_stage = {}
+            for (name, key_instId), samples in self.samples.items():
+                if instId is None or key_instId == instId:
+                    by_stage.setdefault(name, []).extend(samples)
+        summary = {}
+        for name, samples in sorted(by_stage.items()):
+            values = np.percentile(np.array(samples), percentiles) * 1000
+            summary[name] = {'count': len(samples),
+                             **{f'p{percentile}_ms': round(float(value), 3)
+                                for percentile, value in zip(percentiles, values)}}
+        return summary
+
+    def render(self) -> str:
+        """Prometheus text exposition, a summary per stage and instrument."""
+        name = 'okx_signal_stage_duration_seconds'
+        lines = [f'# HELP {name} Duration of the stages of signal handling, over the latest signals.',
+                 f'# TYPE {name} summary']
+        with self._lock:
+            for (stage_name, instId), samples in sorted(self.samples.items()):
+                labels = f'stage="{stage_name}",instId="{instId}"'
+                values = np.percentile(np.array(samples), SIGNAL_LATENCY_PERCENTILES)
+                for percentile, value in zip(SIGNAL_LATENCY_PERCENTILES, values):
+                    lines.append(f'{name}{{{labels},quantile="{percentile / 100}"}} {float(value)}')
+                lines.append(f'{name}_sum{{{labels}}} {self.sums[(stage_name, instId)]}')
+                lines.append(f'{name}_count{{{labels}}} {self.counts[(stage_name, instId)]}')
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every webhook of the process
+signal_latency = SignalLatencyStats()
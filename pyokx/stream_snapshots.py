@@ -0,0 +1,130 @@
+"""
+In-process cache of the latest orders, positions and algo orders snapshots published to Redis.
+
+The polling/websocket services publish the full list of incomplete orders (`okx:rest@orders`), incomplete algo orders
+(`okx:rest@algo-orders`) and positions (`okx:websockets@positions`) as Redis stream entries. Reading them used to
+deserialize the entry and rebuild every model on each call, then filter the list linearly.
+
+`StreamSnapshot` keeps the latest entry, keyed by its stream entry ID: the entry is only parsed when a new one was
+published, and its records are grouped by instId so a lookup for one instrument only builds the models of that
+instrument. The models of all records, and hash indexes by the other filter fields (instType, ordType, state, ...),
+are built the first time a lookup needs them. Repeated reads while the entry is unchanged, e.g. the several lookups of
+one signal, parse nothing.
+
+`refresh_snapshots` fetches the latest entry of several snapshots in one pipelined Redis round trip.
+
+The cached models are shared by every caller and must be treated as read-only.
+"""
+from typing import Callable, Dict, List, Sequence, Type
+
+import aioredis
+from pydantic import BaseModel
+
+from pyokx.data_structures import Order, Algo_Order
+from pyokx.low_rest_api.decoding import decode_models
+from pyokx.ws_data_structures import WSPosition
+from redis_tools.utils import deserialize_from_redis
+
+
+class StreamSnapshot:
+    """
+    The `model`s of the latest entry of a Redis stream, indexed by `index_fields`. `records` extracts the list of model
+    dicts from the deserialized entry.
+    """
+
+    def __init__(self, stream: str, model: Type[BaseModel], index_fields: Sequence[str],
+                 records: Callable[[object], list] = None):
+        self.stream = stream
+        self.model = model
+        self.records = records or (lambda message: message)
+        self.index_fields = tuple(index_fields)
+        self.stats = {'hits': 0, 'rebuilds': 0}
+        self._set_records(None, [])
+
+    def _set_records(self, stream_id, records: list):
+        self.stream_id = stream_id
+        self._records = records
+        self._records_by_instId: Dict[str, list] = {}
+        for record in records:
+            self._records_by_instId.setdefault(record.get('instId'), []).append(record)
+        self._items_by_instId: Dict[str, list] = {}  # models of the instruments looked up so far
+        self._items = None  # models of all records, built on the first lookup not limited to one instId
+        self._indexes: Dict[str, Dict[str, list]] = {}
+
+    def apply(self, messages):
+        """Takes the result of XREVRANGE COUNT 1 on the stream, parses the entry only if its ID changed."""
+        if not messages:
+            print(f"{self.stream} information not ready in cache!")
+            self._set_records(None, [])
+            return
+        stream_id, message = messages[0]
+        if stream_id == self.stream_id:
+            self.stats['hits'] += 1
+            return
+        self.stats['rebuilds'] += 1
+        message_serialized = message.get("data")
+        if not message_serialized:
+            print(f"A message in the stream {self.stream} with id {stream_id} was empty, skipping")
+            self._set_records(stream_id, [])
+            return
+        self._set_records(stream_id, self.records(deserialize_from_redis(message_serialized)))
+
+    async def refresh(self, async_redis: aioredis.Redis):
+        self.apply(await async_redis.xrevrange(self.stream, count=1))
+
+    @property
+    def items(self) -> list:
+        if self._items is None:
+            self._items = decode_models(self._records, self.model)
+            for field in self.index_fields:
+                index = self._indexes[field] = {}
+                for item in self._items:
+                    index.setdefault(getattr(item, field, None), []).append(item)
+        return self._items
+
+    def _instrument_items(self, instId: str) -> list:
+        items = self._items_by_instId.get(instId)
+        if items is None:
+            if self._items is not None:
+                items = self._indexes['instId'].get(instId, [])
+            else:
+                items = decode_models(self._records_by_instId.get(instId, []), self.model)
+            self._items_by_instId[instId] = items
+        return items
+
+    def select(self, **criteria) -> List:
+        """Items whose fields equal every given (not None) criterion, in snapshot order."""
+        criteria = {field: value for field, value in criteria.items() if value is not None}
+        if not criteria:
+            return list(self.items)
+        if 'instId' in criteria:
+            candidates = self._instrument_items(criteria.pop('instId'))
+        else:
+            items = self.items  # builds the indexes
+            # Start from the smallest indexed bucket and check the remaining criteria on it only
+            candidates = min((self._indexes[field].get(value, []) if field in self._indexes else items
+                              for field, value in criteria.items()), key=len)
+        return [item for item in candidates if all(getattr(item, field, None) == value
+                                                   for field, value in criteria.items())]
+
+    async def get(self, async_redis: aioredis.Redis, **criteria) -> List:
+        await self.refresh(async_redis)
+        return self.select(**criteria)
+
+
+async def refresh_snapshots(async_redis: aioredis.Redis, *snapshots: StreamSnapshot) -> tuple:
+    """Refreshes `snapshots` from a single pipelined round trip, returns their stream entry IDs."""
+    pipe = async_redis.pipeline(transaction=False)
+    for snapshot in snapshots:
+        pipe.xrevrange(snapshot.stream, count=1)
+    for snapshot, messages in zip(snapshots, await pipe.execute()):
+        snapshot.apply(messages)
+    return tuple(snapshot.stream_id for snapshot in snapshots)
+
+
+orders_snapshot = StreamSnapshot('okx:rest@orders', Order, ('instId', 'instType', 'ordType', 'state', 'instFamily'))
+algo_orders_snapshot = StreamSnapshot('okx:rest@algo-orders', Algo_Order, ('instId', 'instType', 'ordType', 'state'))
+# Closed positions (pos '0') are kept out of the snapshot, no caller wants them
+positions_snapshot = StreamSnapshot(
+    'okx:websockets@positions', WSPosition, ('instId', 'instType'),
+    records=lambda message: [position for position in message.get('data') or [] if position.get('pos') != '0'])
@@ -0,0 +1,67 @@
+"""
+Minimal dependency graph of async steps.
+
+Each node is an async function of the results of the nodes it depends on. A node runs at most once, as a task, started
+either explicitly (`start`, e.g. speculatively before it is known to be needed) or on the first `get`, which also starts
+its dependencies. `cancel` stops the nodes still running, e.g. speculative ones whose results turned out to be unused.
+
+Tasks copy the context of the code that starts them, so context variables (the signal trace) follow the nodes.
+
+Usage:
+    graph = TaskGraph()
+    graph.add('instrument', lambda: lookup(instId))
+    graph.add('order_book', lambda instrument: get_order_book(instrument.instId), 'instrument')
+    graph.start('order_book')        # runs 'instrument' then 'order_book' in the background
+    order_book = await graph.get('order_book')
+    graph.cancel()
+
+Optional steps are nodes added only when they apply, `gather` then runs whichever were added:
+    if needs_order_book:
+        graph.add('order_book', ...)
+    results = await graph.gather(*graph.nodes)  # {'instrument': ..., 'order_book': ...}
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class TaskGraph:
+    """Named async steps with dependencies, see the module docstring."""
+
+    def __init__(self):
+        self.nodes: Dict[str, Tuple[Callable[..., Awaitable], Tuple[str, ...]]] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def add(self, name: str, function: Callable[..., Awaitable], *dependencies: str):
+        self.nodes[name] = (function, dependencies)
+
+    def start(self, *names: str):
+        """Starts the nodes (and through them their dependencies) that are not running yet."""
+        for name in names:
+            if name not in self.tasks:
+                task = self.tasks[name] = asyncio.create_task(self._run(name))
+                # The exception of a node nobody awaits (e.g. cancelled speculation) is not an unhandled error
+                task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def _run(self, name: str):
+        function, dependencies = self.nodes[name]
+        results = await asyncio.gather(*[self.get(dependency) for dependency in dependencies])
+        return await function(*results)
+
+    async def get(self, name: str):
+        """Result of the node, started now if it was not already."""
+        self.start(name)
+        return await asyncio.shield(self.tasks[name])
+
+    async def gather(self, *names: str) -> Dict[str, Any]:
+        """Results of the nodes by name, run concurrently."""
+        return dict(zip(names, await asyncio.gather(*[self.get(name) for name in names])))
+
+    @property
+    def started(self):
+        return list(self.tasks)
+
+    def cancel(self):
+        """Cancels the nodes still running."""
+        for task in self.tasks.values():
+            if not task.done():
+                task.cancel()
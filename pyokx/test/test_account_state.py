@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from pyokx import account_state
+from pyokx.account_state import AccountStateCache
+
+INST_ID = 'BTC-USDT-SWAP'
+
+
+class FakeAccountAPI:
+    def __init__(self, lever='5'):
+        self.lever = lever
+        self.calls = []
+        self.fail = False
+
+    async def get_leverage(self, instId, mgnMode):
+        self.calls.append(('get_leverage', instId, mgnMode))
+        return {'code': '0', 'msg': '', 'data': [{'instId': instId, 'mgnMode': mgnMode, 'posSide': 'net',
+                                                  'lever': self.lever}]}
+
+    async def set_leverage(self, lever, mgnMode, instId, posSide):
+        self.calls.append(('set_leverage', instId, lever))
+        if self.fail:
+            return {'code': '51000', 'msg': 'Parameter lever error', 'data': []}
+        self.lever = str(lever)
+        return {'code': '0', 'msg': '', 'data': [{'instId': instId, 'mgnMode': mgnMode, 'posSide': posSide,
+                                                  'lever': str(lever)}]}
+
+
+def position(lever, instId=INST_ID):
+    return SimpleNamespace(instId=instId, mgnMode='isolated', posSide='net', lever=lever)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+class TestAccountStateCache(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.account_api = FakeAccountAPI()
+        self.clock = FakeClock()
+        patcher = patch.object(account_state, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = AccountStateCache(self.account_api, max_age=60)
+
+    def set_leverage_calls(self):
+        return [call for call in self.account_api.calls if call[0] == 'set_leverage']
+
+    async def test_matching_cached_leverage_skips_the_request(self):
+        self.assertEqual(await self.cache.get_leverage(INST_ID, 'isolated'), '5')
+        self.assertIsNone(await self.cache.set_leverage(5, 'isolated', INST_ID, 'net'))
+        self.assertEqual(self.set_leverage_calls(), [])
+        self.assertEqual(self.cache.stats['set_leverage_skipped'], 1)
+        # the leverage read is cached as well
+        await self.cache.get_leverage(INST_ID, 'isolated')
+        self.assertEqual(len(self.account_api.calls), 1)
+
+    async def test_different_leverage_is_sent_and_cached(self):
+        await self.cache.get_leverage(INST_ID, 'isolated')
+        result = await self.cache.set_leverage(10, 'isolated', INST_ID, 'net')
+        self.assertEqual(result['code'], '0')
+        self.assertEqual(self.set_leverage_calls(), [('set_leverage', INST_ID, 10)])
+        self.assertEqual(self.cache.cached_leverage(INST_ID, 'isolated', 'net'), '10')
+        await self.cache.set_leverage(10, 'isolated', INST_ID, 'net')
+        self.assertEqual(len(self.set_leverage_calls()), 1)
+
+    async def test_expired_leverage_is_sent_again(self):
+        await self.cache.set_leverage(5, 'isolated', INST_ID, 'net')
+        self.clock.now += 61
+        self.assertIsNone(self.cache.cached_leverage(INST_ID, 'isolated', 'net'))
+        await self.cache.set_leverage(5, 'isolated', INST_ID, 'net')
+        self.assertEqual(len(self.set_leverage_calls()), 2)
+
+    async def test_failed_request_forgets_the_leverage(self):
+        await self.cache.get_leverage(INST_ID, 'isolated')
+        self.account_api.fail = True
+        result = await self.cache.set_leverage(10, 'isolated', INST_ID, 'net')
+        self.assertEqual(result['code'], '51000')
+        self.assertIsNone(self.cache.cached_leverage(INST_ID, 'isolated', 'net'))
+
+    async def test_positions_update_the_cached_leverage(self):
+        self.cache.on_positions([position('3'), position('', instId='ETH-USDT-SWAP')], stream_id='1-0')
+        self.assertEqual(self.cache.cached_leverage(INST_ID, 'isolated', 'net'), '3')
+        self.assertIsNone(self.cache.cached_leverage('ETH-USDT-SWAP', 'isolated', 'net'))
+        await self.cache.set_leverage(3, 'isolated', INST_ID, 'net')
+        self.assertEqual(self.set_leverage_calls(), [])
+
+    async def test_positions_entry_already_taken_does_not_override_a_later_set_leverage(self):
+        self.cache.on_positions([position('3')], stream_id='1-0')
+        await self.cache.set_leverage(10, 'isolated', INST_ID, 'net')
+        self.cache.on_positions([position('3')], stream_id='1-0')  # the same entry, read again
+        self.assertEqual(self.cache.cached_leverage(INST_ID, 'isolated', 'net'), '10')
+        self.cache.on_positions([position('4')], stream_id='2-0')  # changed outside of the service
+        self.assertEqual(self.cache.cached_leverage(INST_ID, 'isolated', 'net'), '4')
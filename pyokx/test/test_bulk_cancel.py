@@ -0,0 +1,71 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from pyokx import bulk_cancel
+from pyokx.bulk_cancel import BulkCanceller, ORDERS
+
+
+class FakeTradeAPI:
+    """Cancels the orders of a batch, except the ids listed in `failures` (id -> sCodes of successive attempts)."""
+    rate_limiter = object()  # the client budgets its own requests
+    API_KEY = '-1'
+
+    def __init__(self, failures=None, rejected_requests=0):
+        self.failures = failures or {}
+        self.rejected_requests = rejected_requests
+        self.batches = []
+
+    async def cancel_multiple_orders(self, orders):
+        self.batches.append([order['ordId'] for order in orders])
+        if self.rejected_requests:
+            self.rejected_requests -= 1
+            return {'code': '50013', 'msg': 'Systems are busy. Please try again later.', 'data': []}
+        data = []
+        for order in orders:
+            codes = self.failures.get(order['ordId'], [])
+            code = codes.pop(0) if codes else '0'
+            data.append({'ordId': order['ordId'], 'clOrdId': '', 'sCode': code, 'sMsg': '' if code == '0' else code})
+        return {'code': '0' if all(entry['sCode'] == '0' for entry in data) else '2', 'msg': '', 'data': data}
+
+
+def orders(count):
+    return [{'instId': 'BTC-USDT-SWAP', 'ordId': str(ordId)} for ordId in range(count)]
+
+
+@patch.object(bulk_cancel, 'RETRY_BACKOFF', 0.001)
+class TestBulkCanceller(IsolatedAsyncioTestCase):
+    async def test_orders_are_split_into_chunks_of_twenty(self):
+        api = FakeTradeAPI()
+        report = await BulkCanceller(api).cancel(ORDERS, orders(45))
+        self.assertEqual([len(batch) for batch in api.batches], [20, 20, 5])
+        self.assertEqual(len(report.cancelled), 45)
+        self.assertTrue(report.ok)
+        self.assertEqual((report.requests, report.rounds), (3, 1))
+
+    async def test_only_failed_orders_are_reissued(self):
+        api = FakeTradeAPI(failures={'3': ['50001'], '30': ['50001', '50001']})
+        report = await BulkCanceller(api, max_rounds=3).cancel_orders(orders(45))
+        self.assertEqual(api.batches[3:], [['3', '30'], ['30']])
+        self.assertEqual(len(report.cancelled), 45)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.rounds, 3)
+
+    async def test_final_codes_are_not_reissued(self):
+        api = FakeTradeAPI(failures={'1': ['51401']})
+        report = await BulkCanceller(api).cancel_orders(orders(3))
+        self.assertEqual(api.batches, [['0', '1', '2']])
+        self.assertEqual(report.failed['1']['sCode'], '51401')
+        self.assertFalse(report.ok)
+
+    async def test_rejected_chunk_fails_every_order_of_it(self):
+        api = FakeTradeAPI(rejected_requests=3)
+        report = await BulkCanceller(api, max_rounds=3).cancel_orders(orders(2))
+        self.assertEqual(len(api.batches), 3)
+        self.assertEqual(set(report.failed), {'0', '1'})
+        self.assertEqual(report.failed['0']['sCode'], '50013')
+
+    async def test_order_failed_then_cancelled_is_no_longer_reported_failed(self):
+        api = FakeTradeAPI(rejected_requests=1)
+        report = await BulkCanceller(api).cancel_orders(orders(2))
+        self.assertEqual(report.failed, {})
+        self.assertEqual([entry['ordId'] for entry in report.cancelled], ['0', '1'])
@@ -0,0 +1,170 @@
+import inspect
+import json
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import httpx
+
+from pyokx.Futures_Exchange_Client import OKX_Futures_Exchange_Client
+from pyokx.low_rest_api import consts as c, utils
+from pyokx.low_rest_api.client import Client
+
+TIMESTAMP = '2024-01-02T03:04:05.678Z'
+RATE_LIMITED = {'code': c.RATE_LIMIT_ERROR_CODE, 'msg': 'Too Many Requests', 'data': []}
+
+
+class FakeRateLimiter:
+    """Admits every request straight away and records the acquisitions and back-offs."""
+
+    def __init__(self):
+        self.acquired = []
+        self.penalized = []
+
+    async def acquire(self, method, request_path, params=None, api_key='-1'):
+        self.acquired.append((method, request_path))
+        return 0.0
+
+    def acquire_blocking(self, method, request_path, params=None, api_key='-1'):
+        self.acquired.append((method, request_path))
+        return 0.0
+
+    def has_capacity(self, method, request_path, params=None, api_key='-1'):
+        return True
+
+    def penalize(self, method, request_path, params=None, api_key='-1'):
+        self.penalized.append((method, request_path))
+
+
+class FakeOKX:
+    """`httpx.MockTransport` handler that records the requests and replays the queued (status, json) answers."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        status_code, body = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        return httpx.Response(status_code, json=body)
+
+
+def make_client(use_async, okx, **kwargs):
+    client = Client('key', 'secret', 'passphrase', flag='1', debug=False, use_async=use_async,
+                    coalesce_reads=False, **kwargs)
+    if use_async:
+        client.client = httpx.AsyncClient(base_url=c.API_URL, transport=httpx.MockTransport(okx))
+    else:
+        client.client = httpx.Client(base_url=c.API_URL, transport=httpx.MockTransport(okx))
+    return client
+
+
+def describe(request):
+    return request.method, str(request.url), dict(request.headers), request.content
+
+
+class TestAsyncTransport(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patcher = patch.object(utils, 'get_timestamp', return_value=TIMESTAMP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_async_request_returns_a_coroutine_of_the_decoded_body(self):
+        okx = FakeOKX((200, {'code': '0', 'data': [{'instId': 'BTC-USDT-SWAP'}]}))
+        client = make_client(True, okx)
+
+        pending = client._request(c.GET, c.TICKER_INFO, {'instId': 'BTC-USDT-SWAP'})
+        self.assertTrue(inspect.isawaitable(pending))
+        response = await pending
+
+        self.assertEqual(response, {'code': '0', 'data': [{'instId': 'BTC-USDT-SWAP'}]})
+        self.assertEqual(str(okx.requests[0].url), c.API_URL + c.TICKER_INFO + '?instId=BTC-USDT-SWAP')
+        await client.client.aclose()
+
+    async def test_sync_and_async_send_identical_requests(self):
+        cases = [
+            (c.GET, c.TICKER_INFO, {'instId': 'BTC-USDT-SWAP', 'ccy': ''}),
+            (c.GET, c.POSITION_INFO, {}),
+            (c.POST, c.PLACR_ORDER, {'instId': 'BTC-USDT-SWAP', 'tdMode': 'cross', 'side': 'buy',
+                                     'ordType': 'market', 'sz': '1'}),
+            (c.POST, c.BATCH_ORDERS, [{'instId': 'ETH-USDT-SWAP', 'side': 'sell', 'sz': '2'}]),
+        ]
+        for method, request_path, params in cases:
+            with self.subTest(method=method, request_path=request_path):
+                sync_okx, async_okx = FakeOKX((200, {'code': '0', 'data': []})), FakeOKX((200, {'code': '0', 'data': []}))
+                sync_client, async_client = make_client(False, sync_okx), make_client(True, async_okx)
+
+                sync_response = sync_client._request(method, request_path, params)
+                async_response = await async_client._send_async(method, request_path, params)
+
+                self.assertEqual(sync_response, async_response)
+                self.assertEqual(describe(sync_okx.requests[0]), describe(async_okx.requests[0]))
+                if method == c.POST:
+                    self.assertEqual(json.loads(async_okx.requests[0].content), params)
+                await async_client.client.aclose()
+
+    async def test_rate_limited_answers_are_retried_on_both_transports(self):
+        for use_async in (False, True):
+            for status_code, body in ((200, RATE_LIMITED), (429, {'code': '', 'msg': 'Too Many Requests'})):
+                with self.subTest(use_async=use_async, status_code=status_code):
+                    okx = FakeOKX((status_code, body), (200, {'code': '0', 'data': []}))
+                    limiter = FakeRateLimiter()
+                    client = make_client(use_async, okx, rate_limiter=limiter)
+
+                    response = client._request(c.GET, c.TICKER_INFO, {'instId': 'BTC-USDT-SWAP'})
+                    if use_async:
+                        response = await response
+                        await client.client.aclose()
+
+                    self.assertEqual(response, {'code': '0', 'data': []})
+                    self.assertEqual(len(okx.requests), 2)
+                    self.assertEqual(limiter.acquired, [(c.GET, c.TICKER_INFO)] * 2)
+                    self.assertEqual(limiter.penalized, [(c.GET, c.TICKER_INFO)])
+
+    async def test_retries_stop_after_the_maximum(self):
+        for use_async in (False, True):
+            with self.subTest(use_async=use_async):
+                okx = FakeOKX((200, RATE_LIMITED))
+                limiter = FakeRateLimiter()
+                client = make_client(use_async, okx, rate_limiter=limiter)
+
+                response = client._request(c.POST, c.PLACR_ORDER, {'instId': 'BTC-USDT-SWAP'})
+                if use_async:
+                    response = await response
+                    await client.client.aclose()
+
+                self.assertEqual(response, RATE_LIMITED)
+                self.assertEqual(len(okx.requests), c.RATE_LIMIT_MAX_RETRIES + 1)
+                self.assertEqual(len(limiter.penalized), c.RATE_LIMIT_MAX_RETRIES)
+
+    async def test_rejections_are_not_retried_without_a_rate_limiter(self):
+        okx = FakeOKX((200, RATE_LIMITED), (200, {'code': '0', 'data': []}))
+        client = make_client(True, okx)
+
+        self.assertEqual(await client._request(c.GET, c.TICKER_INFO, {}), RATE_LIMITED)
+        self.assertEqual(len(okx.requests), 1)
+        await client.client.aclose()
+
+
+class TestFuturesExchangeClient(IsolatedAsyncioTestCase):
+    async def test_every_api_is_async(self):
+        exchange = OKX_Futures_Exchange_Client(api_key='key', api_secret='secret', passphrase='passphrase')
+
+        for api in (exchange.marketAPI, exchange.publicAPI, exchange.fundingAPI, exchange.accountAPI,
+                    exchange.tradeAPI):
+            self.assertTrue(api.use_async, api)
+
+    async def test_close_positions_is_awaitable(self):
+        exchange = OKX_Futures_Exchange_Client(api_key='key', api_secret='secret', passphrase='passphrase')
+        okx = FakeOKX((200, {'code': '0', 'data': [{'instId': 'BTC-USDT-SWAP', 'posSide': 'long'}]}))
+        exchange.tradeAPI.client = httpx.AsyncClient(base_url=c.API_URL, transport=httpx.MockTransport(okx))
+        exchange.tradeAPI.rate_limiter = None
+
+        pending = exchange.tradeAPI.close_positions('BTC-USDT-SWAP', 'cross', posSide='long')
+        self.assertTrue(inspect.isawaitable(pending))
+        response = await pending
+
+        self.assertEqual(response['data'][0]['posSide'], 'long')
+        self.assertEqual(okx.requests[0].method, c.POST)
+        self.assertEqual(okx.requests[0].url.path, c.CLOSE_POSITION)
+        self.assertEqual(json.loads(okx.requests[0].content)['mgnMode'], 'cross')
+        await exchange.tradeAPI.client.aclose()
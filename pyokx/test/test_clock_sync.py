@@ -0,0 +1,154 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+import httpx
+
+from pyokx.low_rest_api import clock_sync, consts as c
+from pyokx.low_rest_api.clock_sync import ServerClock
+
+
+class FakeTime:
+    """Stands in for the `time` module of clock_sync, advanced by the fake transport."""
+
+    def __init__(self, now=1_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeResponse:
+    def __init__(self, server_time):
+        self.server_time = server_time
+
+    def json(self):
+        return {'code': '0', 'msg': '', 'data': [{'ts': str(int(round(self.server_time * 1000)))}]}
+
+
+class FakeTransport:
+    """
+    The OKX time endpoint, `offset` seconds ahead of the local clock. Each request takes the next of `round_trips`
+    seconds, of which `request_share` is spent before the server reads its clock.
+    """
+
+    def __init__(self, fake_time, offset, round_trips, request_share=0.5, fail=False):
+        self.fake_time = fake_time
+        self.offset = offset
+        self.round_trips = list(round_trips)
+        self.request_share = request_share
+        self.fail = fail
+        self.requests = 0
+
+    async def get(self, url):
+        self.requests += 1
+        await asyncio.sleep(0)  # lets concurrent callers run
+        if self.fail:
+            raise httpx.ConnectError('unreachable')
+        round_trip = self.round_trips[(self.requests - 1) % len(self.round_trips)]
+        self.fake_time.now += round_trip * self.request_share
+        server_time = self.fake_time.now + self.offset
+        self.fake_time.now += round_trip * (1 - self.request_share)
+        return FakeResponse(server_time)
+
+
+class ClockTestCase(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.time = FakeTime()
+        patcher = patch.object(clock_sync, 'time', self.time)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.clock = ServerClock(sync_interval=60, burst_size=3)
+
+
+class TestOffsetEstimate(ClockTestCase):
+    async def test_sample_with_the_shortest_round_trip_is_kept(self):
+        # the request leg takes 90% of every round trip, the longer the trip the further off its sample
+        transport = FakeTransport(self.time, offset=2.5, round_trips=[0.4, 0.02, 0.2], request_share=0.9)
+        self.assertEqual(self.clock.error_bound(), float('inf'))
+        await self.clock.sync(transport)
+        self.assertEqual(transport.requests, 3)
+        self.assertEqual(len(self.clock.samples), 1)
+        self.assertAlmostEqual(self.clock.samples[0][2], 0.02)
+        self.assertAlmostEqual(self.clock.offset(), 2.5 + 0.4 * 0.02, delta=c.CLOCK_SYNC_RESOLUTION)
+        self.assertLessEqual(abs(self.clock.offset() - 2.5), self.clock.error_bound())
+
+    def test_drift_is_fitted_once_the_window_spans_the_sync_interval(self):
+        drift = 20e-6  # the local clock loses 20us per second against OKX
+        for minute in range(5):
+            local_time = self.time.now + minute * 60
+            self.clock.add_sample(local_time, local_time + 1.0 + drift * minute * 60, round_trip=0.0)
+        self.assertAlmostEqual(self.clock.drift, drift, delta=1e-9)
+        latest = self.time.now + 4 * 60
+        self.assertAlmostEqual(self.clock.offset(latest), 1.0 + drift * 240, places=9)
+        self.assertAlmostEqual(self.clock.offset(latest + 100), 1.0 + drift * 340, places=9)
+
+    def test_few_samples_use_the_latest_offset_without_drift(self):
+        self.clock.add_sample(self.time.now, self.time.now + 1.5, round_trip=0.0)
+        self.clock.add_sample(self.time.now + 10, self.time.now + 11.6, round_trip=0.0)
+        self.assertEqual(self.clock.drift, 0.0)
+        self.assertAlmostEqual(self.clock.offset(), 1.6)
+
+    def test_error_bound_grows_with_the_age_of_the_estimate(self):
+        self.clock.add_sample(self.time.now, self.time.now + 0.01 + 1.0, round_trip=0.02)
+        self.assertAlmostEqual(self.clock.offset(), 1.0)
+        fresh = self.clock.error_bound(self.time.now + 0.01)
+        self.assertAlmostEqual(fresh, 0.01 + c.CLOCK_SYNC_RESOLUTION)
+        self.assertAlmostEqual(self.clock.error_bound(self.time.now + 1000.01) - fresh,
+                               1000 * c.CLOCK_SYNC_FREQUENCY_TOLERANCE)
+        self.assertFalse(self.clock.is_stale())
+        self.time.now += 61
+        self.assertTrue(self.clock.is_stale())
+
+
+class TestEnsureSynced(ClockTestCase):
+    async def test_concurrent_callers_share_one_sync(self):
+        transport = FakeTransport(self.time, offset=-0.3, round_trips=[0.01])
+        await asyncio.gather(*[self.clock.ensure_synced(transport) for _ in range(10)])
+        self.assertEqual(transport.requests, 3)  # one burst
+        self.assertAlmostEqual(self.clock.offset(), -0.3, delta=c.CLOCK_SYNC_RESOLUTION)
+        await self.clock.ensure_synced(transport)
+        self.assertEqual(transport.requests, 3)
+
+    async def test_failed_sync_backs_off(self):
+        transport = FakeTransport(self.time, offset=1.0, round_trips=[0.01], fail=True)
+        await asyncio.gather(*[self.clock.ensure_synced(transport) for _ in range(5)])
+        self.assertEqual(transport.requests, 3)
+        self.assertTrue(self.clock.backing_off())
+        self.assertEqual(self.clock.offset(), 0.0)  # signing with the local clock meanwhile
+
+        await self.clock.ensure_synced(transport)
+        self.assertEqual(transport.requests, 3)
+
+        self.time.now += c.CLOCK_SYNC_RETRY_INTERVAL
+        transport.fail = False
+        await self.clock.ensure_synced(transport)
+        self.assertEqual(transport.requests, 6)
+        self.assertFalse(self.clock.backing_off())
+        self.assertTrue(self.clock.synced)
+
+
+class TestEventLoops(TestCase):
+    def test_clock_can_be_used_from_successive_loops(self):
+        clock = ServerClock(sync_interval=3600, burst_size=1)
+
+        async def use():
+            fake_time = FakeTime()
+            with patch.object(clock_sync, 'time', fake_time):
+                clock._failed_at = None
+                clock._reference_time = None
+                transport = FakeTransport(fake_time, offset=0.5, round_trips=[0.01])
+                await asyncio.gather(*[clock.ensure_synced(transport) for _ in range(3)])
+            task = clock.start()
+            self.assertIs(task.get_loop(), asyncio.get_running_loop())
+            await clock.stop()
+            return clock.offset(fake_time.now)
+
+        for _ in range(2):
+            self.assertAlmostEqual(asyncio.run(use()), 0.5, delta=c.CLOCK_SYNC_RESOLUTION)
@@ -0,0 +1,64 @@
+import asyncio
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from pyokx.low_rest_api import consts as c
+from pyokx.low_rest_api.coalescing import SingleFlight, is_coalescable
+
+
+class TestSingleFlight(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.flights = SingleFlight()
+        self.calls = 0
+
+    async def ticker_request(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {'code': '0', 'data': [{'instId': 'BTC-USDT-SWAP', 'last': '42000'}]}
+
+    async def test_concurrent_identical_calls_share_one_request(self):
+        results = await asyncio.gather(*[self.flights.do('ticker', self.ticker_request) for _ in range(5)])
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(self.flights.stats()['hits'], 4)
+        self.assertEqual(self.flights.stats()['in_flight'], 0)
+
+    async def test_sharing_callers_get_their_own_copy(self):
+        first, second = await asyncio.gather(self.flights.do('ticker', self.ticker_request),
+                                             self.flights.do('ticker', self.ticker_request))
+        first['data'][0]['last'] = '0'
+        self.assertEqual(second['data'][0]['last'], '42000')
+
+    async def test_completed_calls_are_not_cached(self):
+        await self.flights.do('ticker', self.ticker_request)
+        await self.flights.do('ticker', self.ticker_request)
+        self.assertEqual(self.calls, 2)
+
+    async def test_different_keys_are_separate_requests(self):
+        await asyncio.gather(self.flights.do('BTC', self.ticker_request), self.flights.do('ETH', self.ticker_request))
+        self.assertEqual(self.calls, 2)
+
+    async def test_cancelling_one_waiter_keeps_the_shared_call(self):
+        first = asyncio.ensure_future(self.flights.do('ticker', self.ticker_request))
+        second = asyncio.ensure_future(self.flights.do('ticker', self.ticker_request))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual((await second)['data'][0]['last'], '42000')
+        self.assertEqual(self.calls, 1)
+
+    async def test_exception_is_shared(self):
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise TimeoutError()
+
+        results = await asyncio.gather(self.flights.do('ticker', failing), self.flights.do('ticker', failing),
+                                       return_exceptions=True)
+        self.assertTrue(all(isinstance(result, TimeoutError) for result in results))
+
+
+class TestIsCoalescable(TestCase):
+    def test_only_public_reads_are_coalesced(self):
+        self.assertTrue(is_coalescable(c.GET, c.TICKER_INFO))
+        self.assertTrue(is_coalescable(c.GET, c.INSTRUMENT_INFO))
+        self.assertFalse(is_coalescable(c.GET, c.POSITION_INFO))
+        self.assertFalse(is_coalescable(c.GET, c.ORDER_INFO))
+        self.assertFalse(is_coalescable(c.POST, c.PLACR_ORDER))
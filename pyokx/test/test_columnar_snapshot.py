@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+import numpy as np
+
+from pyokx.columnar_snapshot import ColumnarOrderbookSnapshot, format_scaled, infer_decimals, to_scaled
+from pyokx.data_structures import Orderbook_Snapshot
+
+ASKS = [['43750.1', '12', '0', '3'], ['43750.2', '0.5', '0', '1'], ['43751', '1200', '0', '7']]
+BIDS = [['43750', '3.25', '0', '2'], ['43749.9', '8', '0', '1']]
+
+
+class TestColumnarSnapshot(TestCase):
+    def test_round_trip_is_lossless(self):
+        columnar = ColumnarOrderbookSnapshot.from_array('BTC-USDT-SWAP', 400, ASKS, BIDS, '1703914467407')
+        self.assertEqual(columnar.to_snapshot(),
+                         Orderbook_Snapshot.from_array('BTC-USDT-SWAP', 400, ASKS, BIDS, '1703914467407'))
+        self.assertEqual(ColumnarOrderbookSnapshot.from_snapshot(columnar.to_snapshot()).asks.to_levels(), ASKS)
+        self.assertEqual(columnar.bids.to_levels(), BIDS)
+
+    def test_sides_share_the_decimals_of_the_strings(self):
+        columnar = ColumnarOrderbookSnapshot.from_array('BTC-USDT-SWAP', 400, ASKS, BIDS, '1703914467407')
+        self.assertEqual((columnar.asks.price_decimals, columnar.asks.quantity_decimals), (1, 2))
+        self.assertEqual(columnar.asks.price_ticks.tolist(), [437501, 437502, 437510])
+        self.assertEqual(columnar.bids.quantity_lots.tolist(), [325, 800])
+        np.testing.assert_array_equal(columnar.asks.prices, [43750.1, 43750.2, 43751])
+
+    def test_empty_side(self):
+        columnar = ColumnarOrderbookSnapshot.from_array('BTC-USDT-SWAP', 400, ASKS, [], '1703914467407')
+        self.assertEqual(len(columnar.bids), 0)
+        self.assertEqual(columnar.to_snapshot().bids, [])
+
+    def test_instrument_decimals_cannot_be_fewer_than_the_values(self):
+        with self.assertRaises(ValueError):
+            ColumnarOrderbookSnapshot.from_array('BTC-USDT-SWAP', 400, ASKS, BIDS, '1703914467407',
+                                                 price_decimals=0)
+        columnar = ColumnarOrderbookSnapshot.from_array('BTC-USDT-SWAP', 400, ASKS, BIDS, '1703914467407',
+                                                        price_decimals=2, quantity_decimals=4)
+        self.assertEqual(columnar.asks.to_levels(), ASKS)
+
+    def test_infer_decimals_ignores_trailing_zeros(self):
+        self.assertEqual(infer_decimals(['1.50', '2', '0.001']), 3)
+        self.assertEqual(infer_decimals(['100', '2.000']), 0)
+        self.assertEqual(infer_decimals([]), 0)
+
+    def test_values_beyond_float_precision_are_scaled_exactly(self):
+        self.assertEqual(to_scaled(['12345678901234.5678', '-0.0001', '3'], 4).tolist(),
+                         [123456789012345678, -1, 30000])
+        self.assertEqual(format_scaled(123456789012345678, 4), '12345678901234.5678')
+
+    def test_scaled_values_overflowing_int64_raise(self):
+        with self.assertRaises(ValueError):
+            to_scaled(['1234567890123456.789'], 4)
+        with self.assertRaises(ValueError):
+            ColumnarOrderbookSnapshot.from_array('BTC-USDT-SWAP', 400, [['1', '99999999999999999999', '0', '1']], [],
+                                                 '1703914467407')
@@ -0,0 +1,111 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+from pyokx import deadlines, rest_handling
+from pyokx.deadlines import Deadline, DeadlineExceeded, LookupFailed, send_idempotent, _reconcile
+
+PLACED = {'code': '0', 'msg': '', 'data': [{'clOrdId': 'abc', 'ordId': '1', 'sCode': '0', 'sMsg': ''}]}
+
+
+class Sequence:
+    """Coroutine function answering each call with the next outcome (a value, an exception or a delay in seconds)."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def __call__(self):
+        outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+        self.calls += 1
+        if isinstance(outcome, float):
+            await asyncio.sleep(outcome)
+            return PLACED
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@patch.object(deadlines, 'RETRY_BACKOFF', 0.001)
+class TestReconcile(IsolatedAsyncioTestCase):
+    async def test_found_request_is_returned(self):
+        reconcile = Sequence(PLACED)
+        self.assertEqual(await _reconcile(reconcile, Deadline(1), 'abc', 'place_order'), PLACED)
+
+    async def test_not_found_is_none(self):
+        self.assertIsNone(await _reconcile(Sequence(None), Deadline(1), 'abc', 'place_order'))
+
+    async def test_lookup_errors_are_retried_until_a_definite_answer(self):
+        reconcile = Sequence(LookupFailed('50001 Service temporarily unavailable'), httpx.ConnectError('reset'), None)
+        self.assertIsNone(await _reconcile(reconcile, Deadline(1), 'abc', 'place_order'))
+        self.assertEqual(reconcile.calls, 3)
+
+    async def test_unknown_state_never_becomes_not_found(self):
+        reconcile = Sequence(LookupFailed('50001 Service temporarily unavailable'))
+        with self.assertRaises(DeadlineExceeded):
+            await _reconcile(reconcile, Deadline(0.05), 'abc', 'place_order')
+
+
+@patch.object(deadlines, 'RETRY_BACKOFF', 0.001)
+class TestSendIdempotent(IsolatedAsyncioTestCase):
+    async def test_first_answer_is_returned(self):
+        send, reconcile = Sequence(PLACED), Sequence(None)
+        self.assertEqual(await send_idempotent(send, reconcile, Deadline(1), 'abc', 'place_order'), PLACED)
+        self.assertEqual((send.calls, reconcile.calls), (1, 0))
+
+    @patch.object(deadlines, 'ORDER_ATTEMPT_TIMEOUT', 0.02)
+    async def test_timed_out_attempt_that_reached_okx_is_not_resent(self):
+        send, reconcile = Sequence(1.0), Sequence(PLACED)
+        self.assertEqual(await send_idempotent(send, reconcile, Deadline(1), 'abc', 'place_order'), PLACED)
+        self.assertEqual((send.calls, reconcile.calls), (1, 1))
+
+    async def test_request_that_did_not_reach_okx_is_resent(self):
+        send, reconcile = Sequence(httpx.ConnectError('reset'), PLACED), Sequence(None)
+        self.assertEqual(await send_idempotent(send, reconcile, Deadline(1), 'abc', 'place_order'), PLACED)
+        self.assertEqual((send.calls, reconcile.calls), (2, 1))
+
+    async def test_idempotent_requests_are_resent_without_reconciliation(self):
+        send = Sequence(httpx.ReadTimeout('slow'), PLACED)
+        self.assertEqual(await send_idempotent(send, None, Deadline(1), 'abc', 'cancel_order'), PLACED)
+        self.assertEqual(send.calls, 2)
+
+    async def test_budget_exhaustion_raises_with_the_client_id(self):
+        send = Sequence(httpx.ConnectError('reset'))
+        with self.assertRaises(DeadlineExceeded) as raised:
+            await send_idempotent(send, None, Deadline(0.05), 'abc', 'cancel_order')
+        self.assertEqual(raised.exception.client_id, 'abc')
+
+    async def test_other_errors_are_not_retried(self):
+        with self.assertRaises(KeyError):
+            await send_idempotent(Sequence(KeyError('data')), None, Deadline(1), 'abc', 'place_order')
+
+
+class TestFindPlacedOrder(IsolatedAsyncioTestCase):
+    """`place_order` reconciles through `get_order`, only "order does not exist" means the order was not placed."""
+
+    async def place_after_a_timeout(self, *lookups):
+        gateway = AsyncMock()
+        gateway.place_order.side_effect = [httpx.ConnectError('reset'), PLACED]
+        trade_api = AsyncMock()
+        trade_api.get_order.side_effect = list(lookups)
+        with patch.object(rest_handling, 'order_gateway', gateway), patch.object(rest_handling, 'tradeAPI', trade_api), \
+                patch.object(deadlines, 'RETRY_BACKOFF', 0.001):
+            await rest_handling.place_order(instId='BTC-USDT-SWAP', tdMode='isolated', side='buy', ordType='market',
+                                            sz='1', clOrdId='abc', deadline=Deadline(1))
+        return gateway.place_order.await_count, trade_api.get_order.await_count
+
+    async def test_order_does_not_exist_resends(self):
+        not_found = {'code': rest_handling.ORDER_NOT_FOUND_CODE, 'msg': 'Order does not exist', 'data': []}
+        self.assertEqual(await self.place_after_a_timeout(not_found), (2, 1))
+
+    async def test_other_lookup_errors_are_retried_before_resending(self):
+        busy = {'code': '50001', 'msg': 'Service temporarily unavailable', 'data': []}
+        not_found = {'code': rest_handling.ORDER_NOT_FOUND_CODE, 'msg': 'Order does not exist', 'data': []}
+        self.assertEqual(await self.place_after_a_timeout(busy, not_found), (2, 2))
+
+    async def test_found_order_is_not_resent(self):
+        found = {'code': '0', 'msg': '', 'data': [{'ordId': '1', 'clOrdId': 'abc'}]}
+        self.assertEqual(await self.place_after_a_timeout(found), (1, 1))
+
@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from pyokx.data_structures import FillEntry, Ticker
+from pyokx.low_rest_api.decoding import can_construct, decode_body, decode_models
+
+TICKER = {'instType': 'SWAP', 'instId': 'BTC-USDT-SWAP', 'last': '43750.1', 'lastSz': '1', 'askPx': '43750.2',
+          'askSz': '10', 'bidPx': '43750.1', 'bidSz': '3', 'open24h': '43000', 'high24h': '44000', 'low24h': '42500',
+          'volCcy24h': '1000', 'vol24h': '100000', 'ts': '1703914467407', 'sodUtc0': '43100', 'sodUtc8': '43200'}
+
+
+class TestDecoding(TestCase):
+    def test_constructed_models_equal_validated_ones(self):
+        for model in (Ticker, FillEntry):
+            self.assertTrue(can_construct(model))
+        item = {name: TICKER.get(name, '1') for name in Ticker.model_fields}
+        self.assertEqual(decode_models([item], Ticker, strict=False), decode_models([item], Ticker, strict=True))
+
+    def test_undeclared_keys_are_dropped(self):
+        item = {**{name: TICKER.get(name, '1') for name in Ticker.model_fields}, 'newOkxField': 'x'}
+        ticker = decode_models([item], Ticker, strict=False)[0]
+        self.assertNotIn('newOkxField', ticker.model_dump())
+        self.assertEqual(ticker, decode_models([item], Ticker, strict=True)[0])
+
+    def test_instances_do_not_alias_their_items(self):
+        item = {name: TICKER.get(name, '1') for name in Ticker.model_fields}
+        ticker = decode_models([item], Ticker, strict=False)[0]
+        item['last'] = '0'
+        self.assertEqual(ticker.last, '43750.1')
+        ticker.askPx = '1'
+        self.assertEqual(item['askPx'], '43750.2')
+
+    def test_decode_body(self):
+        self.assertEqual(decode_body(b'{"code":"0","msg":"","data":[{"instId":"BTC-USDT-SWAP"}]}')['data'],
+                         [{'instId': 'BTC-USDT-SWAP'}])
@@ -0,0 +1,110 @@
+import random
+import warnings
+from datetime import datetime
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from pyokx.data_structures import FillEntry, FillHistoricalMetrics
+from pyokx.fill_metrics import TIMEFRAMES, fill_historical_metrics
+from shared.tmp_shared import get_timestamp_from_days_ago
+
+DAY_MS = 86_400_000
+
+
+def loop_fill_historical_metrics(fills, reference_time):
+    # the former `analyze_transaction_history` loop
+    df = pd.DataFrame([fill.model_dump() for fill in fills])
+    df['fillSz'] = df['fillSz'].astype(float)
+    df['fillPx'] = df['fillPx'].astype(float)
+    df['fee'] = df['fee'].astype(float)
+    df['fillPnl'] = df['fillPnl'].astype(float)
+    df['fillTime'] = df['fillTime'].astype(int)
+    metrics = {}
+    for timeframe in TIMEFRAMES:
+        metrics[timeframe] = []
+        start_query_timestamp = get_timestamp_from_days_ago(days_ago=TIMEFRAMES[timeframe],
+                                                            reference_time=reference_time)
+        end_query_timestamp = get_timestamp_from_days_ago(reference_time=reference_time)
+        for instrument in df['instId'].unique():
+            instrument_df = df[df['instId'] == instrument]
+            instrument_df = instrument_df[(instrument_df['fillTime'] >= start_query_timestamp) & (
+                    instrument_df['fillTime'] <= end_query_timestamp)]
+            volume_traded = instrument_df['fillSz'].sum()
+            profit_loss = instrument_df['fillPnl'].sum()
+            profitable_trades = instrument_df[instrument_df['fillPnl'] > 0].shape[0]
+            loss_making_trades = instrument_df[instrument_df['fillPnl'] < 0].shape[0]
+            metrics[timeframe].append({
+                "instrument_id": instrument,
+                "volume_traded": volume_traded,
+                "average_fill_price": (instrument_df['fillPx'] * instrument_df['fillSz']).sum() / volume_traded,
+                "profit_loss": profit_loss,
+                "fees_paid": instrument_df['fee'].sum(),
+                "profitable_trades": profitable_trades,
+                "loss_making_trades": loss_making_trades,
+                "best_trade": instrument_df['fillPnl'].max(),
+                "worst_trade": instrument_df['fillPnl'].min(),
+                "avg_fill_pnl": profit_loss / (profitable_trades + loss_making_trades),
+            })
+    return FillHistoricalMetrics(**metrics)
+
+
+def random_fills(rng: random.Random, now: int, n_fills: int, n_instruments: int, n_stale: int):
+    # the last `n_stale` instruments only traded more than a week ago, so some windows have no fills
+    instruments = [f'COIN{i}-USDT-SWAP' for i in range(n_instruments)]
+    fills = []
+    for bill in range(n_fills):
+        instrument = rng.randrange(n_instruments)
+        age = rng.randrange(8 * DAY_MS if instrument >= n_instruments - n_stale else 0, 95 * DAY_MS)
+        fills.append(FillEntry(
+            side=rng.choice(['buy', 'sell']), fillSz=str(rng.randint(1, 50)),
+            fillPx=f'{rng.uniform(0.5, 50000):.2f}', fee=f'{-rng.uniform(0, 2):.4f}',
+            fillPnl=rng.choice(['0', f'{rng.uniform(-100, 100):.4f}']), ordId=str(bill), instType='SWAP',
+            instId=instruments[instrument], clOrdId='', posSide='net', billId=str(bill), fillTime=str(now - age),
+            execType='T', tradeId=str(bill), feeCcy='USDT', ts=str(now - age)))
+    return fills
+
+
+class TestFillHistoricalMetrics(TestCase):
+    def setUp(self) -> None:
+        self.reference_time = datetime(2024, 1, 15, 12, 0, 0)
+        self.now = get_timestamp_from_days_ago(reference_time=self.reference_time)
+
+    def assertMatchesLoop(self, fills):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # the loop divides by zero for windows without fills
+            expected = loop_fill_historical_metrics(fills, self.reference_time)
+        result = fill_historical_metrics(fills, self.reference_time)
+        for timeframe in TIMEFRAMES:
+            for entry, expected_entry in zip(getattr(result, timeframe), getattr(expected, timeframe), strict=True):
+                entry, expected_entry = entry.model_dump(), expected_entry.model_dump()
+                self.assertEqual(entry['instrument_id'], expected_entry['instrument_id'])
+                for field in ('profitable_trades', 'loss_making_trades'):
+                    self.assertEqual(entry[field], expected_entry[field], (timeframe, field))
+                for field in ('volume_traded', 'average_fill_price', 'profit_loss', 'fees_paid', 'best_trade',
+                              'worst_trade', 'avg_fill_pnl'):
+                    self.assertTrue(np.isclose(entry[field], expected_entry[field], rtol=1e-9, equal_nan=True),
+                                    (timeframe, field, entry[field], expected_entry[field]))
+        return result
+
+    def test_matches_the_former_loop(self):
+        self.assertMatchesLoop(random_fills(random.Random(25), self.now, n_fills=2000, n_instruments=20, n_stale=3))
+
+    def test_windows_without_fills_are_nan(self):
+        fills = random_fills(random.Random(7), self.now, n_fills=50, n_instruments=1, n_stale=1)
+        result = self.assertMatchesLoop(fills)
+        one_day, = result.ONE_DAY
+        self.assertTrue(np.isnan(one_day.average_fill_price))
+        self.assertTrue(np.isnan(one_day.best_trade))
+        self.assertEqual(one_day.profitable_trades, 0)
+        three_months, = result.THREE_MONTHS
+        self.assertGreater(three_months.volume_traded, 0)
+
+    def test_fills_outside_the_windows_are_ignored(self):
+        fills = random_fills(random.Random(3), self.now, n_fills=200, n_instruments=4, n_stale=0)
+        future = fills[0].model_copy(update={'billId': 'future', 'fillTime': str(self.now + DAY_MS)})
+        ancient = fills[0].model_copy(update={'billId': 'ancient', 'fillTime': str(self.now - 120 * DAY_MS)})
+        self.assertEqual(fill_historical_metrics(fills + [future, ancient], self.reference_time).model_dump_json(),
+                         fill_historical_metrics(fills, self.reference_time).model_dump_json())
+        self.assertMatchesLoop(fills + [future, ancient])
@@ -0,0 +1,167 @@
+import json
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from pyokx.fill_sync import FillSynchronizer, FILLS_PAGE_LIMIT
+from redis_tools.utils import deserialize_from_redis, serialize_for_redis
+
+DAY_MS = 86_400_000
+
+
+def fill(billId, ts, instType='SWAP'):
+    return {'side': 'buy', 'fillSz': '1', 'fillPx': '100', 'fee': '-0.01', 'fillPnl': '0', 'ordId': str(billId),
+            'instType': instType, 'instId': f'BTC-USDT-{instType}', 'clOrdId': '', 'posSide': 'net',
+            'billId': str(billId), 'fillTime': str(ts), 'execType': 'T', 'tradeId': str(billId), 'feeCcy': 'USDT',
+            'ts': str(ts)}
+
+
+class FakeTradeAPI:
+    """Serves `get_fills_history` pages, newest first, from a list of fills."""
+
+    def __init__(self):
+        self.fills = []
+        self.requests = []
+        self.fail = False
+
+    async def get_fills_history(self, instType, after='', limit=FILLS_PAGE_LIMIT, begin=''):
+        self.requests.append({'instType': instType, 'after': after, 'begin': begin})
+        if self.fail:
+            return {'code': '50001', 'msg': 'Service temporarily unavailable', 'data': []}
+        fills = sorted((f for f in self.fills if f['instType'] == instType and int(f['ts']) >= int(begin or 0)
+                        and (not after or int(f['billId']) < int(after))),
+                       key=lambda f: int(f['billId']), reverse=True)
+        return {'code': '0', 'msg': '', 'data': fills[:limit]}
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    """The stream and hash commands `FillSynchronizer` uses."""
+
+    def __init__(self):
+        self.streams = {}
+        self.hashes = {}
+        self.last_id = 0
+
+    async def xadd(self, stream, fields, maxlen=None):
+        self.last_id = max(self.last_id + 1, int(time.time() * 1000))
+        entries = self.streams.setdefault(stream, [])
+        entries.append((f'{self.last_id}-0', dict(fields)))
+        if maxlen:
+            del entries[:-maxlen]
+        return entries[-1][0]
+
+    async def xrange(self, stream):
+        return list(self.streams.get(stream, []))
+
+    async def xrevrange(self, stream, count=None):
+        return list(reversed(self.streams.get(stream, [])))[:count]
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def execute_command(self, *args):
+        pass  # XTRIM, nothing is old enough in these tests
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class TestFillSynchronizer(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.now = int(time.time() * 1000)
+        self.api = FakeTradeAPI()
+        self.redis = FakeRedis()
+
+    def synchronizer(self):
+        return FillSynchronizer(trade_api=self.api, stream='history', deltas_stream='deltas', cursor_key='cursor')
+
+    def published_history(self):
+        _, message = self.redis.streams['history'][-1]
+        return [entry['billId'] for entry in deserialize_from_redis(message['data'])]
+
+    async def test_first_sync_requests_the_whole_window(self):
+        self.api.fills = [fill(bill, self.now - bill * 1000) for bill in range(1, 251)]
+        sync = self.synchronizer()
+        new_fills = await sync.sync(self.redis, ['SWAP'])
+        self.assertEqual(len(new_fills), 250)
+        self.assertEqual(len(self.api.requests), 3)
+        self.assertEqual(json.loads(self.redis.hashes['cursor']['SWAP'])['billId'], '250')
+        self.assertEqual(len(self.published_history()), 250)
+
+    async def test_idle_cycle_costs_one_request_and_publishes_nothing(self):
+        self.api.fills = [fill(bill, self.now - DAY_MS + bill) for bill in range(1, 11)]
+        sync = self.synchronizer()
+        await sync.sync(self.redis, ['SWAP'])
+        self.api.requests.clear()
+        self.assertEqual(await sync.sync(self.redis, ['SWAP']), [])
+        self.assertEqual(len(self.api.requests), 1)
+        self.assertGreaterEqual(self.api.requests[0]['begin'], self.now - DAY_MS + 10 - 1)
+        self.assertEqual(len(self.redis.streams['deltas']), 1)
+        self.assertEqual(len(self.redis.streams['history']), 1)
+
+    async def test_gap_is_backfilled_from_the_cursor(self):
+        self.api.fills = [fill(bill, self.now - DAY_MS + bill) for bill in range(1, 11)]
+        sync = self.synchronizer()
+        await sync.sync(self.redis, ['SWAP'])
+        # the service was down while 150 more fills happened
+        self.api.fills += [fill(bill, self.now - DAY_MS + bill) for bill in range(11, 161)]
+        self.api.requests.clear()
+        new_fills = await sync.sync(self.redis, ['SWAP'])
+        self.assertEqual(sorted(int(f.billId) for f in new_fills), list(range(11, 161)))
+        self.assertEqual(len(self.api.requests), 2)
+        self.assertEqual(self.published_history(), [str(bill) for bill in range(160, 0, -1)])
+        self.assertEqual(len(self.redis.streams['deltas']), 2)
+
+    async def test_failed_page_does_not_move_the_cursor(self):
+        self.api.fills = [fill(bill, self.now - DAY_MS + bill) for bill in range(1, 11)]
+        sync = self.synchronizer()
+        await sync.sync(self.redis, ['SWAP'])
+        self.api.fills.append(fill(11, self.now - DAY_MS + 11))
+        self.api.fail = True
+        with self.assertRaises(Exception):
+            await sync.sync(self.redis, ['SWAP'])
+        self.assertEqual(json.loads(self.redis.hashes['cursor']['SWAP'])['billId'], '10')
+        self.api.fail = False
+        self.assertEqual([f.billId for f in await sync.sync(self.redis, ['SWAP'])], ['11'])
+
+    async def test_restart_resumes_from_the_persisted_cursor(self):
+        self.api.fills = [fill(bill, self.now - DAY_MS + bill) for bill in range(1, 11)]
+        await self.synchronizer().sync(self.redis, ['SWAP'])
+        self.api.fills.append(fill(11, self.now - DAY_MS + 11))
+        self.api.requests.clear()
+        restarted = self.synchronizer()
+        self.assertEqual([f.billId for f in await restarted.sync(self.redis, ['SWAP'])], ['11'])
+        self.assertEqual(len(restarted.history()), 11)
+        self.assertEqual(len(self.api.requests), 1)
+
+    async def test_cursor_without_fills_resyncs_the_window(self):
+        self.api.fills = [fill(bill, self.now - DAY_MS + bill) for bill in range(1, 11)]
+        await self.synchronizer().sync(self.redis, ['SWAP'])
+        del self.redis.streams['deltas']  # flushed
+        del self.redis.streams['history']
+        restarted = self.synchronizer()
+        self.assertEqual(len(await restarted.sync(self.redis, ['SWAP'])), 10)
+        self.assertEqual(self.api.requests[-1]['after'], '')
+
+    async def test_history_published_before_the_deltas_seeds_the_fills(self):
+        await self.redis.xadd('history', {'data': serialize_for_redis(
+            [fill(bill, self.now - DAY_MS + bill) for bill in range(10, 0, -1)])}, maxlen=1)
+        self.api.fills = [fill(bill, self.now - DAY_MS + bill) for bill in range(1, 13)]
+        sync = self.synchronizer()
+        self.assertEqual(sorted(f.billId for f in await sync.sync(self.redis, ['SWAP'])), ['11', '12'])
+        self.assertEqual(self.published_history(), [str(bill) for bill in range(12, 0, -1)])
+        self.assertEqual(len(self.redis.streams['deltas']), 2)
@@ -0,0 +1,100 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from pyokx.low_rest_api import consts as c
+from pyokx.low_rest_api.hedging import Hedger, is_hedgeable
+
+PRIMARY = 'primary'
+ALTERNATE = 'alternate'
+
+
+class FakeHosts:
+    """`send` of a client, each host answers after its delay or raises its error."""
+
+    def __init__(self, primary_delay, alternate_delay, primary_error=None, alternate_error=None):
+        self.delays = {PRIMARY: primary_delay, ALTERNATE: alternate_delay}
+        self.errors = {PRIMARY: primary_error, ALTERNATE: alternate_error}
+        self.sent = []
+        self.cancelled = []
+
+    async def send(self, transport=None):
+        host = transport or PRIMARY
+        self.sent.append(host)
+        try:
+            await asyncio.sleep(self.delays[host])
+        except asyncio.CancelledError:
+            self.cancelled.append(host)
+            raise
+        if self.errors[host]:
+            raise self.errors[host]
+        return {'code': '0', 'host': host}
+
+
+class TestHedgerRequest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.hedger = Hedger(c.AWS_API_URL)
+        patcher = patch.object(c, 'HEDGE_DEFAULT_DELAY', 0.02)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def request(self, hosts, can_hedge=None):
+        return await self.hedger.request(c.TICKER_INFO, hosts.send, ALTERNATE, can_hedge=can_hedge)
+
+    async def test_fast_primary_is_not_hedged(self):
+        hosts = FakeHosts(primary_delay=0.001, alternate_delay=0.001)
+        self.assertEqual((await self.request(hosts))['host'], PRIMARY)
+        self.assertEqual(hosts.sent, [PRIMARY])
+        self.assertEqual(self.hedger.stats()['hedges'], 0)
+
+    async def test_slow_primary_is_hedged_after_the_delay_and_loses(self):
+        hosts = FakeHosts(primary_delay=1, alternate_delay=0.001)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.assertEqual((await self.request(hosts))['host'], ALTERNATE)
+        self.assertGreaterEqual(loop.time() - started, 0.02)
+        self.assertEqual(hosts.sent, [PRIMARY, ALTERNATE])
+        await asyncio.sleep(0)
+        self.assertEqual(hosts.cancelled, [PRIMARY])
+        self.assertEqual(self.hedger.stats(), {'requests': 1, 'hedges': 1, 'hedge_wins': 1, 'hedge_ratio': 1.0})
+
+    async def test_primary_answering_after_the_hedge_was_sent_wins(self):
+        hosts = FakeHosts(primary_delay=0.04, alternate_delay=1)
+        self.assertEqual((await self.request(hosts))['host'], PRIMARY)
+        await asyncio.sleep(0)
+        self.assertEqual(hosts.cancelled, [ALTERNATE])
+        self.assertEqual(self.hedger.stats()['hedge_wins'], 0)
+
+    async def test_failed_request_loses_to_the_other_one(self):
+        hosts = FakeHosts(primary_delay=0.03, alternate_delay=0.05, primary_error=ConnectionError('reset'))
+        self.assertEqual((await self.request(hosts))['host'], ALTERNATE)
+
+    async def test_error_is_raised_when_both_fail(self):
+        hosts = FakeHosts(primary_delay=0.03, alternate_delay=0.04, primary_error=ConnectionError('reset'),
+                          alternate_error=TimeoutError('timeout'))
+        with self.assertRaises((ConnectionError, TimeoutError)):
+            await self.request(hosts)
+
+    async def test_no_hedge_without_rate_limit_capacity(self):
+        hosts = FakeHosts(primary_delay=0.04, alternate_delay=0.001)
+        self.assertEqual((await self.request(hosts, can_hedge=lambda: False))['host'], PRIMARY)
+        self.assertEqual(hosts.sent, [PRIMARY])
+
+    def test_delay_follows_the_latency_percentile_once_warmed_up(self):
+        self.assertEqual(self.hedger.hedge_delay(c.TICKER_INFO), 0.02)
+        for latency in range(1, c.HEDGE_MIN_SAMPLES * 5 + 1):  # 0.01s .. 1s
+            self.hedger.latencies.record(c.TICKER_INFO, latency / 100)
+        self.assertAlmostEqual(self.hedger.hedge_delay(c.TICKER_INFO), 0.96)
+        for _ in range(c.HEDGE_LATENCY_WINDOW):
+            self.hedger.latencies.record(c.TICKER_INFO, 0.001)
+        self.assertEqual(self.hedger.hedge_delay(c.TICKER_INFO), c.HEDGE_MIN_DELAY)
+
+
+class TestIsHedgeable(TestCase):
+    def test_reads_are_hedgeable(self):
+        for path in (c.TICKER_INFO, c.ORDER_BOOKS, c.POSITION_INFO, c.ACCOUNT_CONFIG, c.ORDER_INFO):
+            self.assertTrue(is_hedgeable(c.GET, path), path)
+
+    def test_order_mutating_endpoints_are_not(self):
+        for path in (c.PLACR_ORDER, c.CANCEL_ORDER, c.AMEND_ORDER, c.SET_LEVERAGE):
+            self.assertFalse(is_hedgeable(c.POST, path), path)
@@ -0,0 +1,63 @@
+import contextlib
+import io
+import itertools
+import random
+from unittest import TestCase
+
+from pyokx.data_structures import Instrument
+from pyokx.instrument_profiles import InstrumentProfile
+from shared.tmp_shared import ccy_usd_to_contracts
+
+
+def instrument(ctVal, ctValCcy, minSz='1', maxMktSz='10000', lever='100'):
+    return Instrument.model_construct(instId='BTC-USDT-SWAP', instType='SWAP', ctVal=ctVal, ctValCcy=ctValCcy,
+                                      lotSz='1', tickSz='0.1', minSz=minSz, maxLmtSz='100000', maxMktSz=maxMktSz,
+                                      lever=lever, expTime='')
+
+
+def former_sizing(definition: Instrument, usd_amount, last_price, leverage, usd_base_ratio=1):
+    # the sizing of the signal handler before the profiles, from the raw instrument definition
+    with contextlib.redirect_stdout(io.StringIO()):  # it prints every intermediate value
+        return ccy_usd_to_contracts(usd_equivalent=usd_amount, ccy_contract_size=float(definition.ctVal),
+                                    ccy_last_price=last_price, minimum_contract_size=int(definition.minSz),
+                                    max_market_contract_size=int(definition.maxMktSz),
+                                    usd_base_ratio=usd_base_ratio, leverage=leverage, ctValCcy=definition.ctValCcy)
+
+
+class TestUsdToContracts(TestCase):
+    def assertSizesLikeFormer(self, definition, *args):
+        try:
+            expected = former_sizing(definition, *args)
+        except ValueError:
+            with self.assertRaises(ValueError):
+                InstrumentProfile(definition).usd_to_contracts(*args)
+        else:
+            self.assertEqual(InstrumentProfile(definition).usd_to_contracts(*args), expected)
+
+    def test_sizes_orders_like_ccy_usd_to_contracts(self):
+        rng = random.Random(23)
+        definitions = [instrument('0.01', 'BTC'), instrument('100', 'USD'), instrument('10', 'ETH', minSz='2'),
+                       instrument('0.001', 'BTC', maxMktSz='50')]
+        for definition, leverage in itertools.product(definitions, [None, 0, 1, 3, 20, 125]):
+            for _ in range(50):
+                usd_amount = rng.choice([rng.uniform(1, 100), rng.uniform(100, 100_000)])
+                last_price = rng.uniform(0.5, 70_000)
+                usd_base_ratio = rng.choice([1, rng.uniform(0.9, 1.1)])
+                with self.subTest(ctVal=definition.ctVal, ctValCcy=definition.ctValCcy, usd_amount=usd_amount,
+                                  last_price=last_price, leverage=leverage):
+                    self.assertSizesLikeFormer(definition, usd_amount, last_price, leverage, usd_base_ratio)
+
+    def test_limits_are_enforced(self):
+        profile = InstrumentProfile(instrument('0.01', 'BTC', minSz='1', maxMktSz='100'))
+        self.assertEqual(profile.usd_to_contracts(usd_amount=500, last_price=50_000, leverage=1), 1)
+        with self.assertRaises(ValueError):
+            profile.usd_to_contracts(usd_amount=499, last_price=50_000, leverage=1)  # 0.998 contracts
+        with self.assertRaises(ValueError):
+            profile.usd_to_contracts(usd_amount=50_500, last_price=50_000, leverage=1)  # 101 contracts
+
+    def test_limits_the_former_sizing_could_not_parse(self):
+        # int('0.1') and int('') raised in the former sizing, the profile takes fractional and missing limits
+        profile = InstrumentProfile(instrument('1', 'USD', minSz='0.1', maxMktSz=''))
+        self.assertEqual(profile.usd_to_contracts(usd_amount=10 ** 9, last_price=1, leverage=1), 10 ** 9)
+        with self.assertRaises(ValueError):
+            profile.usd_to_contracts(usd_amount=0.5, last_price=1, leverage=1)
@@ -0,0 +1,138 @@
+import asyncio
+import binascii
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, AsyncMock
+
+from pyokx import local_order_book
+from pyokx.local_order_book import LocalOrderBooks, get_local_order_book, local_order_book_stream
+from redis_tools.utils import deserialize_from_redis
+
+INST_ID = 'BTC-USDT-SWAP'
+
+
+def okx_checksum(asks, bids):
+    # the CRC32 OKX sends with each books message, over the top 25 levels of each side, bids first
+    parts = []
+    for i in range(min(max(len(bids), len(asks)), 25)):
+        if i < len(bids):
+            parts.append(f'{bids[i][0]}:{bids[i][1]}')
+        if i < len(asks):
+            parts.append(f'{asks[i][0]}:{asks[i][1]}')
+    crc = binascii.crc32(':'.join(parts).encode())
+    return crc if crc < 0x80000000 else crc - 0x100000000
+
+
+def books_message(action, asks, bids, book_asks, book_bids, checksum=None, ts='1700000000000'):
+    """A books channel message carrying `asks`/`bids`, with the checksum of the resulting `book_asks`/`book_bids`."""
+    return {'arg': {'channel': 'books', 'instId': INST_ID}, 'action': action,
+            'data': [{'asks': asks, 'bids': bids, 'ts': ts,
+                      'checksum': okx_checksum(book_asks, book_bids) if checksum is None else checksum}]}
+
+
+ASKS = [['101', '2', '0', '1'], ['102', '3', '0', '1']]
+BIDS = [['100', '1', '0', '1'], ['99', '4', '0', '2']]
+SNAPSHOT = books_message('snapshot', ASKS, BIDS, ASKS, BIDS)
+# 101 is filled, 100.5 joins the bids
+UPDATE = books_message('update', [['101', '0', '0', '0']], [['100.5', '5', '0', '1']],
+                       ASKS[1:], [['100.5', '5', '0', '1']] + BIDS)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.streams = {}
+        self.reads = 0
+
+    async def xadd(self, name, fields, maxlen=None):
+        stream = self.streams.setdefault(name, [])
+        stream.append((f'{int(time.time() * 1000)}-{len(stream)}', fields))
+        del stream[:-maxlen]
+
+    async def xrevrange(self, name, count=None):
+        self.reads += 1
+        return list(reversed(self.streams.get(name, [])))[:count]
+
+    async def delete(self, name):
+        self.streams.pop(name, None)
+
+
+class TestLocalOrderBooks(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        self.books = LocalOrderBooks(publish_interval=0)
+
+    def published(self):
+        return [deserialize_from_redis(fields['data']) for _, fields in self.redis.streams[local_order_book_stream(
+            INST_ID)]]
+
+    async def test_snapshot_and_update_are_published(self):
+        await self.books.on_message(SNAPSHOT, self.redis)
+        await self.books.on_message(UPDATE, self.redis)
+        snapshot, updated = self.published()
+        self.assertEqual(snapshot['asks'], ASKS)
+        self.assertEqual(snapshot['bids'], BIDS)
+        self.assertEqual(updated['asks'], ASKS[1:])
+        self.assertEqual(updated['bids'], [['100.5', '5', '0', '1']] + BIDS)
+        self.assertEqual(self.books.stats['checksum_failures'], 0)
+
+    async def test_checksum_mismatch_discards_the_book_and_resubscribes(self):
+        resubscribe = AsyncMock()
+        await self.books.on_message(SNAPSHOT, self.redis)
+        bad_update = books_message('update', [['101', '0', '0', '0']], [], ASKS, BIDS)  # checksum of the old book
+        await self.books.on_message(bad_update, self.redis, resubscribe=resubscribe)
+
+        resubscribe.assert_awaited_once_with({'channel': 'books', 'instId': INST_ID})
+        self.assertNotIn(INST_ID, self.books.books)
+        self.assertNotIn(local_order_book_stream(INST_ID), self.redis.streams)
+        self.assertEqual(self.books.stats['checksum_failures'], 1)
+
+        # updates before the new snapshot are dropped, the snapshot rebuilds the book
+        await self.books.on_message(UPDATE, self.redis, resubscribe=resubscribe)
+        self.assertNotIn(local_order_book_stream(INST_ID), self.redis.streams)
+        await self.books.on_message(SNAPSHOT, self.redis, resubscribe=resubscribe)
+        self.assertEqual(self.published()[-1]['asks'], ASKS)
+        resubscribe.assert_awaited_once()
+
+    async def test_updates_within_the_interval_are_published_together(self):
+        books = LocalOrderBooks(publish_interval=0.05)
+        await books.on_message(SNAPSHOT, self.redis)
+        await books.on_message(UPDATE, self.redis)
+        self.assertEqual(len(self.redis.streams[local_order_book_stream(INST_ID)]), 1)
+        await asyncio.sleep(0.1)
+        snapshot, updated = self.published()
+        self.assertEqual(updated['asks'], ASKS[1:])
+        self.assertEqual(books.stats['published'], 2)
+
+    async def test_pending_publish_is_dropped_with_a_corrupted_book(self):
+        books = LocalOrderBooks(publish_interval=0.05)
+        await books.on_message(SNAPSHOT, self.redis)
+        await books.on_message(UPDATE, self.redis)
+        await books.on_message(books_message('update', [], [['98', '1', '0', '1']], [], [], checksum=1), self.redis)
+        await asyncio.sleep(0.1)
+        self.assertNotIn(local_order_book_stream(INST_ID), self.redis.streams)
+        self.assertEqual(books.stats['published'], 1)
+
+
+class TestGetLocalOrderBook(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        patcher = patch.object(local_order_book, 'ORDER_BOOK_INSTRUMENTS', [INST_ID])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_fresh_book_is_returned(self):
+        await LocalOrderBooks(publish_interval=0).on_message(SNAPSHOT, self.redis)
+        snapshot = await get_local_order_book(self.redis, INST_ID, depth=1)
+        self.assertEqual([ask.price for ask in snapshot.asks], ['101'])
+        self.assertEqual([bid.price for bid in snapshot.bids], ['100'])
+
+    async def test_stale_book_is_not_used(self):
+        await LocalOrderBooks(publish_interval=0).on_message(SNAPSHOT, self.redis)
+        self.assertIsNone(await get_local_order_book(self.redis, INST_ID, max_age=-1))
+
+    async def test_missing_book_is_not_used(self):
+        self.assertIsNone(await get_local_order_book(self.redis, INST_ID))
+
+    async def test_instruments_without_a_local_book_skip_redis(self):
+        self.assertIsNone(await get_local_order_book(self.redis, 'ETH-USDT-SWAP'))
+        self.assertEqual(self.redis.reads, 0)
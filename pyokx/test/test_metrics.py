@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+from pyokx.low_rest_api.metrics import Histogram, MAX_CODES_PER_ENDPOINT, RequestMetrics, render_metrics
+
+TICKER = '/api/v5/market/ticker'
+ORDER = '/api/v5/trade/order'
+
+
+class TestHistogram(TestCase):
+    def test_values_fall_in_the_first_bucket_they_do_not_exceed(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 1.0, 3.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 2, 1])
+        self.assertEqual(list(histogram.cumulative_counts()), [2, 4, 5])
+        self.assertAlmostEqual(histogram.sum, 4.65)
+        self.assertEqual(histogram.count, 5)
+
+
+class TestRequestMetrics(TestCase):
+    def setUp(self) -> None:
+        self.metrics = RequestMetrics()
+
+    def test_okx_codes_per_endpoint_are_capped(self):
+        for code in range(MAX_CODES_PER_ENDPOINT + 5):
+            self.metrics.observe_response('POST', ORDER, 0.01, 200, {'code': str(code)})
+        self.metrics.observe_response('POST', ORDER, 0.01, 200, {'code': '0'})  # known codes keep their label
+        self.metrics.observe_response('GET', TICKER, 0.01, 200, {'code': '51000'})  # other endpoints have their own
+        codes = {code: count for (method, path, code), count in self.metrics.okx_codes.items() if path == ORDER}
+        self.assertEqual(len(codes), MAX_CODES_PER_ENDPOINT + 1)
+        self.assertEqual(codes['other'], 5)
+        self.assertEqual(codes['0'], 2)
+        self.assertEqual(self.metrics.okx_codes[('GET', TICKER, '51000')], 1)
+
+    def test_responses_without_a_json_body_count_no_code(self):
+        self.metrics.observe_response('GET', TICKER, 0.01, 502, None)
+        self.assertEqual(self.metrics.responses, {('GET', TICKER, 502): 1})
+        self.assertEqual(self.metrics.okx_codes, {})
+
+    def test_render(self):
+        self.metrics.observe_response('GET', TICKER, 0.02, 200, {'code': '0'})
+        self.metrics.observe_error('GET', TICKER, 5.0, TimeoutError())
+        self.metrics.observe_retry('POST', ORDER)
+        self.metrics.observe_rate_limit_wait('POST', ORDER, 0.0)
+        lines = self.metrics.render().splitlines()
+        labels = f'method="GET",path="{TICKER}"'
+        for line in (
+                '# TYPE okx_rest_request_duration_seconds histogram',
+                f'okx_rest_request_duration_seconds_bucket{{{labels},le="0.01"}} 0',
+                f'okx_rest_request_duration_seconds_bucket{{{labels},le="0.025"}} 1',
+                f'okx_rest_request_duration_seconds_bucket{{{labels},le="5.0"}} 2',
+                f'okx_rest_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2',
+                f'okx_rest_request_duration_seconds_sum{{{labels}}} 5.02',
+                f'okx_rest_request_duration_seconds_count{{{labels}}} 2',
+                '# TYPE okx_rest_responses_total counter',
+                f'okx_rest_responses_total{{{labels},status="200"}} 1',
+                f'okx_rest_okx_codes_total{{{labels},code="0"}} 1',
+                f'okx_rest_errors_total{{{labels},exception="TimeoutError"}} 1',
+                f'okx_rest_retries_total{{method="POST",path="{ORDER}"}} 1',
+                f'okx_rest_rate_limit_wait_seconds_bucket{{method="POST",path="{ORDER}",le="0.001"}} 1'):
+            self.assertIn(line, lines)
+
+    def test_every_metric_is_documented(self):
+        text = render_metrics()
+        self.assertTrue(text.endswith('\n'))
+        names = [line.split()[2] for line in text.splitlines() if line.startswith('# TYPE')]
+        helped = [line.split()[2] for line in text.splitlines() if line.startswith('# HELP')]
+        self.assertEqual(names, helped)
+        self.assertIn('okx_rest_coalesced_requests_total', names)
+        self.assertIn('okx_server_clock_offset_seconds', names)
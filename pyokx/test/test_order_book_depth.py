@@ -0,0 +1,69 @@
+import random
+from unittest import TestCase
+
+from pyokx.columnar_snapshot import ColumnarOrderbookSnapshot
+from pyokx.data_structures import Ask, Bid, Orderbook_Snapshot
+from pyokx.order_book_depth import OrderBookDepth
+
+
+def loop_limit_price(order_book, quantity, side, reference_price):
+    # the former `prepare_limit_price` walk
+    aggregate_quantity = 0
+    for ask_or_bid in (order_book.asks if side == 'buy' else order_book.bids):
+        aggregate_quantity += float(ask_or_bid.quantity)
+        if (side == 'buy' and reference_price > float(ask_or_bid.price)) or \
+                (side == 'sell' and reference_price < float(ask_or_bid.price)):
+            continue
+        if aggregate_quantity >= quantity:
+            return float(ask_or_bid.price)
+
+
+def random_book(rng, levels, ts):
+    asks = [Ask(price=f'{43750 + i * 0.1:.1f}', quantity=str(rng.randint(1, 300)), deprecated_value='0',
+                number_of_orders='1') for i in range(levels)]
+    bids = [Bid(price=f'{43749.9 - i * 0.1:.1f}', quantity=str(rng.randint(1, 300)), deprecated_value='0',
+                number_of_orders='1') for i in range(levels)]
+    return Orderbook_Snapshot(instId='BTC-USDT-SWAP', depth=str(levels), asks=asks, bids=bids, ts=str(ts))
+
+
+class TestOrderBookDepth(TestCase):
+    def test_limit_price_index_matches_the_former_loop(self):
+        rng = random.Random(7)
+        for ts in range(50):
+            book = random_book(rng, rng.choice([1, 5, 400]), ts)
+            depth = OrderBookDepth.from_snapshot(book)
+            for side in ('buy', 'sell'):
+                book_side = depth.side(side)
+                total = book_side.total_quantity
+                for _ in range(20):
+                    quantity = rng.choice([1, rng.uniform(0, total), total, total + 1])
+                    reference_price = rng.uniform(43700, 43800)
+                    index = book_side.limit_price_index(quantity, reference_price)
+                    price = float(book_side.prices[index]) if index >= 0 else None
+                    self.assertEqual(price, loop_limit_price(book, quantity, side, reference_price),
+                                     (ts, side, quantity, reference_price))
+
+    def test_depth_queries(self):
+        book = Orderbook_Snapshot.from_array('BTC-USDT-SWAP', 3, [['101', '1', '0', '1'], ['102', '2', '0', '1'],
+                                                                  ['103', '3', '0', '1']],
+                                             [['100', '2', '0', '1'], ['99', '5', '0', '1']], '1')
+        depth = OrderBookDepth.from_snapshot(book)
+        self.assertEqual(depth.asks.price_to_fill(2), 102.0)
+        self.assertAlmostEqual(depth.asks.vwap(2), (101 + 102) / 2)
+        self.assertIsNone(depth.asks.vwap(7))
+        self.assertEqual(depth.mid_price, 100.5)
+        self.assertAlmostEqual(depth.slippage('sell', 4), (100.5 - (2 * 100 + 2 * 99) / 4) / 100.5)
+        self.assertEqual(depth.asks.liquidity_within(1, 1.0), 3.0)
+        self.assertEqual(depth.bids.liquidity_within(0, 1.0), 2.0)
+        self.assertEqual(depth.analyze('buy', 6)['total_quantity'], 6.0)
+
+    def test_columnar_snapshot_gives_the_same_answers(self):
+        book = random_book(random.Random(3), 400, 'columnar')
+        depth = OrderBookDepth.from_snapshot(book)
+        columnar_book = ColumnarOrderbookSnapshot.from_snapshot(book)
+        columnar_book.ts = 'columnar copy'  # not the cached view of `book`
+        columnar = OrderBookDepth.from_snapshot(columnar_book)
+        for side in ('buy', 'sell'):
+            quantity = depth.side(side).total_quantity / 2
+            self.assertEqual(depth.analyze(side, quantity, tick_size=0.1, ticks=10),
+                             columnar.analyze(side, quantity, tick_size=0.1, ticks=10))
@@ -0,0 +1,76 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from pyokx.order_gateway import OrderGateway
+
+
+class FakeTradeAPI:
+    def __init__(self, delay=0.0):
+        self.requests = []
+        self.delay = delay
+
+    async def place_order(self, **order):
+        self.requests.append(('place_order', [order]))
+        await asyncio.sleep(self.delay)
+        return {'code': '0', 'msg': '', 'data': [{'clOrdId': order.get('clOrdId', ''), 'sCode': '0', 'sMsg': ''}]}
+
+    async def place_multiple_orders(self, orders):
+        self.requests.append(('place_multiple_orders', orders))
+        data = [{'clOrdId': order.get('clOrdId', ''), 'sCode': '0' if order['sz'] != '0' else '51008',
+                 'sMsg': '' if order['sz'] != '0' else 'Insufficient balance'} for order in orders]
+        return {'code': '2' if any(entry['sCode'] != '0' for entry in data) else '0', 'msg': '', 'data': data}
+
+
+class TestOrderGateway(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.api = FakeTradeAPI()
+        self.gateway = OrderGateway(self.api, window=0.01, max_batch_size=3)
+
+    def order(self, clOrdId, sz='1'):
+        return self.gateway.place_order(instId='BTC-USDT-SWAP', tdMode='isolated', side='buy', ordType='market',
+                                        sz=sz, clOrdId=clOrdId)
+
+    async def test_lone_order_goes_through_the_single_endpoint(self):
+        response = await self.order('a')
+        self.assertEqual(response['code'], '0')
+        self.assertEqual([name for name, _ in self.api.requests], ['place_order'])
+
+    async def test_idle_gateway_does_not_wait_for_the_window(self):
+        gateway = OrderGateway(self.api, window=60)
+        response = await asyncio.wait_for(gateway.place_order(instId='BTC-USDT-SWAP', tdMode='isolated', side='buy',
+                                                              ordType='market', sz='1'), timeout=1)
+        self.assertEqual(response['code'], '0')
+
+    async def test_intents_during_a_request_are_batched_after_the_window(self):
+        self.api.delay = 0.05
+        first = asyncio.ensure_future(self.order('a'))
+        await asyncio.sleep(0.01)  # a is being sent
+        await asyncio.gather(self.order('b'), self.order('c'), first)
+        self.assertEqual([(name, [order['clOrdId'] for order in orders]) for name, orders in self.api.requests],
+                         [('place_order', ['a']), ('place_multiple_orders', ['b', 'c'])])
+        await asyncio.sleep(0)  # done callbacks
+        self.assertEqual(self.gateway._flushes, set())
+
+    async def test_concurrent_orders_are_batched_and_split_back(self):
+        responses = await asyncio.gather(self.order('a'), self.order('b', sz='0'))
+        self.assertEqual([name for name, _ in self.api.requests], ['place_multiple_orders'])
+        self.assertEqual([response['code'] for response in responses], ['0', '1'])
+        self.assertEqual(responses[1]['msg'], 'Insufficient balance')
+        self.assertEqual(responses[1]['data'][0]['clOrdId'], 'b')
+
+    async def test_full_batch_is_flushed_at_once(self):
+        responses = await asyncio.gather(*[self.order(str(i)) for i in range(5)])
+        self.assertEqual(len(responses), 5)
+        self.assertEqual([len(orders) for _, orders in self.api.requests], [3, 2])
+
+    async def test_abandoned_intents_are_not_sent(self):
+        abandoned = asyncio.ensure_future(self.order('a'))
+        kept = asyncio.ensure_future(self.order('b'))
+        await asyncio.sleep(0)
+        abandoned.cancel()  # e.g. its deadline expired before the flush
+        response = await kept
+        self.assertEqual(response['data'][0]['clOrdId'], 'b')
+        self.assertEqual(self.api.requests, [('place_order', [{'instId': 'BTC-USDT-SWAP', 'tdMode': 'isolated',
+                                                               'side': 'buy', 'ordType': 'market', 'sz': '1',
+                                                               'clOrdId': 'b'}])])
+        self.assertEqual(self.gateway.stats['abandoned'], 1)
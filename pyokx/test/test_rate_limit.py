@@ -0,0 +1,76 @@
+import time
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from pyokx.low_rest_api import consts as c
+from pyokx.low_rest_api.rate_limit import RateLimit, RateLimiter, TokenBucket, USER, IP, is_rate_limited
+
+
+class TestTokenBucket(TestCase):
+    def test_reservations_queue_up_once_empty(self):
+        bucket = TokenBucket(capacity=2, refill_rate=10)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, delta=0.01)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, delta=0.01)
+        self.assertFalse(bucket.has_capacity())
+
+    def test_refills_up_to_capacity(self):
+        bucket = TokenBucket(capacity=2, refill_rate=1000)
+        bucket.reserve(2)
+        time.sleep(0.01)
+        self.assertTrue(bucket.has_capacity(2))
+        self.assertEqual(bucket.tokens, 2.0)
+
+    def test_cost_is_capped_at_capacity(self):
+        bucket = TokenBucket(capacity=2, refill_rate=1)
+        self.assertEqual(bucket.reserve(5), 0.0)
+
+    def test_drain_pushes_the_bucket_into_debt(self):
+        bucket = TokenBucket(capacity=10, refill_rate=10)
+        bucket.drain(1)
+        self.assertAlmostEqual(bucket.reserve(), 1.1, delta=0.01)
+
+
+class TestRateLimiter(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.limiter = RateLimiter(limits={
+            (c.POST, c.PLACR_ORDER): RateLimit(2, 2, USER, ('instId',)),
+            (c.POST, c.BATCH_ORDERS): RateLimit(4, 2, USER, per_item=True),
+            (c.GET, c.TICKER_INFO): RateLimit(2, 2, IP),
+        }, default_limit=RateLimit(1, 2, USER))
+
+    def test_user_limits_are_keyed_by_api_key_and_scope_params(self):
+        place = lambda instId, api_key: self.limiter.reserve(c.POST, c.PLACR_ORDER, {'instId': instId}, api_key)
+        self.assertEqual([place('BTC-USDT-SWAP', 'a'), place('BTC-USDT-SWAP', 'a')], [0.0, 0.0])
+        self.assertGreater(place('BTC-USDT-SWAP', 'a'), 0)
+        self.assertEqual(place('ETH-USDT-SWAP', 'a'), 0.0)
+        self.assertEqual(place('BTC-USDT-SWAP', 'b'), 0.0)
+
+    def test_ip_limits_are_shared_between_api_keys(self):
+        self.limiter.reserve(c.GET, c.TICKER_INFO, {}, 'a')
+        self.limiter.reserve(c.GET, c.TICKER_INFO, {}, 'b')
+        self.assertFalse(self.limiter.has_capacity(c.GET, c.TICKER_INFO, {}, 'c'))
+
+    def test_batch_requests_cost_one_token_per_item(self):
+        orders = [{'instId': 'BTC-USDT-SWAP'}] * 3
+        self.assertEqual(self.limiter.reserve(c.POST, c.BATCH_ORDERS, orders), 0.0)
+        self.assertGreater(self.limiter.reserve(c.POST, c.BATCH_ORDERS, orders), 0)
+
+    def test_unknown_endpoints_get_the_default_limit(self):
+        self.assertEqual(self.limiter.reserve(c.GET, '/api/v5/unknown'), 0.0)
+        self.assertGreater(self.limiter.reserve(c.GET, '/api/v5/unknown'), 0)
+
+    async def test_acquire_waits_for_the_refill(self):
+        limiter = RateLimiter(limits={(c.GET, c.TICKER_INFO): RateLimit(2, 0.1, IP)})
+        waits = [await limiter.acquire(c.GET, c.TICKER_INFO) for _ in range(3)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.05, delta=0.01)
+
+    def test_penalize_backs_the_bucket_off(self):
+        self.limiter.penalize(c.GET, c.TICKER_INFO, seconds=1)
+        self.assertGreaterEqual(self.limiter.reserve(c.GET, c.TICKER_INFO), 1.0)
+
+    def test_is_rate_limited(self):
+        self.assertTrue(is_rate_limited(429, None))
+        self.assertTrue(is_rate_limited(200, {'code': c.RATE_LIMIT_ERROR_CODE, 'msg': 'Too Many Requests'}))
+        self.assertFalse(is_rate_limited(200, {'code': '0', 'data': []}))
@@ -0,0 +1,85 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, AsyncMock
+
+from pyokx import rest_handling
+from pyokx.account_state import AccountStateCache
+from pyokx.stream_snapshots import orders_snapshot, positions_snapshot, algo_orders_snapshot
+from redis_tools.utils import serialize_for_redis
+
+INST_ID = 'BTC-USDT-SWAP'
+POSITION = {'instId': INST_ID, 'instType': 'SWAP', 'mgnMode': 'isolated', 'posSide': 'net', 'pos': '2', 'lever': '5'}
+ORDER = {'instId': INST_ID, 'instType': 'SWAP', 'ordId': '1', 'ordType': 'limit', 'state': 'live'}
+ALGO_ORDER = {'instId': INST_ID, 'instType': 'SWAP', 'algoId': '7', 'ordType': 'move_order_stop', 'state': 'live'}
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.streams = []
+
+    def xrevrange(self, stream, count=None):
+        self.streams.append(stream)
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [self.redis.entries[stream][-1:] for stream in self.streams]
+
+
+class FakeRedis:
+    """The latest entry of each snapshot stream, the entry IDs count up per stream."""
+
+    def __init__(self):
+        self.entries = {}
+        self.round_trips = 0
+
+    def publish(self, stream, data):
+        entries = self.entries.setdefault(stream, [])
+        entries.append((f'{len(entries) + 1}-0', {'data': serialize_for_redis(data)}))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class TestFetchStatusReportForInstrument(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        self.redis.publish(positions_snapshot.stream, {'data': [POSITION]})
+        self.redis.publish(orders_snapshot.stream, [ORDER])
+        self.redis.publish(algo_orders_snapshot.stream, [ALGO_ORDER])
+        self.account_state = AccountStateCache(account_api=None)
+        for patcher in (patch.object(rest_handling, 'get_async_redis', AsyncMock(return_value=self.redis)),
+                        patch.object(rest_handling, 'account_state', self.account_state),
+                        patch.object(rest_handling, '_status_reports', {})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for snapshot in (positions_snapshot, orders_snapshot, algo_orders_snapshot):
+            self.addCleanup(snapshot._set_records, None, [])
+
+    async def report(self):
+        return await rest_handling.fetch_status_report_for_instrument(INST_ID, 'isolated')
+
+    async def test_report_is_reused_while_the_streams_are_unchanged(self):
+        first = await self.report()
+        self.assertIs(await self.report(), first)
+        self.assertEqual(self.redis.round_trips, 2)  # one pipelined round trip per call
+        self.assertEqual([position.pos for position in first.positions], ['2'])
+        self.assertEqual([order.ordId for order in first.orders], ['1'])
+        self.assertEqual([algo_order.algoId for algo_order in first.algo_orders], ['7'])
+        self.assertEqual(self.account_state.cached_leverage(INST_ID, 'isolated', 'net'), '5')
+
+    async def test_report_is_rebuilt_when_any_stream_advances(self):
+        for stream, data, read in (
+                (positions_snapshot.stream, {'data': [{**POSITION, 'pos': '3'}]},
+                 lambda report: report.positions[0].pos),
+                (orders_snapshot.stream, [{**ORDER, 'ordId': '2'}], lambda report: report.orders[0].ordId),
+                (algo_orders_snapshot.stream, [], lambda report: report.algo_orders)):
+            with self.subTest(stream=stream):
+                before = await self.report()
+                self.redis.publish(stream, data)
+                after = await self.report()
+                self.assertIsNot(after, before)
+                self.assertNotEqual(read(after), read(before))
+
+    async def test_no_instrument_no_report(self):
+        self.assertIsNone(await rest_handling.fetch_status_report_for_instrument(None, 'isolated'))
+        self.assertEqual(self.redis.round_trips, 0)
@@ -0,0 +1,76 @@
+from unittest import IsolatedAsyncioTestCase
+
+from pyokx.data_structures import OKXSignalInput, PremiumIndicatorSignals
+from pyokx.signal_dedup import SignalDeduplicator, signal_fingerprint, COMPLETED, IN_FLIGHT, SUPERSEDED
+
+
+class FakeRedis:
+    """The string commands `SignalDeduplicator` uses, TTLs are recorded but never expire."""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        self.ttls[key] = ex
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+
+class TestSignalFingerprint(IsolatedAsyncioTestCase):
+    def test_equal_signals_written_differently_share_a_fingerprint(self):
+        first = OKXSignalInput(instID='BTC-USDT-SWAP', usd_order_size=100, leverage=5, order_side='BUY',
+                               order_type='limit', red_button=False)
+        second = OKXSignalInput(instID=' btc-usdt-swap', usd_order_size=100.0, leverage=5, order_side='buy',
+                                order_type='LIMIT', red_button=None)
+        self.assertEqual(signal_fingerprint(first), signal_fingerprint(second))
+
+    def test_different_signals_have_different_fingerprints(self):
+        buy = OKXSignalInput(instID='BTC-USDT-SWAP', usd_order_size=100, order_side='buy')
+        self.assertNotEqual(signal_fingerprint(buy), signal_fingerprint(buy.model_copy(update={'order_side': 'sell'})))
+        self.assertNotEqual(signal_fingerprint(buy), signal_fingerprint(buy.model_copy(update={'usd_order_size': 101})))
+
+    def test_indicator_signals_are_part_of_the_fingerprint(self):
+        signal = OKXSignalInput(instID='BTC-USDT-SWAP', usd_order_size=100, order_side='buy')
+        bullish = PremiumIndicatorSignals(Bullish=1, Bearish=0, Bullish_plus=0, Bearish_plus=0, Bullish_Exit=0,
+                                          Bearish_Exit=0)
+        exit_ = bullish.model_copy(update={'Bullish': 0, 'Bullish_Exit': 1})
+        self.assertNotEqual(signal_fingerprint(signal, bullish), signal_fingerprint(signal, exit_))
+        self.assertNotEqual(signal_fingerprint(signal), signal_fingerprint(signal, bullish))
+
+
+class TestSignalDeduplicator(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.redis = FakeRedis()
+        self.deduplicator = SignalDeduplicator(ttl=30)
+
+    async def test_first_copy_is_claimed_and_duplicates_get_the_original(self):
+        self.assertIsNone(await self.deduplicator.claim(self.redis, 'f', instId='BTC-USDT-SWAP'))
+        self.assertEqual(await self.deduplicator.claim(self.redis, 'f', instId='BTC-USDT-SWAP'),
+                         {'status': IN_FLIGHT, 'instId': 'BTC-USDT-SWAP'})
+        self.assertEqual(self.deduplicator.stats, {'claimed': 1, 'duplicates': 1})
+        self.assertEqual(self.redis.ttls['okx:signal_dedup@f'], 30)
+
+    async def test_duplicates_after_completion_get_the_outcome(self):
+        await self.deduplicator.claim(self.redis, 'f', instId='BTC-USDT-SWAP')
+        await self.deduplicator.complete(self.redis, 'f', COMPLETED, response_stream_id='1-0')
+        self.assertEqual(await self.deduplicator.claim(self.redis, 'f'),
+                         {'status': COMPLETED, 'instId': 'BTC-USDT-SWAP', 'response_stream_id': '1-0'})
+
+    async def test_superseded_signal_stays_claimed(self):
+        await self.deduplicator.claim(self.redis, 'f')
+        await self.deduplicator.complete(self.redis, 'f', SUPERSEDED)
+        self.assertEqual((await self.deduplicator.claim(self.redis, 'f'))['status'], SUPERSEDED)
+
+    async def test_released_claim_lets_a_retry_execute(self):
+        await self.deduplicator.claim(self.redis, 'f')
+        await self.deduplicator.release(self.redis, 'f')
+        self.assertIsNone(await self.deduplicator.claim(self.redis, 'f'))
@@ -0,0 +1,98 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from pyokx.signal_queue import SignalExecutor, SUPERSEDED, SHUTDOWN
+
+
+class TestSignalExecutor(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.executor = SignalExecutor()
+        self.events = []
+
+    def signal(self, name, duration=0.01):
+        async def run(queue_wait):
+            self.events.append(f'start {name}')
+            await asyncio.sleep(duration)
+            self.events.append(f'end {name}')
+
+        return run
+
+    def drop_recorder(self, name):
+        async def dropped(reason):
+            self.events.append(f'dropped {name} {reason}')
+
+        return dropped
+
+    async def drain(self):
+        while self.executor.workers:
+            await asyncio.gather(*list(self.executor.workers.values()))
+
+    async def test_signals_of_an_instrument_run_in_order(self):
+        self.executor.submit('BTC-USDT-SWAP', self.signal('a'), supersedable=False)
+        self.executor.submit('BTC-USDT-SWAP', self.signal('b'), supersedable=False)
+        await self.drain()
+        self.assertEqual(self.events, ['start a', 'end a', 'start b', 'end b'])
+
+    async def test_newer_signal_supersedes_the_queued_ones(self):
+        self.executor.submit('BTC-USDT-SWAP', self.signal('a'), on_drop=self.drop_recorder('a'))
+        await asyncio.sleep(0)  # a is running
+        self.executor.submit('BTC-USDT-SWAP', self.signal('b'), on_drop=self.drop_recorder('b'))
+        ack = self.executor.submit('BTC-USDT-SWAP', self.signal('c'), on_drop=self.drop_recorder('c'))
+        await self.drain()
+        await asyncio.sleep(0)  # drop callbacks
+        self.assertEqual(ack['superseded'], 1)
+        self.assertEqual(self.events, ['start a', f'dropped b {SUPERSEDED}', 'end a', 'start c', 'end c'])
+        self.assertEqual(self.executor.stats['superseded'], 1)
+
+    async def test_red_button_is_never_superseded(self):
+        self.executor.submit('BTC-USDT-SWAP', self.signal('a'))
+        await asyncio.sleep(0)
+        self.executor.submit('BTC-USDT-SWAP', self.signal('red'), supersedable=False, exclusive=True)
+        self.executor.submit('BTC-USDT-SWAP', self.signal('b'))
+        await self.drain()
+        self.assertEqual(self.events, ['start a', 'end a', 'start red', 'end red', 'start b', 'end b'])
+
+    async def test_instId_case_does_not_split_the_queue(self):
+        self.executor.submit('btc-usdt-swap', self.signal('a'), supersedable=False)
+        ack = self.executor.submit('BTC-USDT-SWAP', self.signal('b'), supersedable=False)
+        self.assertEqual(list(self.executor.workers), ['BTC-USDT-SWAP'])
+        self.assertEqual(ack, {'instId': 'BTC-USDT-SWAP', 'queued_ahead': 1, 'superseded': 0})
+        await self.drain()
+        self.assertEqual(self.events, ['start a', 'end a', 'start b', 'end b'])
+
+    async def test_instruments_run_in_parallel(self):
+        self.executor.submit('BTC-USDT-SWAP', self.signal('btc'))
+        self.executor.submit('ETH-USDT-SWAP', self.signal('eth'))
+        await self.drain()
+        self.assertEqual(self.events[:2], ['start btc', 'start eth'])
+
+    async def test_red_button_waits_for_earlier_signals_of_every_instrument(self):
+        self.executor.submit('BTC-USDT-SWAP', self.signal('btc', 0.05))
+        self.executor.submit('ETH-USDT-SWAP', self.signal('red'), supersedable=False, exclusive=True)
+        await self.drain()
+        self.assertEqual(self.events, ['start btc', 'end btc', 'start red', 'end red'])
+
+    async def test_signals_after_a_red_button_wait_for_it(self):
+        self.executor.submit('', self.signal('red', 0.05), supersedable=False, exclusive=True)
+        self.executor.submit('BTC-USDT-SWAP', self.signal('btc'))
+        self.executor.submit('ETH-USDT-SWAP', self.signal('eth'))
+        await self.drain()
+        self.assertEqual(self.events[:2], ['start red', 'end red'])
+        self.assertCountEqual(self.events[2:], ['start btc', 'end btc', 'start eth', 'end eth'])
+
+    async def test_superseded_signal_no_longer_holds_back_a_red_button(self):
+        self.executor.submit('BTC-USDT-SWAP', self.signal('a', 0.05))
+        await asyncio.sleep(0)
+        self.executor.submit('BTC-USDT-SWAP', self.signal('b'))
+        self.executor.submit('ETH-USDT-SWAP', self.signal('red'), supersedable=False, exclusive=True)
+        self.executor.submit('BTC-USDT-SWAP', self.signal('c'))  # drops b, submitted after the red button
+        await self.drain()
+        self.assertEqual(self.events, ['start a', 'end a', 'start red', 'end red', 'start c', 'end c'])
+
+    async def test_shutdown_drops_the_queued_signals(self):
+        self.executor.submit('BTC-USDT-SWAP', self.signal('a'), on_drop=self.drop_recorder('a'))
+        await asyncio.sleep(0)
+        self.executor.submit('BTC-USDT-SWAP', self.signal('b'), on_drop=self.drop_recorder('b'))
+        await self.executor.shutdown()
+        self.assertEqual(self.events, ['start a', f'dropped b {SHUTDOWN}', 'end a'])
+        self.assertEqual(self.executor.pending, {})
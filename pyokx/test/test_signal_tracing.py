@@ -0,0 +1,98 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from pyokx.signal_tracing import SignalLatencyStats, SignalTrace, current_trace, stage, start_trace, timed
+from pyokx.task_graph import TaskGraph
+
+
+async def sleep(seconds, result=None):
+    await asyncio.sleep(seconds)
+    return result
+
+
+class TestSignalTrace(IsolatedAsyncioTestCase):
+    async def test_stages_of_child_tasks_land_in_the_signal_trace(self):
+        async def signal():
+            trace = start_trace('BTC-USDT-SWAP')
+            graph = TaskGraph()
+            graph.add('ticker', lambda: timed('ticker', sleep(0.01, 'ticker')))
+            graph.add('order_book', lambda ticker: timed('order_book', sleep(0.01)), 'ticker')
+            await graph.gather('order_book')
+            await asyncio.gather(timed('status_report', sleep(0.01)), timed('leverage', sleep(0.01)))
+            return trace
+
+        trace = await asyncio.create_task(signal())
+        self.assertEqual(set(trace.stages), {'ticker', 'order_book', 'status_report', 'leverage'})
+        self.assertTrue(all(seconds >= 0.009 for seconds in trace.stages.values()), trace.stages)
+
+    async def test_concurrent_signals_record_into_their_own_trace(self):
+        async def signal(instId, stage_name):
+            trace = start_trace(instId)
+            await asyncio.sleep(0)  # let the other signal start its trace
+            await asyncio.gather(timed(stage_name, sleep(0.001)))
+            return trace
+
+        btc, eth = await asyncio.gather(signal('BTC-USDT-SWAP', 'ticker'), signal('ETH-USDT-SWAP', 'leverage'))
+        self.assertEqual(list(btc.stages), ['ticker'])
+        self.assertEqual(list(eth.stages), ['leverage'])
+
+    async def test_repeated_stage_accumulates(self):
+        async def signal():
+            trace = start_trace()
+            for _ in range(2):
+                with stage('close_cancel'):
+                    await asyncio.sleep(0.01)
+            return trace
+
+        trace = await asyncio.create_task(signal())
+        self.assertGreaterEqual(trace.stages['close_cancel'], 0.019)
+
+    async def test_nothing_is_recorded_without_a_trace(self):
+        async def untraced():
+            with stage('validation'):
+                pass
+            self.assertEqual(await timed('ticker', sleep(0, 'ticker')), 'ticker')
+            return current_trace()
+
+        self.assertIsNone(await asyncio.create_task(untraced()))
+
+
+def finished_trace(instId, **stages):
+    trace = SignalTrace(instId)
+    for name, seconds in stages.items():
+        trace.record(name, seconds)
+    return trace
+
+
+class TestSignalLatencyStats(TestCase):
+    def setUp(self) -> None:
+        self.stats = SignalLatencyStats(max_samples=100)
+        for milliseconds in range(1, 101):
+            self.stats.observe(finished_trace('BTC-USDT-SWAP', ticker=milliseconds / 1000))
+        self.stats.observe(finished_trace('ETH-USDT-SWAP', ticker=1.0, leverage=0.5))
+
+    def test_percentiles_per_instrument(self):
+        ticker = self.stats.percentiles(instId='BTC-USDT-SWAP')['ticker']
+        self.assertEqual(ticker['count'], 100)
+        self.assertAlmostEqual(ticker['p50_ms'], 50.5)
+        self.assertAlmostEqual(ticker['p99_ms'], 99.01)
+        self.assertEqual(set(self.stats.percentiles(instId='BTC-USDT-SWAP')), {'ticker', 'total'})
+
+    def test_percentiles_of_all_instruments(self):
+        summary = self.stats.percentiles()
+        self.assertEqual(summary['ticker']['count'], 101)
+        self.assertEqual(summary['leverage'], {'count': 1, 'p50_ms': 500.0, 'p90_ms': 500.0, 'p99_ms': 500.0})
+        self.assertEqual(summary['total']['count'], 101)
+
+    def test_only_the_latest_samples_are_kept(self):
+        self.stats.observe(finished_trace('BTC-USDT-SWAP', ticker=10.0))
+        self.assertEqual(self.stats.percentiles(instId='BTC-USDT-SWAP')['ticker']['count'], 100)
+        self.assertEqual(self.stats.counts[('ticker', 'BTC-USDT-SWAP')], 101)  # the summary count keeps counting
+
+    def test_render(self):
+        lines = self.stats.render().splitlines()
+        self.assertEqual(lines[1], '# TYPE okx_signal_stage_duration_seconds summary')
+        self.assertIn('okx_signal_stage_duration_seconds{stage="leverage",instId="ETH-USDT-SWAP",quantile="0.5"} 0.5',
+                      lines)
+        self.assertIn('okx_signal_stage_duration_seconds_sum{stage="leverage",instId="ETH-USDT-SWAP"} 0.5', lines)
+        self.assertIn('okx_signal_stage_duration_seconds_count{stage="ticker",instId="BTC-USDT-SWAP"} 100', lines)
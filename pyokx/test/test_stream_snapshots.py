@@ -0,0 +1,108 @@
+from unittest import IsolatedAsyncioTestCase
+
+from pydantic import BaseModel
+
+from pyokx.stream_snapshots import StreamSnapshot, positions_snapshot, refresh_snapshots
+from redis_tools.utils import serialize_for_redis
+
+
+class Record(BaseModel):
+    instId: str
+    instType: str
+    state: str
+
+
+def entry(stream_id, records):
+    return [(stream_id, {'data': serialize_for_redis(records)})]
+
+
+BTC_LIVE = {'instId': 'BTC-USDT-SWAP', 'instType': 'SWAP', 'state': 'live'}
+BTC_FILLED = {'instId': 'BTC-USDT-SWAP', 'instType': 'SWAP', 'state': 'partially_filled'}
+ETH_LIVE = {'instId': 'ETH-USDT-240329', 'instType': 'FUTURES', 'state': 'live'}
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.streams = []
+
+    def xrevrange(self, stream, count=None):
+        self.streams.append(stream)
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [self.redis.entries.get(stream, []) for stream in self.streams]
+
+
+class FakeRedis:
+    def __init__(self, entries):
+        self.entries = entries
+        self.round_trips = 0
+
+    async def xrevrange(self, stream, count=None):
+        self.round_trips += 1
+        return self.entries.get(stream, [])
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class TestStreamSnapshot(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.snapshot = StreamSnapshot('okx:rest@orders', Record, ('instId', 'instType', 'state'))
+
+    def test_unchanged_entry_is_not_parsed_again(self):
+        self.snapshot.apply(entry('1-0', [BTC_LIVE, ETH_LIVE]))
+        first = self.snapshot.select(instId='BTC-USDT-SWAP')
+        self.snapshot.apply(entry('1-0', [BTC_FILLED]))  # same ID, the entry is not read again
+        second = self.snapshot.select(instId='BTC-USDT-SWAP')
+        self.assertEqual(self.snapshot.stats, {'hits': 1, 'rebuilds': 1})
+        self.assertEqual(len(second), 1)
+        self.assertIs(second[0], first[0])
+
+    def test_new_entry_replaces_the_cached_models_and_indexes(self):
+        self.snapshot.apply(entry('1-0', [BTC_LIVE, ETH_LIVE]))
+        self.assertEqual([item.state for item in self.snapshot.select(instId='BTC-USDT-SWAP')], ['live'])
+        self.assertEqual(len(self.snapshot.select(state='live')), 2)
+
+        self.snapshot.apply(entry('2-0', [BTC_FILLED]))
+        self.assertEqual([item.state for item in self.snapshot.select(instId='BTC-USDT-SWAP')], ['partially_filled'])
+        self.assertEqual(self.snapshot.select(state='live'), [])
+        self.assertEqual(self.snapshot.select(instId='ETH-USDT-240329'), [])
+        self.assertEqual(self.snapshot.stats['rebuilds'], 2)
+
+    def test_missing_entry_empties_the_snapshot(self):
+        self.snapshot.apply(entry('1-0', [BTC_LIVE]))
+        self.snapshot.apply([])
+        self.assertIsNone(self.snapshot.stream_id)
+        self.assertEqual(self.snapshot.select(), [])
+
+    def test_select_checks_every_criterion(self):
+        self.snapshot.apply(entry('1-0', [BTC_LIVE, BTC_FILLED, ETH_LIVE]))
+        self.assertEqual(self.snapshot.select(instType='SWAP', state='live'), [Record(**BTC_LIVE)])
+        self.assertEqual(self.snapshot.select(instId='BTC-USDT-SWAP', state='partially_filled'),
+                         [Record(**BTC_FILLED)])
+        self.assertEqual(len(self.snapshot.select(instId=None)), 3)  # None criteria are ignored
+        # an instrument looked up before and after all the models were built gives the same items
+        self.assertEqual(self.snapshot.select(instId='ETH-USDT-240329'), [Record(**ETH_LIVE)])
+
+    async def test_refresh_snapshots_reads_every_stream_in_one_round_trip(self):
+        other = StreamSnapshot('okx:rest@algo-orders', Record, ('instId',))
+        redis = FakeRedis({'okx:rest@orders': entry('1-0', [BTC_LIVE]), 'okx:rest@algo-orders': entry('5-0', [])})
+        self.assertEqual(await refresh_snapshots(redis, self.snapshot, other), ('1-0', '5-0'))
+        self.assertEqual(redis.round_trips, 1)
+        self.assertEqual(len(self.snapshot.select()), 1)
+
+
+class TestPositionsSnapshot(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.addCleanup(positions_snapshot._set_records, None, [])
+
+    def test_closed_positions_are_left_out(self):
+        positions = [{'instId': 'BTC-USDT-SWAP', 'instType': 'SWAP', 'pos': '2'},
+                     {'instId': 'ETH-USDT-SWAP', 'instType': 'SWAP', 'pos': '0'},
+                     {'instId': 'SOL-USDT-SWAP', 'instType': 'SWAP', 'pos': '-1'}]
+        positions_snapshot.apply(entry('1-0', {'data': positions}))
+        self.assertEqual([position.instId for position in positions_snapshot.select()],
+                         ['BTC-USDT-SWAP', 'SOL-USDT-SWAP'])
+        self.assertEqual(positions_snapshot.select(instId='ETH-USDT-SWAP'), [])
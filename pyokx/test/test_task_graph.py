@@ -0,0 +1,73 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from pyokx.task_graph import TaskGraph
+
+
+class TestTaskGraph(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.calls = []
+
+    def step(self, name, result=None, delay=0.0):
+        async def run(*dependencies):
+            self.calls.append((name, dependencies))
+            await asyncio.sleep(delay)
+            return result if result is not None else name
+
+        return run
+
+    async def test_node_runs_once_after_its_dependencies(self):
+        graph = TaskGraph()
+        graph.add('instrument', self.step('instrument', 'BTC-USDT-SWAP'))
+        graph.add('order_book', self.step('order_book'), 'instrument')
+        self.assertEqual(await asyncio.gather(graph.get('order_book'), graph.get('order_book')),
+                         ['order_book', 'order_book'])
+        self.assertEqual(self.calls, [('instrument', ()), ('order_book', ('BTC-USDT-SWAP',))])
+
+    async def test_started_node_is_reused_by_get(self):
+        graph = TaskGraph()
+        graph.add('ticker', self.step('ticker'))
+        graph.start('ticker')
+        self.assertEqual(graph.started, ['ticker'])
+        await asyncio.sleep(0)
+        self.assertEqual(await graph.get('ticker'), 'ticker')
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_gather_runs_only_the_nodes_added(self):
+        graph = TaskGraph()
+        graph.add('status_report', self.step('status_report'))
+        needs_order_book = False
+        if needs_order_book:
+            graph.add('order_book', self.step('order_book'))
+        results = await graph.gather(*graph.nodes)
+        self.assertEqual(results, {'status_report': 'status_report'})
+        self.assertEqual(await TaskGraph().gather(), {})
+
+    async def test_dependent_node_waits_for_its_dependency(self):
+        graph = TaskGraph()
+        graph.add('close_cancel', self.step('close_cancel', delay=0.02))
+        graph.add('set_leverage', self.step('set_leverage'), 'close_cancel')
+        graph.add('ticker', self.step('ticker'))
+        await graph.gather('set_leverage', 'ticker')
+        names = [name for name, _ in self.calls]
+        self.assertLess(names.index('close_cancel'), names.index('set_leverage'))
+        self.assertEqual(self.calls[names.index('set_leverage')], ('set_leverage', ('close_cancel',)))
+
+    async def test_cancel_stops_unused_speculation(self):
+        graph = TaskGraph()
+        graph.add('order_book', self.step('order_book', delay=10))
+        graph.start('order_book')
+        await asyncio.sleep(0)
+        graph.cancel()
+        await asyncio.sleep(0)
+        self.assertTrue(graph.tasks['order_book'].cancelled())
+
+    async def test_exception_propagates_to_the_caller(self):
+        async def fail():
+            raise ValueError('Instrument not found')
+
+        graph = TaskGraph()
+        graph.add('instrument', fail)
+        graph.add('order_book', self.step('order_book'), 'instrument')
+        with self.assertRaises(ValueError):
+            await graph.get('order_book')
@@ -0,0 +1,61 @@
+import datetime
+import random
+from unittest import TestCase
+from unittest.mock import patch
+
+from pyokx.low_rest_api import consts as c, utils
+
+API_KEY, SECRET_KEY, PASSPHRASE = 'key', 'c2VjcmV0LWtleQ==', 'passphrase'
+
+
+def legacy_header(timestamp, method, request_path, body, flag):
+    """The per-request pre_hash/sign/get_header path the client used before RequestSigner."""
+    signature = utils.sign(utils.pre_hash(timestamp, method, request_path, body, debug=False), SECRET_KEY)
+    return utils.get_header(API_KEY, signature, timestamp, PASSPHRASE, flag, debug=False)
+
+
+def legacy_timestamp(now, offset=0.0):
+    """The datetime based get_timestamp, `now` standing in for the wall clock."""
+    now = datetime.datetime.utcfromtimestamp(now) + datetime.timedelta(seconds=offset)
+    return now.isoformat("T", "milliseconds") + "Z"
+
+
+class TestRequestSigner(TestCase):
+    def test_headers_match_the_legacy_signing(self):
+        cases = [
+            (c.GET, c.TICKER_INFO + utils.parse_params_to_str({'instId': 'BTC-USDT-SWAP'}), ''),
+            (c.GET, c.POSITION_INFO, ''),
+            (c.POST, c.PLACR_ORDER, utils.encode_body({'instId': 'BTC-USDT-SWAP', 'side': 'buy', 'sz': '1'})),
+            (c.POST, c.BATCH_ORDERS, utils.encode_body([{'instId': 'ETH-USDT-SWAP', 'sz': '2'}] * 20)),
+        ]
+        for flag in ('0', '1'):
+            signer = utils.RequestSigner(API_KEY, SECRET_KEY, PASSPHRASE, flag)
+            for method, request_path, body in cases:
+                with self.subTest(flag=flag, method=method, request_path=request_path):
+                    # the signer is reused across requests, each one must start from the bare keyed state
+                    for timestamp in ('2024-01-02T03:04:05.678Z', '2024-01-02T03:04:05.679Z'):
+                        header = signer.get_header(timestamp, method, request_path, body)
+                        expected = legacy_header(timestamp, method, request_path, body, flag)
+
+                        self.assertEqual(header[c.OK_ACCESS_SIGN], expected[c.OK_ACCESS_SIGN].decode())
+                        expected[c.OK_ACCESS_SIGN] = expected[c.OK_ACCESS_SIGN].decode()
+                        self.assertEqual(header, expected)
+
+
+class TestGetTimestamp(TestCase):
+    def test_matches_the_datetime_formatting(self):
+        rng = random.Random(5)
+        moments = [1700000000.0, 1700000000.123, 1700000000.999, 1700000000.9995, 1700000001.0005]
+        moments += [1700000000 + rng.uniform(0, 86400 * 365) for _ in range(500)]
+        for offset in (0.0, 0.25, -1.5, 3600.001):
+            for now in moments:
+                with self.subTest(now=now, offset=offset), patch.object(utils.time, 'time', return_value=now):
+                    self.assertEqual(utils.get_timestamp(offset), legacy_timestamp(now, offset))
+
+    def test_second_prefix_is_refreshed(self):
+        with patch.object(utils.time, 'time', return_value=1700000000.5):
+            self.assertEqual(utils.get_timestamp(), '2023-11-14T22:13:20.500Z')
+        with patch.object(utils.time, 'time', return_value=1700000001.25):
+            self.assertEqual(utils.get_timestamp(), '2023-11-14T22:13:21.250Z')
+        with patch.object(utils.time, 'time', return_value=1700000000.5):
+            self.assertEqual(utils.get_timestamp(-60), '2023-11-14T22:12:20.500Z')
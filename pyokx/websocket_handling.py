@@ -13,6 +13,7 @@ from pprint import pprint
 
 import dotenv
 
+from pyokx.local_order_book import LocalOrderBooks, LOCAL_ORDER_BOOK_CHANNEL
 from pyokx.okx_market_maker.market_data_service.WssMarketDataService import on_orderbook_snapshot_or_update
 from pyokx.okx_market_maker.market_data_service.model.OrderBook import OrderBook
 from pyokx.rest_handling import get_ticker_with_higher_volume
@@ -31,6 +32,17 @@ logger = setup_logger(__name__)
 
 REDIS_STREAM_MAX_LEN = int(os.getenv('REDIS_STREAM_MAX_LEN', 1000))
 
+# Checksum-verified books read by the REST service for limit pricing
+local_order_books = LocalOrderBooks()
+public_client = None
+
+
+async def resubscribe_public_channel(channel_params: dict):
+    """Unsubscribes and subscribes again to a public channel, OKX then starts over with a snapshot."""
+    if public_client:
+        await public_client.unsubscribe(params=[channel_params])
+        await public_client.subscribe(params=[channel_params])
+
 
 async def ws_callback(message):
     """
@@ -61,6 +73,12 @@ async def ws_callback(message):
         message_args = message_json.get("arg")
         message_channel = message_args.get("channel")
 
+        if message_channel == LOCAL_ORDER_BOOK_CHANNEL and _redis_store and async_redis:
+            # The local book publishes its own snapshots, at book update rates the raw updates would push everything
+            # else out of okx:websockets@all
+            await local_order_books.on_message(message_json, async_redis, resubscribe=resubscribe_public_channel)
+            return
+
         data_struct = available_channel_models[message_channel]
         if hasattr(data_struct, "from_array"):  # only applicatble to a few scenarios with candlesticks
             structured_message = data_struct.from_array(**message_json)
@@ -165,6 +183,7 @@ async def okx_websockets_main_run(input_channel_models: list,
     business_params = [channel.model_dump() for channel in business_channels_inputs]
     private_params = [channel.model_dump() for channel in private_channels_inputs]
 
+    global public_client
     public_client = None
     business_client = None
     private_client = None
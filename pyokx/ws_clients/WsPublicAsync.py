@@ -55,7 +55,7 @@ class WsPublicAsync:
         })
         logger.info(f"unsubscribe: {payload}")
         await self.websocket.send(payload)
-        self.channel_params = list(set(self.channel_params) - set(params))
+        self.channel_params = [channel for channel in self.channel_params if channel not in params]
 
     async def start(self):
         logger.info("Connecting to WebSocket...")
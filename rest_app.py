@@ -4,8 +4,13 @@ from typing import List
 # Imports the Cloud Logging client library
 import uvicorn
 from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import PlainTextResponse
 
 from firebase_tools.authenticate import check_token_validity
+from pyokx.low_rest_api.client import close_async_transports
+from pyokx.low_rest_api.metrics import render_metrics
+from pyokx.signal_queue import signal_executor
+from pyokx.signal_tracing import signal_latency
 from redis_tools.consumers import start_listening, get_listener_task, remove_listener_task, get_all_listener_tasks
 from redis_tools.utils import get_async_redis, stop_async_redis
 from routers.api_keys import api_key_router
@@ -63,6 +68,15 @@ def health_check():
     return {"status": "OK"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(current_user=Depends(check_token_validity)):
+    """OKX REST client metrics, signal handling stage latencies and signal queue in the Prometheus text format."""
+    if not current_user:  # check_token_validity returns False for a token Firebase rejects
+        raise HTTPException(status_code=401, detail="credentials invalid")
+    return PlainTextResponse(render_metrics() + signal_latency.render() + signal_executor.render(),
+                             media_type="text/plain; version=0.0.4")
+
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Startup event triggered")
@@ -81,6 +95,8 @@ async def shutdown_event():
         except Exception as e:
             logger.error(f"Error while shutting down listener: {e}")
 
+    await signal_executor.shutdown()
+    await close_async_transports()
     await stop_async_redis()
 
 
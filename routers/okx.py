@@ -8,6 +8,9 @@ from jose import JWTError
 from firebase_tools.authenticate import check_token_validity
 from pyokx.data_structures import  InstIdSignalRequestForm, OKXPremiumIndicatorSignalRequestForm
 from pyokx.rest_handling import okx_premium_indicator_handler
+from pyokx.signal_dedup import signal_fingerprint, signal_deduplicator, COMPLETED, FAILED, SUPERSEDED
+from pyokx.signal_queue import signal_executor, SUPERSEDED as DROPPED_SUPERSEDED
+from pyokx.signal_tracing import start_trace, stage, signal_latency
 from pyokx.ws_data_structures import InstrumentStatusReport
 from redis_tools.utils import serialize_for_redis, get_async_redis
 from routers.okx_authentication import check_token_against_instrument
@@ -18,6 +21,20 @@ from fastapi import Depends, status
 
 REDIS_STREAM_MAX_LEN = int(os.getenv('REDIS_STREAM_MAX_LEN', 1000))
 
+
+def _signal_dropped(async_redis, fingerprint):
+    """
+    `on_drop` of a queued signal: copies of a superseded signal are answered as superseded, the claim of a signal
+    dropped on shutdown is released so that a retry is executed.
+    """
+    async def dropped(reason):
+        if reason == DROPPED_SUPERSEDED:
+            await signal_deduplicator.complete(async_redis, fingerprint, SUPERSEDED)
+        else:
+            await signal_deduplicator.release(async_redis, fingerprint)
+    return dropped
+
+
 @okx_router.post(path="/okx_antbot_signal", status_code=status.HTTP_202_ACCEPTED)
 async def okx_antbot_webhook(signal_input: InstIdSignalRequestForm):
     print(f"Received signal from {signal_input.OKXSignalInput.instID}")
@@ -47,30 +64,58 @@ async def okx_antbot_webhook(signal_input: InstIdSignalRequestForm):
     try:
         assert signal_input.OKXSignalInput, "OKXSignalInput is None"
         async_redis = await get_async_redis()
-        instrument_id = signal_input.OKXSignalInput.instID
-        await async_redis.xadd(f'okx:webhook@okx_antbot_webhook@input@{instrument_id}',
-                               {'data': serialize_for_redis(signal_input)},
-                               maxlen=REDIS_STREAM_MAX_LEN)
-
-        okx_signal_input = signal_input.OKXSignalInput
-        instrument_status_report: InstrumentStatusReport = await okx_signal_handler(**okx_signal_input.model_dump())
-        await async_redis.xadd(f'okx:webhook@okx_antbot_webhook@response@{instrument_id}',
-                               {'data': serialize_for_redis(instrument_status_report)},
-                               maxlen=REDIS_STREAM_MAX_LEN)
-        pprint(instrument_status_report)
-        assert instrument_status_report, "Instrument Status Report is None, check the Instrument ID"
+        instrument_id = signal_input.OKXSignalInput.instID.upper()  # one queue and stream per instrument, any case
+        # Retried or duplicated alerts get the outcome of the first copy, only that one is executed
+        fingerprint = signal_fingerprint(signal_input.OKXSignalInput)
+        original = await signal_deduplicator.claim(async_redis, fingerprint, instId=instrument_id)
+        if original is not None:
+            return {"detail": "duplicate okx signal, not executed", "original": original}
+        try:
+            await async_redis.xadd(f'okx:webhook@okx_antbot_webhook@input@{instrument_id}',
+                                   {'data': serialize_for_redis(signal_input)},
+                                   maxlen=REDIS_STREAM_MAX_LEN)
+
+            okx_signal_input = signal_input.OKXSignalInput
+
+            async def run(queue_wait):
+                trace = start_trace(instrument_id)
+                trace.record('queue_wait', queue_wait)
+                try:
+                    instrument_status_report: InstrumentStatusReport = await okx_signal_handler(
+                        **okx_signal_input.model_dump())
+                    with stage('response_publishing'):
+                        response_stream_id = await async_redis.xadd(
+                            f'okx:webhook@okx_antbot_webhook@response@{instrument_id}',
+                            {'data': serialize_for_redis(instrument_status_report),
+                             'latency': serialize_for_redis(trace.as_dict())},
+                            maxlen=REDIS_STREAM_MAX_LEN)
+                    signal_latency.observe(trace)
+                    pprint(instrument_status_report)
+                    assert instrument_status_report, "Instrument Status Report is None, check the Instrument ID"
+                except Exception as e:
+                    await signal_deduplicator.complete(async_redis, fingerprint, FAILED, exception=str(e))
+                    raise
+                await signal_deduplicator.complete(async_redis, fingerprint, COMPLETED,
+                                                   response_stream_id=response_stream_id)
+
+            # Executed after the signals already queued for the instrument (a red button after those of every
+            # instrument), the report goes to the response stream
+            ack = signal_executor.submit(instrument_id, run, supersedable=not okx_signal_input.red_button,
+                                         exclusive=okx_signal_input.red_button, description='antbot signal',
+                                         on_drop=_signal_dropped(async_redis, fingerprint))
+        except Exception:
+            # Nothing was queued, a retry of the signal has to be executed
+            await signal_deduplicator.release(async_redis, fingerprint)
+            raise
 
     except Exception as e:
         print(f"Exception in okx_antbot_webhook: {e}")
         return {"detail": "okx signal received but there was an exception, check the logs", "exception": str(e)}
 
-    if instrument_status_report:
-        return {"detail": "okx signal and report received"}
-    else:
-        return {"detail": "okx signal received but no report returned"}
+    return {"detail": "okx signal queued", **ack}
 
 
-@okx_router.post(path="/tradingview/premium_indicator", status_code=status.HTTP_200_OK)
+@okx_router.post(path="/tradingview/premium_indicator", status_code=status.HTTP_202_ACCEPTED)
 async def okx_premium_indicator_webhook(indicator_input: OKXPremiumIndicatorSignalRequestForm):
     from fastapi import HTTPException
     from starlette import status
@@ -100,15 +145,56 @@ async def okx_premium_indicator_webhook(indicator_input: OKXPremiumIndicatorSign
         return {"detail": "okx signal received but there was an exception, check the logs", "exception": str(e)}
 
     async_redis = await get_async_redis()
-    instrument_id = indicator_input.OKXSignalInput.instID
-    await async_redis.xadd(f'okx:webhook@okx_premium_indicator@input@{instrument_id}',
-                           {'data': serialize_for_redis(indicator_input)},
-                           maxlen=REDIS_STREAM_MAX_LEN)
-    returning_message = await okx_premium_indicator_handler(indicator_input)
-    await async_redis.xadd(f'okx:webhook@okx_premium_indicator@response@{instrument_id}',
-                           {'data': serialize_for_redis(returning_message)},
-                           maxlen=REDIS_STREAM_MAX_LEN)
-    return returning_message
+    instrument_id = indicator_input.OKXSignalInput.instID.upper()  # one queue and stream per instrument, any case
+    # Retried or duplicated alerts get the outcome of the first copy, only that one is executed. The indicator signals
+    # are part of the fingerprint, they decide what the same OKXSignalInput does
+    fingerprint = signal_fingerprint(indicator_input.OKXSignalInput, indicator_input.PremiumIndicatorSignals)
+    original = await signal_deduplicator.claim(async_redis, fingerprint, instId=instrument_id)
+    if original is not None:
+        return {"detail": "duplicate okx signal, not executed", "original": original}
+    try:
+        await async_redis.xadd(f'okx:webhook@okx_premium_indicator@input@{instrument_id}',
+                               {'data': serialize_for_redis(indicator_input)},
+                               maxlen=REDIS_STREAM_MAX_LEN)
+
+        async def run(queue_wait):
+            trace = start_trace(instrument_id)
+            trace.record('queue_wait', queue_wait)
+            try:
+                returning_message = await okx_premium_indicator_handler(indicator_input)
+                with stage('response_publishing'):
+                    response_stream_id = await async_redis.xadd(
+                        f'okx:webhook@okx_premium_indicator@response@{instrument_id}',
+                        {'data': serialize_for_redis(returning_message),
+                         'latency': serialize_for_redis(trace.as_dict())},
+                        maxlen=REDIS_STREAM_MAX_LEN)
+                signal_latency.observe(trace)
+            except Exception as e:
+                await signal_deduplicator.complete(async_redis, fingerprint, FAILED, exception=str(e))
+                raise
+            await signal_deduplicator.complete(async_redis, fingerprint, COMPLETED,
+                                               response_stream_id=response_stream_id)
+
+        # Executed after the signals already queued for the instrument (a red button after those of every
+        # instrument), the outcome goes to the response stream
+        ack = signal_executor.submit(instrument_id, run, supersedable=not indicator_input.OKXSignalInput.red_button,
+                                     exclusive=indicator_input.OKXSignalInput.red_button,
+                                     description='premium indicator signal',
+                                     on_drop=_signal_dropped(async_redis, fingerprint))
+    except Exception:
+        # Nothing was queued, a retry of the signal has to be executed
+        await signal_deduplicator.release(async_redis, fingerprint)
+        raise
+
+    return {"detail": "okx signal queued", **ack}
+
+
+@okx_router.get(path="/okx/signal_latency", status_code=status.HTTP_200_OK)
+async def okx_signal_latency(instID: str = None,
+                             current_user=Depends(check_token_validity),
+                             ):
+    """Percentiles (ms) of every stage of signal handling over the latest signals, of `instID` or of all."""
+    return signal_latency.percentiles(instId=instID)
 
 
 @okx_router.get(path="/okx/highest_volume_ticker/{symbol}", status_code=status.HTTP_200_OK)
@@ -116,7 +202,7 @@ async def okx_highest_volume_ticker(symbol: str,
                                     current_user=Depends(check_token_validity),
                                     ):
     from pyokx.rest_handling import get_ticker_with_higher_volume
-    return get_ticker_with_higher_volume(symbol)
+    return await get_ticker_with_higher_volume(symbol)
 
 
 @okx_router.get(path="/okx/instID/{instID}", status_code=status.HTTP_200_OK)
@@ -127,4 +213,4 @@ async def okx_instID_status(instID: str,
     assert TD_MODE == 'isolated', f"TD_MODE {TD_MODE} is currently not supported by this endpoint, try \'isolated\'"
 
     from pyokx.rest_handling import fetch_status_report_for_instrument
-    return fetch_status_report_for_instrument(instID, TD_MODE)
+    return await fetch_status_report_for_instrument(instID, TD_MODE)
@@ -5,10 +5,11 @@ import dotenv
 import uvicorn
 from fastapi import FastAPI, APIRouter
 
+from pyokx.local_order_book import ORDER_BOOK_INSTRUMENTS, LOCAL_ORDER_BOOK_CHANNEL
 from pyokx.rest_messages_service import okx_rest_messages_services
 from pyokx.websocket_handling import okx_websockets_main_run
 from pyokx.ws_data_structures import AccountChannelInputArgs, PositionsChannelInputArgs, \
-    BalanceAndPositionsChannelInputArgs, OrdersChannelInputArgs
+    BalanceAndPositionsChannelInputArgs, OrdersChannelInputArgs, OrderBookInputArgs
 from redis_tools.utils import get_async_redis, stop_async_redis
 from shared.logging import setup_logger
 
@@ -63,7 +64,9 @@ async def startup_event():
                                               "\"updateInterval\": \"1\""
                                               "}"),
         BalanceAndPositionsChannelInputArgs(channel="balance_and_position"),
-        OrdersChannelInputArgs(channel="orders", instType="FUTURES", instFamily=None, instId=None)
+        OrdersChannelInputArgs(channel="orders", instType="FUTURES", instFamily=None, instId=None),
+        ### Public Channels, local order books of the traded instruments
+        *[OrderBookInputArgs(channel=LOCAL_ORDER_BOOK_CHANNEL, instId=instId) for instId in ORDER_BOOK_INSTRUMENTS]
     ], apikey=os.getenv('OKX_API_KEY'), passphrase=os.getenv('OKX_PASSPHRASE'),
         secretkey=os.getenv('OKX_SECRET_KEY'), sandbox_mode=os.getenv('OKX_SANDBOX_MODE', True),
         redis_store=True